@@ -20,11 +20,12 @@
 import itertools
 import os
 import shutil
+import subprocess
 import sys
 import tempfile
 import uuid
 from collections import defaultdict
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
 from email.utils import formatdate
 from itertools import zip_longest
 
@@ -78,6 +79,22 @@ def _clean_streams(repo, mapped_streams):
                 fp.write(blob.data_stream.read())
 
 
+def _run_with_paths(repo, args, paths, separator='\n'):
+    """Run Git with paths given on the standard input.
+
+    Return the exit code and the output; paths do not count towards the
+    limit of the command line length.
+    """
+    result = subprocess.run(
+        ['git'] + list(args),
+        cwd=repo.working_dir,
+        input=separator.join(map(str, paths)).encode('utf-8'),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode, result.stdout.decode('utf-8')
+
+
 def _expand_directories(paths):
     """Expand directory with all files it contains."""
     for path in paths:
@@ -89,13 +106,71 @@ def _expand_directories(paths):
             yield path
 
 
+@attr.s(frozen=True)
+class WorkingTreeStatus:
+    """Represent a snapshot of the working tree status."""
+
+    changed = attr.ib(default=attr.Factory(dict))
+    """Map changed paths to their two letter status codes."""
+
+    untracked = attr.ib(default=attr.Factory(list))
+    """Paths of untracked files."""
+
+    @classmethod
+    def from_repo(cls, repo):
+        """Scan the working tree once with ``git status``.
+
+        The untracked cache is enabled and a configured file system monitor
+        is used by Git to skip unchanged directories.
+        """
+        output = repo.git(
+            c='core.untrackedCache=true'
+        ).status('--porcelain=v2', '-z', '--untracked-files=all')
+
+        changed = {}
+        untracked = []
+        entries = iter(output.split('\0'))
+        for entry in entries:
+            if entry.startswith('? '):
+                untracked.append(entry[2:])
+            elif entry.startswith(('1 ', '2 ', 'u ')):
+                # Ordinary, renamed or copied and unmerged entries.
+                fields = entry.split(' ', {'1': 8, '2': 9, 'u': 10}[entry[0]])
+                changed[fields[-1]] = fields[1]
+                if entry[0] == '2':
+                    next(entries)  # skip the original path
+
+        return cls(changed=changed, untracked=untracked)
+
+    @property
+    def modified(self):
+        """Return paths changed in the working tree."""
+        return [path for path, code in self.changed.items() if code[1] != '.']
+
+    @property
+    def is_dirty(self):
+        """Check if anything is changed or untracked."""
+        return bool(self.changed or self.untracked)
+
+
 @attr.s
 class GitCore:
     """Wrap Git client."""
 
+    WORKTREES = 'renku-worktrees'
+    """Directory for reusable worktrees in the Git directory."""
+
+    ISOLATION_BRANCHES = 'renku/run/isolation/'
+    """Prefix of branches with commands running in isolation."""
+
+    MERGE_LOCK_TIMEOUT = 60
+    """Seconds an isolated command waits for the lock to merge its branch."""
+
     repo = attr.ib(init=False)
     """Store an instance of the Git repository."""
 
+    _status = attr.ib(default=None, init=False, cmp=False, repr=False)
+
     def __attrs_post_init__(self):
         """Initialize computed attributes."""
         from git import InvalidGitRepositoryError, Repo
@@ -106,12 +181,26 @@ class GitCore:
         except InvalidGitRepositoryError:
             self.repo = None
 
+    @property
+    def status(self):
+        """Return the working tree status.
+
+        The working tree is scanned once and the result is reused within a
+        transaction until its commit.
+        """
+        if self._status is None:
+            self._status = WorkingTreeStatus.from_repo(self.repo)
+        return self._status
+
+    def refresh_status(self):
+        """Scan the working tree again after a command changed it."""
+        self._status = None
+        return self.status
+
     @property
     def modified_paths(self):
         """Return paths of modified files."""
-        return [
-            item.b_path for item in self.repo.index.diff(None) if item.b_path
-        ]
+        return self.status.modified
 
     @property
     def dirty_paths(self):
@@ -119,7 +208,7 @@ class GitCore:
         repo_path = self.repo.working_dir
         return {
             os.path.join(repo_path, p)
-            for p in self.repo.untracked_files + self.modified_paths
+            for p in self.status.untracked + self.modified_paths
         }
 
     @property
@@ -129,18 +218,46 @@ class GitCore:
         return [
             os.path.join(repo_path, path) for path in itertools.chain(
                 (x[0] for x in self.repo.index.entries),
-                self.repo.untracked_files,
+                self.status.untracked,
             )
         ]
 
+    def filter_changed_paths(self, paths):
+        """Return paths with a content differing from the index.
+
+        Untracked paths are kept unless they are ignored.
+        """
+        entries = self.repo.index.entries
+        tracked = sorted(path for path in paths if (path, 0) in entries)
+        untracked = set(paths) - set(tracked)
+
+        changed = set()
+        if tracked:
+            _, blobs = _run_with_paths(
+                self.repo, ['hash-object', '--stdin-paths'], tracked
+            )
+            blobs = blobs.split()
+            changed = {
+                path
+                for path, blob in zip(tracked, blobs)
+                if entries[(path, 0)].hexsha != blob
+            }
+        if untracked:
+            untracked -= set(self.find_ignored_paths(*untracked) or ())
+
+        return changed | untracked
+
     def find_ignored_paths(self, *paths):
         """Return ignored paths matching ``.gitignore`` file."""
-        from git.exc import GitCommandError
+        if not paths:
+            return
 
-        try:
-            return self.repo.git.check_ignore(*paths).split()
-        except GitCommandError:
-            pass
+        code, output = _run_with_paths(
+            self.repo, ['check-ignore', '--stdin', '-z'], paths, '\0'
+        )
+        # Git exits with 1 if no path is ignored.
+        if code == 0:
+            return [path for path in output.split('\0') if path]
 
     def find_attr(self, *paths):
         """Return map with path and its attributes."""
@@ -186,6 +303,8 @@ class GitCore:
 
     def ensure_clean(self, ignore_std_streams=False):
         """Make sure the repository is clean."""
+        # The working tree could have changed since the last snapshot.
+        status = self.refresh_status()
         dirty_paths = self.dirty_paths
         mapped_streams = _mapped_std_streams(dirty_paths)
 
@@ -194,15 +313,13 @@ class GitCore:
                 _clean_streams(self.repo, mapped_streams)
                 raise errors.DirtyRepository(self.repo)
 
-        elif self.repo.is_dirty(untracked_files=True):
+        elif status.is_dirty:
             _clean_streams(self.repo, mapped_streams)
             raise errors.DirtyRepository(self.repo)
 
     def ensure_untracked(self, path):
         """Ensure that path is not part of git untracked files."""
-        untracked = self.repo.untracked_files
-
-        for file_path in untracked:
+        for file_path in self.status.untracked:
             is_parent = str(file_path).startswith(path)
             is_equal = path == file_path
 
@@ -225,8 +342,14 @@ class GitCore:
             pass
 
     @contextmanager
-    def commit(self, author_date=None, commit_only=None):
-        """Automatic commit."""
+    def commit(
+        self, author_date=None, commit_only=None, message=None, paths=None
+    ):
+        """Automatic commit.
+
+        :param message: Commit message. (default: the command line)
+        :param paths: Stage only changes of these paths instead of all.
+        """
         from git import Actor
         from renku.version import __version__
 
@@ -258,18 +381,30 @@ class GitCore:
         if isinstance(commit_only, Path):
             self.repo.git.add(str(commit_only))
 
-        if not commit_only:
+        if paths is not None:
+            entries = self.repo.index.entries
+            paths = [
+                path for path in paths
+                if (path, 0) in entries or (self.path / path).exists()
+            ]
+            if paths:
+                self.repo.git.add('--all', '--', *paths)
+
+        elif not commit_only:
             self.repo.git.add('--all')
 
-        argv = [os.path.basename(sys.argv[0])] + sys.argv[1:]
+        if message is None:
+            argv = [os.path.basename(sys.argv[0])] + sys.argv[1:]
+            message = ' '.join(argv)
 
         # Ignore pre-commit hooks since we have already done everything.
         self.repo.index.commit(
-            ' '.join(argv),
+            message,
             author_date=author_date,
             committer=committer,
             skip_hooks=True,
         )
+        self._status = None
 
     @contextmanager
     def transaction(
@@ -281,6 +416,9 @@ class GitCore:
         ignore_std_streams=False
     ):
         """Perform Git checks and operations."""
+        # Status of the working tree is not shared between commands.
+        self._status = None
+
         if clean:
             self.ensure_clean(ignore_std_streams=ignore_std_streams)
 
@@ -296,6 +434,138 @@ class GitCore:
         else:
             yield self
 
+    def _prune_worktrees(self, pool, size):
+        """Remove unused worktrees beyond the pool size and merged branches."""
+        import filelock
+        from git import GitCommandError
+
+        for path in pool.iterdir():
+            if not path.name.isdigit() or int(path.name) < size:
+                continue
+            lock = filelock.FileLock(
+                str(pool / '{0}.lock'.format(path.name)), timeout=0
+            )
+            try:
+                with lock.acquire():
+                    shutil.rmtree(str(path))
+            except filelock.Timeout:
+                continue
+        self.repo.git.worktree('prune')
+
+        # Branches checked out by running commands can not be deleted.
+        merged = self.repo.git.for_each_ref(
+            '--merged', 'HEAD', '--format=%(refname:short)',
+            'refs/heads/' + self.ISOLATION_BRANCHES
+        )
+        for branch_name in merged.splitlines():
+            try:
+                self.repo.git.branch('-d', branch_name)
+            except GitCommandError:
+                pass
+
+    def _reserve_worktree(self):
+        """Reserve a reusable worktree and return its path and lock.
+
+        The pool holds a worktree per CPU. Nothing is returned when all of
+        them are used by other commands.
+        """
+        import filelock
+
+        git_dir = getattr(self.repo, 'common_dir', None) or self.repo.git_dir
+        pool = Path(git_dir) / self.WORKTREES
+        pool.mkdir(parents=True, exist_ok=True)
+
+        size = os.cpu_count() or 1
+        self._prune_worktrees(pool, size)
+
+        for index in range(size):
+            lock = filelock.FileLock(
+                str(pool / '{0}.lock'.format(index)), timeout=0
+            )
+            try:
+                lock.acquire()
+            except filelock.Timeout:
+                continue
+            return pool / str(index), lock
+        return None, None
+
+    def _prepare_worktree(self, path, branch_name, commit=None):
+        """Check out a new branch in a reusable worktree.
+
+        Files from the external storage are not checked out since commands
+        pull the paths they read.
+        """
+        from git import Repo
+
+        commit = commit or self.repo.head.commit.hexsha
+        env = {'GIT_LFS_SKIP_SMUDGE': '1'}
+
+        if not (path / '.git').exists():
+            self.repo.git.worktree('prune')
+            self.repo.git.worktree(
+                'add', '-b', branch_name, str(path), commit, env=env
+            )
+            return
+
+        # Only files differing from the previous commit are updated.
+        repo = Repo(str(path))
+        repo.git.reset('--hard', '--quiet', env=env)
+        # Ignored files of previous commands must not become their outputs.
+        repo.git.clean('-fdxq')
+        repo.git.checkout('--quiet', '-B', branch_name, env=env)
+        repo.git.reset('--keep', '--quiet', commit, env=env)
+
+    @contextmanager
+    def pooled_worktree(self, branch_name, commit=None):
+        """Check out a new branch in a worktree from the pool.
+
+        The path of the worktree is yielded. A temporary worktree is used
+        when the whole pool is busy. The branch is kept afterwards.
+        """
+        from git import Repo
+
+        path, lock = self._reserve_worktree()
+        temporary = path is None
+        if temporary:
+            # Other commands use the whole pool.
+            path = Path(tempfile.mkdtemp())
+
+        try:
+            self._prepare_worktree(path, branch_name, commit=commit)
+            yield path
+        finally:
+            if temporary:
+                shutil.rmtree(str(path))
+                self.repo.git.worktree('prune')
+            else:
+                try:
+                    # Release the branch for other worktrees.
+                    if (path / '.git').exists():
+                        Repo(str(path)).git.checkout('--quiet', '--detach')
+                finally:
+                    lock.release()
+
+    def _worktree_client(self, path):
+        """Return a client of a worktree sharing the repository config."""
+        client = attr.evolve(self, path=path)
+        client.repo.config_reader = self.repo.config_reader
+        return client
+
+    def _abort_merge(self):
+        """Restore the repository after a failed merge and raise an error.
+
+        The isolation branch is kept so the merge can be repeated manually.
+        """
+        from git import GitCommandError
+
+        error = errors.FailedMerge(self.repo)
+        try:
+            self.repo.git.merge('--abort')
+        except GitCommandError:
+            # Fast-forward merges do not leave a merge in progress.
+            pass
+        raise error
+
     @contextmanager
     def worktree(
         self,
@@ -304,22 +574,37 @@ class GitCore:
         commit=None,
         merge_args=('--ff-only', ),
     ):
-        """Create new worktree."""
+        """Create new worktree.
+
+        Without a path a worktree from the pool under the Git directory is
+        reused by one command at a time.
+        """
         from git import GitCommandError, NULL_TREE
         from renku._contexts import Isolation
 
-        delete = path is None
-        path = path or tempfile.mkdtemp()
-        branch_name = branch_name or 'renku/run/isolation/' + uuid.uuid4().hex
+        branch_name = branch_name or (
+            self.ISOLATION_BRANCHES + uuid.uuid4().hex
+        )
+        pooled = path is None and commit is not NULL_TREE
+        delete = path is None and not pooled
+        stack = ExitStack()
 
         # TODO sys.argv
 
         if commit is NULL_TREE:
+            path = path or tempfile.mkdtemp()
             args = ['add', '--detach', path]
             self.repo.git.worktree(*args)
             client = attr.evolve(self, path=path)
             client.repo.git.checkout('--orphan', branch_name)
             client.repo.git.rm('-rf', '*')
+        elif pooled:
+            path = str(
+                stack.enter_context(
+                    self.pooled_worktree(branch_name, commit=commit)
+                )
+            )
+            client = self._worktree_client(path)
         else:
             args = ['add', '-b', branch_name, path]
             if commit:
@@ -327,39 +612,79 @@ class GitCore:
             self.repo.git.worktree(*args)
             client = attr.evolve(self, path=path)
 
-        client.repo.config_reader = self.repo.config_reader
-
-        # Keep current directory relative to repository root.
-        relative = Path('.').resolve().relative_to(self.path)
-
-        # Reroute standard streams
-        original_mapped_std = _mapped_std_streams(self.candidate_paths)
-        mapped_std = {}
-        for name, stream in original_mapped_std.items():
-            stream_path = Path(path) / (Path(stream).relative_to(self.path))
-            stream_path = stream_path.absolute()
-
-            if not stream_path.exists():
-                stream_path.parent.mkdir(parents=True, exist_ok=True)
-                stream_path.touch()
-
-            mapped_std[name] = stream_path
-
-        _clean_streams(self.repo, original_mapped_std)
-
-        new_cwd = Path(path) / relative
-        new_cwd.mkdir(parents=True, exist_ok=True)
-
-        with Isolation(cwd=str(new_cwd), **mapped_std):
-            yield client
-
         try:
-            self.repo.git.merge(branch_name, *merge_args)
-        except GitCommandError:
-            raise errors.FailedMerge(self.repo)
+            client.repo.config_reader = self.repo.config_reader
+
+            # Keep current directory relative to repository root.
+            relative = Path('.').resolve().relative_to(self.path)
+
+            # Reroute standard streams
+            original_mapped_std = _mapped_std_streams(self.candidate_paths)
+            mapped_std = {}
+            for name, stream in original_mapped_std.items():
+                stream_path = Path(path
+                                   ) / (Path(stream).relative_to(self.path))
+                stream_path = stream_path.absolute()
+
+                if not stream_path.exists():
+                    stream_path.parent.mkdir(parents=True, exist_ok=True)
+                    stream_path.touch()
+
+                mapped_std[name] = stream_path
+
+            _clean_streams(self.repo, original_mapped_std)
+
+            new_cwd = Path(path) / relative
+            new_cwd.mkdir(parents=True, exist_ok=True)
+
+            with Isolation(cwd=str(new_cwd), **mapped_std):
+                yield client
+
+            # Only the merge changes the repository. Merges of concurrent
+            # commands are short, hence they wait for each other.
+            lock = self.lock
+            if not self.lock_timeout:
+                lock.timeout = self.MERGE_LOCK_TIMEOUT
+
+            with lock:
+                head = None
+                if self.repo.head.is_valid():
+                    head = self.repo.head.commit.hexsha
+
+                try:
+                    self.repo.git.merge(branch_name, *merge_args)
+                except GitCommandError:
+                    if '--ff-only' not in merge_args:
+                        self._abort_merge()
+
+                    # Other commands have been merged in the meantime.
+                    try:
+                        self.repo.git.merge(
+                            branch_name, '--no-edit',
+                            *(arg for arg in merge_args if arg != '--ff-only')
+                        )
+                    except GitCommandError:
+                        self._abort_merge()
+
+                if head is None:
+                    self.checkout_paths_from_storage()
+                else:
+                    # Check out only files changed by the merge.
+                    changed = self.repo.git.diff(
+                        '--name-only', '-z', head, 'HEAD'
+                    ).strip('\0')
+                    if changed:
+                        self.checkout_paths_from_storage(*changed.split('\0'))
+        finally:
+            stack.close()
+
+        if pooled:
+            try:
+                self.repo.git.branch('-d', branch_name)
+            except GitCommandError:
+                # Another command pruned the merged branch.
+                pass
 
         if delete:
             shutil.rmtree(path)
             self.repo.git.worktree('prune')
-
-        self.checkout_paths_from_storage()
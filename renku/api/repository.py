@@ -18,18 +18,25 @@
 """Client for handling a local repository."""
 
 import datetime
+import json
+import os
+import re
 import uuid
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from contextlib import contextmanager
 from subprocess import check_output
 
 import attr
 import filelock
 import yaml
+from gitdb.exc import ODBError
 from werkzeug.utils import cached_property, secure_filename
 
+from renku import errors
 from renku._compat import Path
 from renku.api.config import RENKU_HOME
+from renku.models._cache import JSONCache
+from renku.models._git import CommitLog
 from renku.models.refs import LinkReference
 
 from ._git import GitCore
@@ -45,6 +52,24 @@ def default_path():
         return '.'
 
 
+class RepositoryLock(filelock.FileLock):
+    """Exclusive lock of a repository waiting for other commands."""
+
+    def acquire(self, *args, **kwargs):
+        """Acquire the lock or fail after the timeout."""
+        try:
+            return super().acquire(*args, **kwargs)
+        except filelock.Timeout:
+            raise errors.LockTimeout(self.lock_file, self.timeout)
+
+
+_RE_IMMUTABLE_REVISION = re.compile(r'^[0-9a-f]{40}[~^0-9]*$')
+"""Match revisions which always resolve to the same commit."""
+
+_RE_PATHSPEC_MAGIC = re.compile(r'[*?[\]:!]')
+"""Match paths which Git could interpret as a pattern."""
+
+
 @attr.s
 class PathMixin:
     """Define a default path attribute."""
@@ -74,6 +99,12 @@ class RepositoryApiMixin(GitCore):
     parent = attr.ib(default=None)
     """Store a pointer to the parent repository."""
 
+    lock_timeout = attr.ib(default=0)
+    """Number of seconds to wait for the repository lock."""
+
+    graph_workers = attr.ib(default=1)
+    """Number of processes used to process commits of the graph."""
+
     METADATA = 'metadata.yml'
     """Default name of Renku config file."""
 
@@ -83,6 +114,21 @@ class RepositoryApiMixin(GitCore):
     WORKFLOW = 'workflow'
     """Directory for storing workflow in Renku."""
 
+    METRICS_SUFFIX = '.metrics.json'
+    """Suffix of files with resource usage of workflows."""
+
+    CACHE = 'renku/cache'
+    """Directory for storing caches in the Git directory."""
+
+    TMP = 'renku/tmp'
+    """Directory for temporary files in the Git directory."""
+
+    COMMIT_LOGS = 16
+    """Maximal number of revisions with an indexed commit log."""
+
+    STEP_CACHE_SIZE = 4096
+    """Maximal number of workflow steps with cached outputs."""
+
     def __attrs_post_init__(self):
         """Initialize computed attributes."""
         #: Configure Renku path.
@@ -94,6 +140,9 @@ class RepositoryApiMixin(GitCore):
         self.renku_path = path
 
         self._subclients = {}
+        self._commit_logs = OrderedDict()
+        self._commit_changes = {}
+        self._commits = {}
 
         super().__attrs_post_init__()
 
@@ -107,10 +156,14 @@ class RepositoryApiMixin(GitCore):
 
     @property
     def lock(self):
-        """Create a Renku config lock."""
-        return filelock.FileLock(
+        """Create a Renku config lock.
+
+        Commands waiting for the lock are queued until it is released or
+        until the :attr:`lock_timeout` expires.
+        """
+        return RepositoryLock(
             str(self.renku_path.with_suffix(self.LOCK_SUFFIX)),
-            timeout=0,
+            timeout=self.lock_timeout,
         )
 
     @property
@@ -123,6 +176,67 @@ class RepositoryApiMixin(GitCore):
         """Return a ``Path`` instance of the workflow folder."""
         return self.renku_path / self.WORKFLOW
 
+    @property
+    def cache_path(self):
+        """Return a ``Path`` instance of the cache folder.
+
+        The folder lives in the common Git directory so that it is shared
+        by all worktrees and never shows up as an untracked path.
+        """
+        git_dir = getattr(self.repo, 'common_dir', None) or self.repo.git_dir
+        return Path(git_dir) / self.CACHE
+
+    @property
+    def tmp_path(self):
+        """Return a ``Path`` instance of the temporary folder.
+
+        The folder is on the same filesystem as the working directory in
+        most setups so that files can be moved into the repository by
+        renaming them.
+        """
+        return Path(self.repo.git_dir) / self.TMP
+
+    @cached_property
+    def commit_cache(self):
+        """Return a persistent cache of processed commits."""
+        return JSONCache(self.cache_path / 'commits.json')
+
+    @cached_property
+    def previous_commit_cache(self):
+        """Return a persistent cache of previous commits for immutable refs."""
+        return JSONCache(self.cache_path / 'previous_commits.json')
+
+    @cached_property
+    def graph_cache(self):
+        """Return a persistent state of the last built graph."""
+        return JSONCache(self.cache_path / 'graph.json')
+
+    @cached_property
+    def reachability_cache(self):
+        """Return a persistent reachability index of generated paths."""
+        return JSONCache(self.cache_path / 'reachability.json')
+
+    @cached_property
+    def step_cache(self):
+        """Return a persistent cache of output blobs of workflow steps."""
+        return JSONCache(
+            self.cache_path / 'steps.json', max_size=self.STEP_CACHE_SIZE
+        )
+
+    @cached_property
+    def checkpoint_cache(self):
+        """Return a persistent cache of steps completed by failed updates."""
+        return JSONCache(self.cache_path / 'checkpoints.json')
+
+    def flush_caches(self):
+        """Write modified persistent caches to the disk."""
+        self.commit_cache.flush()
+        self.previous_commit_cache.flush()
+        self.graph_cache.flush()
+        self.reachability_cache.flush()
+        self.step_cache.flush()
+        self.checkpoint_cache.flush()
+
     @cached_property
     def cwl_prefix(self):
         """Return a CWL prefix."""
@@ -180,21 +294,36 @@ class RepositoryApiMixin(GitCore):
         if len(commit.parents) > 1:
             return Activity(commit=commit, client=self)
 
-        if path is None:
-            for file_ in commit.stats.files.keys():
+        # Commits are immutable hence the detected CWL path and its parsed
+        # content can be reused by all following invocations.
+        cached = self.commit_cache.get(commit.hexsha)
+        detected = path is None
+
+        if detected and cached is not None:
+            path = cached['path']
+        elif detected:
+            for _, file_ in self.commit_changes(commit):
                 # Find a process (CommandLineTool or Workflow)
                 if self.is_cwl(file_):
                     if path is not None:
                         # Regular activity since it edits multiple CWL files
-                        return Activity(commit=commit, client=self)
+                        path = None
+                        break
 
                     path = file_
 
         if path:
-            data = (commit.tree / path).data_stream.read()
-            process = CWLClass.from_cwl(
-                yaml.safe_load(data), __reference__=Path(path)
-            )
+            if cached is not None and cached['path'] == path:
+                data = cached['data']
+            else:
+                data = yaml.safe_load((commit.tree / path).data_stream.read())
+                if detected:
+                    self.commit_cache[commit.hexsha] = {
+                        'path': path,
+                        'data': data,
+                    }
+
+            process = CWLClass.from_cwl(data, __reference__=Path(path))
 
             return process.create_run(
                 commit=commit,
@@ -203,15 +332,152 @@ class RepositoryApiMixin(GitCore):
                 path=path,
             )
 
+        if detected and cached is None:
+            self.commit_cache[commit.hexsha] = {'path': None, 'data': None}
+
         return Activity(commit=commit, client=self)
 
     def is_cwl(self, path):
         """Check if the path is a valid CWL file."""
         return path.startswith(self.cwl_prefix) and path.endswith('.cwl')
 
+    def get_commit(self, hexsha):
+        """Return a shared commit instance for the given SHA.
+
+        Graph nodes reference the same commits many times, hence sharing
+        instances avoids loading their metadata repeatedly.
+        """
+        commit = self._commits.get(hexsha)
+        if commit is None:
+            commit = self._commits[hexsha] = self.repo.commit(hexsha)
+        return commit
+
+    def commit_log(self, revision='HEAD'):
+        """Return an index of commits reachable from the revision."""
+        hexsha = self.repo.rev_parse(str(revision)).hexsha
+
+        if hexsha in self._commit_logs:
+            self._commit_logs.move_to_end(hexsha)
+        else:
+            self._commit_logs[hexsha] = CommitLog(
+                self.repo, revision=hexsha, changes=self._commit_changes
+            )
+
+            while len(self._commit_logs) > self.COMMIT_LOGS:
+                self._commit_logs.popitem(last=False)[1].close()
+
+        return self._commit_logs[hexsha]
+
+    def commit_changes(self, commit, revision='HEAD'):
+        """Return a list of ``(change_type, path)`` tuples of the commit.
+
+        Changes are parsed from the memoized commit log of the revision, hence
+        processing many commits from the same range runs a single Git command.
+        If the revision is ``None``, only the commit itself is read.
+        """
+        if len(commit.parents) > 1:
+            # Combined diffs of merges differ from the diff with parents.
+            return [(item.change_type, item.a_path)
+                    for item in commit.diff(commit.parents)]
+
+        hexsha = commit.hexsha
+
+        if hexsha not in self._commit_changes and revision is not None:
+            try:
+                self.commit_log(revision).find_changes(hexsha)
+            except (ValueError, ODBError):
+                pass
+
+        if hexsha not in self._commit_changes:
+            log = CommitLog(
+                self.repo,
+                revision=hexsha,
+                max_count=1,
+                changes=self._commit_changes,
+            )
+            log.find_changes(hexsha)
+            log.close()
+
+        return self._commit_changes[hexsha]
+
+    def update_commit_changes(self, changes):
+        """Memoize changes of commits parsed by another process."""
+        self._commit_changes.update(changes)
+
+    def _commit_log_path(self, path):
+        """Return a normalized path for lookups in the commit log."""
+        if not isinstance(path, (str, Path)):
+            return
+
+        path = Path(path)
+        if path.is_absolute():
+            try:
+                path = path.relative_to(self.path)
+            except ValueError:
+                return
+
+        path = os.path.normpath(str(path))
+        if path.startswith('..') or _RE_PATHSPEC_MAGIC.search(path):
+            return
+
+        return path
+
+    def _find_in_commit_log(self, path, revision):
+        """Return the last commit modifying the path from the ``HEAD`` log.
+
+        Only ``HEAD`` and commits modifying the path themselves are resolved,
+        other revisions would need a log pass of their own and return
+        ``None``. Paths found after a merge return ``None`` too since the
+        path limited log can simplify the history differently.
+        """
+        commit = self.repo.commit(revision)
+        if commit == self.repo.head.commit:
+            log = self.commit_log(commit.hexsha)
+            hexsha = log.find(path)
+            if path in log.ambiguous:
+                return
+            return [self.get_commit(hexsha)] if hexsha else []
+
+        prefix = '' if path == '.' else path + '/'
+        if len(commit.parents) < 2 and any(
+            changed == path or changed.startswith(prefix)
+            for _, changed in self.commit_changes(commit)
+        ):
+            return [self.get_commit(commit.hexsha)]
+
     def find_previous_commit(self, paths, revision='HEAD'):
         """Return a previous commit for a given path."""
-        file_commits = list(self.repo.iter_commits(revision, paths=paths))
+        revision = str(revision)
+        key = None
+        if isinstance(paths, (str, Path)) and \
+                _RE_IMMUTABLE_REVISION.match(revision):
+            key = '{0}:{1}'.format(revision, paths)
+
+        if key in self.previous_commit_cache:
+            hexsha = self.previous_commit_cache[key]
+            file_commits = [self.get_commit(hexsha)] if hexsha else []
+        else:
+            file_commits = None
+            path = self._commit_log_path(paths)
+
+            if path is not None:
+                try:
+                    file_commits = self._find_in_commit_log(path, revision)
+                except (ValueError, ODBError):
+                    # Let Git report invalid revisions.
+                    pass
+
+            if file_commits is None:
+                file_commits = [
+                    self._commits.setdefault(commit.hexsha, commit)
+                    for commit in
+                    self.repo.iter_commits(revision, paths=paths, max_count=1)
+                ]
+
+            if key is not None:
+                self.previous_commit_cache[key] = (
+                    file_commits[0].hexsha if file_commits else None
+                )
 
         if not file_commits:
             raise KeyError(
@@ -301,9 +567,38 @@ class RepositoryApiMixin(GitCore):
 
         metadata.to_yaml()
 
+    def metrics_path(self, path):
+        """Return a path of the resource usage stored next to a workflow."""
+        return os.path.splitext(str(path))[0] + self.METRICS_SUFFIX
+
+    def store_metrics(self, path, metrics, steps=None, restored=None):
+        """Store resource usage of the workflow stored in ``path``.
+
+        :param metrics: Resource usage of the execution or ``None`` if no
+            step was executed.
+        :param steps: Optional mapping from step identifiers to their
+            resource usage.
+        :param restored: Optional identifiers of steps whose outputs were
+            restored instead of executed.
+        """
+        data = metrics.as_dict() if metrics is not None else {}
+        if steps:
+            data['steps'] = {
+                step_id: usage.as_dict()
+                for step_id, usage in steps.items()
+            }
+        if restored:
+            data['restored'] = sorted(restored)
+        with open(self.metrics_path(path), 'w') as fp:
+            json.dump(data, fp, sort_keys=True)
+
     @contextmanager
-    def with_workflow_storage(self):
-        """Yield a workflow storage."""
+    def with_workflow_storage(self, metrics=None):
+        """Yield a workflow storage.
+
+        :param metrics: Optional mapping from step identifiers to their
+            resource usage.
+        """
         from renku.models.cwl._ascwl import ascwl
         from renku.models.cwl.workflow import Workflow
 
@@ -333,6 +628,9 @@ class RepositoryApiMixin(GitCore):
                     default_flow_style=False
                 )
 
+            if metrics and step.id in metrics:
+                self.store_metrics(step_path, metrics[step.id])
+
     def init_repository(self, name=None, force=False):
         """Initialize a local Renku repository."""
         from git import Repo
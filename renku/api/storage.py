@@ -17,7 +17,9 @@
 # limitations under the License.
 """Client for handling a data storage."""
 import functools
+import os
 import shlex
+import threading
 from collections import defaultdict
 from shutil import which
 from subprocess import PIPE, STDOUT, call, run
@@ -35,6 +37,12 @@ from .repository import RepositoryApiMixin
 # of files into an argument string.
 ARGUMENT_BATCH_SIZE = 100
 
+LFS_POINTER_PREFIX = b'version https://git-lfs.github.com/spec/'
+"""Beginning of files that point to LFS objects."""
+
+LFS_POINTER_SIZE = 1024
+"""Maximal size of LFS pointer files."""
+
 
 def ensure_external_storage(fn):
     """Ensure management of external storage on methods which depend on it.
@@ -53,6 +61,93 @@ def ensure_external_storage(fn):
     return wrapper
 
 
+def _is_pointer(path):
+    """Check if the file is an LFS pointer."""
+    try:
+        if os.path.getsize(path) > LFS_POINTER_SIZE:
+            return False
+        with open(path, 'rb') as fp:
+            return fp.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+    except OSError:
+        return False
+
+
+@attr.s(cmp=False)
+class StoragePrefetch:
+    """Pull batches of paths from LFS in a background thread.
+
+    Batches are pulled in the given order unless a path is waited for
+    earlier. Files whose content is already present are available at once.
+    """
+
+    client = attr.ib()
+    batches = attr.ib()
+
+    _pending = attr.ib(default=attr.Factory(list), init=False)
+    _scheduled = attr.ib(default=attr.Factory(set), init=False)
+    _done = attr.ib(default=attr.Factory(set), init=False)
+    _condition = attr.ib(default=attr.Factory(threading.Condition), init=False)
+    _thread = attr.ib(default=None, init=False)
+
+    def __attrs_post_init__(self):
+        """Skip paths that do not need to be pulled."""
+        seen = set()
+        for batch in self.batches:
+            batch = {os.path.normpath(str(path)) for path in batch} - seen
+            seen.update(batch)
+
+            pending = sorted(
+                path
+                for path in batch if os.path.isdir(path) or _is_pointer(path)
+            )
+            if pending:
+                # Resolve paths before Git is used by other threads.
+                self._scheduled.update(pending)
+                self._pending.append(
+                    (set(pending), self.client._storage_paths(pending))
+                )
+
+    def _pull(self):
+        """Pull pending batches."""
+        while True:
+            with self._condition:
+                if not self._pending:
+                    break
+                paths, client_dict = self._pending.pop(0)
+
+            try:
+                self.client._pull_from_storage(client_dict)
+            finally:
+                with self._condition:
+                    self._done.update(paths)
+                    self._condition.notify_all()
+
+    def wait(self, paths):
+        """Wait until given paths are pulled."""
+        paths = {os.path.normpath(str(path)) for path in paths}
+
+        with self._condition:
+            missing = (paths & self._scheduled) - self._done
+            if not missing:
+                return
+
+            # Pull batches with missing paths first.
+            self._pending.sort(key=lambda batch: not batch[0] & missing)
+            self._condition.wait_for(lambda: missing <= self._done)
+
+    def __enter__(self):
+        """Start pulling in the background."""
+        self._thread = threading.Thread(target=self._pull, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop after the current batch."""
+        with self._condition:
+            del self._pending[:]
+        self._thread.join()
+
+
 @attr.s
 class StorageApiMixin(RepositoryApiMixin):
     """Client for handling a data storage."""
@@ -149,10 +244,8 @@ class StorageApiMixin(RepositoryApiMixin):
             cwd=str(self.path),
         )
 
-    @ensure_external_storage
-    def pull_paths_from_storage(self, *paths):
-        """Pull paths from LFS."""
-        import math
+    def _storage_paths(self, paths):
+        """Group paths by repositories storing them."""
         client_dict = defaultdict(list)
 
         for path in _expand_directories(paths):
@@ -161,6 +254,17 @@ class StorageApiMixin(RepositoryApiMixin):
             )
             client_dict[client.path].append(str(path))
 
+        return client_dict
+
+    @ensure_external_storage
+    def pull_paths_from_storage(self, *paths):
+        """Pull paths from LFS."""
+        self._pull_from_storage(self._storage_paths(paths))
+
+    def _pull_from_storage(self, client_dict):
+        """Pull paths grouped by repositories from LFS."""
+        import math
+
         for client_path, paths in client_dict.items():
             batch_size = math.ceil(len(paths) / ARGUMENT_BATCH_SIZE)
             for index in range(batch_size):
@@ -178,6 +282,11 @@ class StorageApiMixin(RepositoryApiMixin):
                     stderr=STDOUT,
                 )
 
+    @ensure_external_storage
+    def prefetch_paths_from_storage(self, *batches):
+        """Return a prefetch of path batches from LFS in the given order."""
+        return StoragePrefetch(self, batches)
+
     @ensure_external_storage
     def checkout_paths_from_storage(self, *paths):
         """Checkout a paths from LFS."""
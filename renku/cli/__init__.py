@@ -73,6 +73,19 @@ the ``--config`` option value is used. For example:
 
 instructs Renku to store the configuration files in your ``~/renku/config/``
 directory when running the ``init`` command.
+
+Provenance graph
+~~~~~~~~~~~~~~~~
+
+Commands like ``renku status``, ``renku log`` or ``renku update`` build
+the provenance graph from the repository history. Commits that have not been
+processed before can be processed in parallel by setting the
+``--graph-workers`` option or the ``RENKU_GRAPH_WORKERS`` environment
+variable to the number of worker processes:
+
+.. code-block:: console
+
+    $ renku --graph-workers 8 status
 """
 
 import uuid
@@ -85,7 +98,8 @@ from ..api.client import LocalClient
 from ..api.config import RENKU_HOME, default_config_dir, print_app_config_path
 from ..api.repository import default_path
 from ._exc import IssueFromTraceback
-from ._options import install_completion, option_use_external_storage
+from ._options import install_completion, option_graph_workers, \
+    option_lock_timeout, option_use_external_storage
 from ._version import check_version, print_version
 from .config import config
 from .dataset import dataset
@@ -175,6 +189,8 @@ yaml.add_representer(uuid.UUID, _uuid_representer)
     help='Location of the Renku directory.'
 )
 @option_use_external_storage
+@option_lock_timeout
+@option_graph_workers
 @click.option(
     '--disable-version-check',
     envvar='RENKU_DISABLE_VERSION_CHECK',
@@ -185,12 +201,16 @@ yaml.add_representer(uuid.UUID, _uuid_representer)
     help='Do not periodically check PyPI for a new version of renku.',
 )
 @click.pass_context
-def cli(ctx, path, renku_home, use_external_storage):
+def cli(
+    ctx, path, renku_home, use_external_storage, lock_timeout, graph_workers
+):
     """Check common Renku commands used in various situations."""
     ctx.obj = LocalClient(
         path=path,
         renku_home=renku_home,
         use_external_storage=use_external_storage,
+        lock_timeout=lock_timeout,
+        graph_workers=graph_workers,
     )
 
 
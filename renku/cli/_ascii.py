@@ -67,6 +67,9 @@ class DAG(object):
     short = attr.ib(default=True, converter=bool)
     """Display shortened version of the DAG."""
 
+    metrics = attr.ib(default=False, converter=bool)
+    """Display resources used by processes."""
+
     columns = attr.ib(default=attr.Factory(list))
     """List of columns representing nodes."""
 
@@ -146,6 +149,20 @@ class DAG(object):
                 )
             )
 
+        if self.metrics and isinstance(node, Process):
+            metrics = getattr(node.activity, 'metrics', None)
+            restored = getattr(node.activity, 'restored', False)
+            if metrics is None and part_of and not restored:
+                metrics = getattr(part_of, 'metrics', None)
+
+            if metrics is not None:
+                result.append(
+                    '{indentation} ({metrics})'.format(
+                        indentation=indentation,
+                        metrics=click.style(str(metrics), fg='cyan'),
+                    )
+                )
+
         parent = getattr(node, 'parent', None)
 
         if parent and hasattr(parent, 'members'):
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Reuse results of workflow steps."""
+
+import binascii
+import hashlib
+import json
+import os
+
+import attr
+import click
+from werkzeug.utils import cached_property
+
+from renku.models._snapshot import Snapshot
+from renku.models._sort import topological
+from renku.models.cwl._ascwl import ascwl
+
+
+def _digest(value):
+    """Return a stable digest of a JSON serializable value."""
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def _order(processes):
+    """Return process runs with producers before their consumers."""
+    producers = {path: run for run in processes for path in run.outputs}
+    parents = {
+        run: [
+            producers[path] for path in run.inputs
+            if path in producers and producers[path] is not run
+        ]
+        for run in processes
+    }
+    return list(reversed(topological(parents)))
+
+
+@attr.s(cmp=False)
+class StepCache:
+    """Content addressed cache of workflow step results.
+
+    A step is identified by its tool definition and by the role, path and
+    blob of every input, i.e. by everything that determines its command
+    line and the data it reads. The cache maps the identifier to the blobs
+    of the step outputs so that a hit is restored from the object database
+    instead of being recomputed.
+    """
+
+    client = attr.ib()
+    caches = attr.ib()
+    """Persistent caches used to look up results."""
+
+    hits = attr.ib(default=attr.Factory(list), init=False)
+    misses = attr.ib(default=attr.Factory(list), init=False)
+    restored = attr.ib(default=attr.Factory(set), init=False)
+    _blobs = attr.ib(default=attr.Factory(dict), init=False)
+    _entries = attr.ib(default=attr.Factory(dict), init=False)
+
+    @caches.default
+    def default_caches(self):
+        """Use the step cache of the client."""
+        return [self.client.step_cache]
+
+    @cached_property
+    def index(self):
+        """Return stat information of files in the index."""
+        return Snapshot.from_index(self.client.repo)
+
+    def _hash(self, filepath, path, write=False):
+        """Return blob of a file as it would be stored at the path.
+
+        Clean filters are applied, hence files tracked in an external
+        storage are represented by their pointers. The blob is written to
+        the object database only with ``write``.
+        """
+        args = ['--path={0}'.format(path), '--', str(filepath)]
+        if write:
+            args.insert(0, '-w')
+        return self.client.repo.git.hash_object(*args)
+
+    def _blob(self, path):
+        """Return blob of a file in the working directory.
+
+        Files not modified since they were indexed use the blob of their
+        index entry instead of being read.
+        """
+        if path not in self._blobs:
+            filepath = self.client.path / path
+            if not filepath.is_file():
+                blob = None
+            elif self.index.is_unchanged(path):
+                blob = self.client.repo.index.entries[(path, 0)].hexsha
+            else:
+                blob = self._hash(filepath, path)
+            self._blobs[path] = blob
+        return self._blobs[path]
+
+    def _has_blob(self, blob):
+        """Check if the blob is available in the object database."""
+        try:
+            return self.client.repo.odb.has_object(binascii.unhexlify(blob))
+        except (TypeError, ValueError):
+            return False
+
+    def key(self, process_run, produced=None):
+        """Return a cache key of the process run or ``None``.
+
+        :param produced: Known blobs of paths that are not yet present in
+            the working directory; ``None`` marks an unknown content.
+        """
+        produced = produced or {}
+
+        if process_run.path:
+            tool = self._blob(process_run.path)
+        else:
+            tool = _digest(ascwl(process_run.process))
+
+        if tool is None:
+            return
+
+        inputs = []
+        for path, usage in process_run.inputs.items():
+            if path in produced:
+                blob = produced[path]
+            else:
+                blob = self._blob(path)
+            if blob is None:
+                return
+            inputs.append([usage.role, path, blob])
+
+        return _digest([tool, sorted(inputs)])
+
+    def lookup(self, processes):
+        """Return cached output blobs of process runs without restoring."""
+        produced = {}
+        cached = {}
+
+        for process_run in _order(processes):
+            key = self.key(process_run, produced=produced)
+            outputs = next(
+                (cache[key] for cache in self.caches if key and key in cache),
+                None
+            )
+
+            if (
+                outputs and set(outputs) == set(process_run.outputs) and
+                all(self._has_blob(blob) for blob in outputs.values())
+            ):
+                self._entries[process_run] = key, outputs
+                self.hits.append(process_run)
+                produced.update(outputs)
+                cached.update(outputs)
+            else:
+                self.misses.append(process_run)
+                produced.update({path: None for path in process_run.outputs})
+
+        return cached
+
+    def restore(self, processes):
+        """Restore outputs of cached process runs and return their paths."""
+        restored = self.lookup(processes)
+
+        git = self.client.repo.git
+        for path, blob in restored.items():
+            filepath = self.client.path / path
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            # Smudge filters replace pointers with the stored content.
+            with filepath.open('wb') as fp:
+                git.cat_file(
+                    '--filters',
+                    '--path={0}'.format(path),
+                    blob,
+                    output_stream=fp
+                )
+
+        self.restored = set(restored)
+        return self.restored
+
+    def revert(self):
+        """Revert restored outputs to their committed content."""
+        repo = self.client.repo
+        tracked = {
+            path
+            for path in self.restored if (path, 0) in repo.index.entries
+        }
+        if tracked:
+            repo.git.checkout('HEAD', '--', *sorted(tracked))
+
+        for path in self.restored - tracked:
+            filepath = self.client.path / path
+            if filepath.is_file():
+                filepath.unlink()
+
+        self.restored = set()
+
+    def store(self, processes):
+        """Record output blobs of executed process runs.
+
+        Outputs are only hashed since the following commit writes the same
+        blobs, i.e. files in an external storage as pointers. Entries whose
+        blobs were never committed are misses on lookup.
+        """
+        cache = self.client.step_cache
+        produced = {}
+
+        for process_run in _order(processes):
+            if process_run in self.hits:
+                # Keep recently used entries in the bounded cache.
+                key, outputs = self._entries[process_run]
+                cache[key] = outputs
+                produced.update(outputs)
+                continue
+
+            outputs = {}
+            for path in process_run.outputs:
+                filepath = self.client.path / path
+                if filepath.is_file():
+                    outputs[path] = self._hash(filepath, path)
+                else:
+                    outputs[path] = None
+
+            # Inputs are keyed as before the execution.
+            key = self.key(process_run, produced=produced)
+            produced.update(outputs)
+            if key and None not in outputs.values():
+                cache[key] = outputs
+
+        cache.flush()
+
+    def checkpoint(self, processes, locations):
+        """Record outputs of process runs completed by a failed execution.
+
+        The outputs are never committed, hence their blobs are written to
+        the object database.
+
+        :param locations: Mapping from output paths to the files produced
+            outside of the working directory.
+        :return: Number of recorded process runs.
+        """
+        cache = self.client.checkpoint_cache
+        produced = {}
+        count = 0
+
+        for process_run in _order(processes):
+            if process_run in self.hits:
+                produced.update(self._entries[process_run][1])
+                continue
+
+            outputs = {}
+            for path in process_run.outputs:
+                location = locations.get(path)
+                if location and os.path.isfile(location):
+                    outputs[path] = self._hash(location, path, write=True)
+                else:
+                    outputs[path] = None
+
+            key = self.key(process_run, produced=produced)
+            if key and None not in outputs.values():
+                cache[key] = outputs
+                produced.update(outputs)
+                count += 1
+            else:
+                produced.update({path: None for path in process_run.outputs})
+
+        cache.flush()
+        return count
+
+    def report(self):
+        """Display restored steps and cache statistics."""
+        if self.hits:
+            paths = sorted(
+                path for process_run in self.hits
+                for path in process_run.outputs
+            )
+            click.echo(
+                'Restored from cache:\n\n\t{0}\n'.format(
+                    '\n\t'.join(
+                        click.style(path, fg='green') for path in paths
+                    )
+                )
+            )
+        click.echo(
+            'Step cache: {0} hit(s), {1} miss(es)'.format(
+                len(self.hits), len(self.misses)
+            )
+        )
@@ -46,7 +46,12 @@ def pass_local_client(
     ignore_std_streams=True,
     lock=None,
 ):
-    """Pass client from the current context to the decorated command."""
+    """Pass client from the current context to the decorated command.
+
+    The ``clean``, ``commit`` and ``lock`` arguments can be callables which
+    receive the keyword arguments of the command, e.g. to skip the commit
+    for a dry run.
+    """
     if method is None:
         return functools.partial(
             pass_local_client,
@@ -58,25 +63,35 @@ def pass_local_client(
             lock=lock,
         )
 
+    def resolve(value, kwargs):
+        """Return the value of an option for the command arguments."""
+        return value(kwargs) if callable(value) else value
+
     def new_func(*args, **kwargs):
         ctx = click.get_current_context()
         client = ctx.ensure_object(LocalClient)
         stack = contextlib.ExitStack()
 
+        clean_ = resolve(clean, kwargs)
+        commit_ = resolve(commit, kwargs)
+        lock_ = resolve(lock, kwargs)
+
         # Handle --isolation option:
-        if get_git_isolation():
+        isolation = get_git_isolation()
+        if isolation:
+            # The repository is locked only while the worktree is merged.
             client = stack.enter_context(client.worktree())
 
         transaction = client.transaction(
-            clean=clean,
+            clean=clean_,
             up_to_date=up_to_date,
-            commit=commit,
+            commit=commit_,
             commit_only=commit_only,
             ignore_std_streams=ignore_std_streams
         )
         stack.enter_context(transaction)
 
-        if lock or (lock is None and commit):
+        if not isolation and (lock_ or (lock_ is None and commit_)):
             stack.enter_context(client.lock)
 
         with stack:
@@ -17,91 +17,103 @@
 # limitations under the License.
 """Wrap CWL runner."""
 
+import contextlib
+import copy
+import errno
+import functools
+import hashlib
+import json
 import os
 import shutil
 import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote
 
+import attr
 import click
 
+from renku._compat import Path
+from renku.models.cwl._ascwl import ascwl
+from renku.models.cwl.types import PATH_OBJECTS
+from renku.models.provenance.metrics import ResourceUsage
+
 from ._echo import progressbar
 
 
-def execute(client, output_file, output_paths=None):
-    """Run the generated workflow using cwltool library."""
-    output_paths = output_paths or set()
+def _size(path):
+    """Return the size of a file or a directory in bytes."""
+    if not os.path.isdir(path):
+        return os.lstat(path).st_size
+    return sum(
+        os.lstat(os.path.join(root, name)).st_size
+        for root, _, names in os.walk(path) for name in names
+    )
 
-    import cwltool.factory
-    from cwltool import workflow
-    from cwltool.context import LoadingContext, RuntimeContext
-    from cwltool.utils import visit_class
 
-    def construct_tool_object(toolpath_object, *args, **kwargs):
-        """Fix missing locations."""
-        protocol = 'file://'
+def _copy_file(source, destination):
+    """Copy a file sharing its data blocks if the filesystems allow it."""
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is None:
+        return shutil.copy2(source, destination)
 
-        def addLocation(d):
-            if 'location' not in d and 'path' in d:
-                d['location'] = protocol + d['path']
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            while copy_file_range(src.fileno(), dst.fileno(), 2**30):
+                pass
+        except OSError as e:
+            if e.errno not in {errno.EXDEV, errno.ENOSYS, errno.EINVAL}:
+                raise
+            # Old kernels do not copy across filesystems.
+            dst.seek(0)
+            dst.truncate()
+            src.seek(0)
+            shutil.copyfileobj(src, dst)
+    shutil.copystat(source, destination)
+    return destination
 
-        visit_class(toolpath_object, ('File', 'Directory'), addLocation)
-        return workflow.default_make_tool(toolpath_object, *args, **kwargs)
 
-    argv = sys.argv
-    sys.argv = ['cwltool']
+def _relocate(source, destination):
+    """Move a file or a directory by renaming it if possible.
 
-    # Keep all environment variables.
-    runtime_context = RuntimeContext(
-        kwargs={
-            'rm_tmpdir': False,
-            'move_outputs': 'leave',
-            'preserve_entire_environment': True,
-        }
-    )
-    loading_context = LoadingContext(
-        kwargs={
-            'construct_tool_object': construct_tool_object,
-        }
+    The new content is first placed next to the destination, copying it if
+    it is on a different filesystem, so it replaces the destination at
+    once. An existing directory is restored if the replacement fails.
+    """
+    destination = str(destination)
+    staging = tempfile.mkdtemp(
+        dir=os.path.dirname(destination), prefix='.renku-'
     )
+    try:
+        staged = os.path.join(staging, 'new')
+        try:
+            os.rename(source, staged)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            if os.path.isdir(source):
+                shutil.copytree(source, staged, copy_function=_copy_file)
+            else:
+                _copy_file(source, staged)
 
-    factory = cwltool.factory.Factory(
-        loading_context=loading_context,
-        runtime_context=runtime_context,
-    )
-    process = factory.make(os.path.relpath(str(output_file)))
-    outputs = process()
-
-    sys.argv = argv
-
-    # Move outputs to correct location in the repository.
-    output_dirs = process.factory.executor.output_dirs
-
-    def remove_prefix(location, prefix='file://'):
-        if location.startswith(prefix):
-            return location[len(prefix):]
-        return location
-
-    locations = {
-        remove_prefix(output['location'])
-        for output in outputs.values()
-    }
-
-    with progressbar(
-        locations,
-        label='Moving outputs',
-    ) as bar:
-        for location in bar:
-            for output_dir in output_dirs:
-                if location.startswith(output_dir):
-                    output_path = location[len(output_dir):].lstrip(
-                        os.path.sep
-                    )
-                    destination = client.path / output_path
-                    if destination.is_dir():
-                        shutil.rmtree(str(destination))
-                        destination = destination.parent
-                    shutil.move(location, str(destination))
-                    continue
+        previous = None
+        if os.path.isdir(destination):
+            previous = os.path.join(staging, 'previous')
+            os.rename(destination, previous)
+
+        try:
+            os.replace(staged, destination)
+        except OSError:
+            if previous:
+                os.rename(previous, destination)
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
 
+
+def _remove_unmodified(client, output_paths):
+    """Keep unchanged outputs in the commit and display them."""
     unchanged_paths = client.remove_unmodified(output_paths)
     if unchanged_paths:
         click.echo(
@@ -111,3 +123,344 @@ def execute(client, output_file, output_paths=None):
                 )
             )
         )
+
+
+def _job_paths(job_order):
+    """Yield paths of files and directories used by a job."""
+    if isinstance(job_order, dict):
+        if job_order.get('class') in PATH_OBJECTS:
+            location = job_order.get('location') or job_order.get('path')
+            if location:
+                yield os.path.normpath(_remove_prefix(location))
+        for value in job_order.values():
+            yield from _job_paths(value)
+    elif isinstance(job_order, list):
+        for value in job_order:
+            yield from _job_paths(value)
+
+
+def _delay(run, paths, prefetch):
+    """Wait for paths before running a job."""
+
+    @functools.wraps(run)
+    def wrapper(*args, **kwargs):
+        prefetch.wait(paths)
+        return run(*args, **kwargs)
+
+    return wrapper
+
+
+def _measure(run, path, hooks):
+    """Record resources used by a job of the tool stored in the path."""
+
+    @functools.wraps(run)
+    def wrapper(*args, **kwargs):
+        snapshot = ResourceUsage.snapshot()
+        try:
+            return run(*args, **kwargs)
+        finally:
+            usage = ResourceUsage.since(snapshot)
+            if hooks.concurrent:
+                usage = usage.wall_time_only()
+            hooks.usage[path] = usage
+
+    return wrapper
+
+
+def _construct_tool_object(toolpath_object, loading_context, *args, **kwargs):
+    """Fix missing locations, measure jobs and wait for their inputs.
+
+    Inputs of jobs are pulled from a storage while other steps run.
+    """
+    from cwltool import workflow
+    from cwltool.command_line_tool import CommandLineTool
+    from cwltool.utils import visit_class
+
+    protocol = 'file://'
+
+    def addLocation(d):
+        if 'location' not in d and 'path' in d:
+            d['location'] = protocol + d['path']
+
+    visit_class(toolpath_object, ('File', 'Directory'), addLocation)
+    tool = workflow.default_make_tool(
+        toolpath_object, loading_context, *args, **kwargs
+    )
+
+    hooks = getattr(loading_context, 'hooks', None)
+    if hooks is not None and isinstance(tool, CommandLineTool):
+        make_jobs = tool.job
+
+        tool_path = unquote(_remove_prefix(tool.tool['id']).partition('#')[0])
+
+        def job(job_order, *args, **kwargs):
+            # Cached tools wait for inputs of the current execution.
+            prefetch = hooks.prefetch
+            paths = set(_job_paths(job_order)) if prefetch else set()
+            for runnable in make_jobs(job_order, *args, **kwargs):
+                if runnable is None:
+                    yield runnable
+                    continue
+
+                runnable.run = _measure(runnable.run, tool_path, hooks)
+                # Jobs of other steps are not blocked by the waiting.
+                if paths:
+                    runnable.run = _delay(runnable.run, paths, prefetch)
+                yield runnable
+
+        tool.job = job
+
+    return tool
+
+
+@attr.s
+class _Hooks:
+    """State of the current execution used by cached tools."""
+
+    prefetch = attr.ib(default=None)
+    concurrent = attr.ib(default=False)
+    usage = attr.ib(default=attr.Factory(dict))
+    """Resource usage of jobs by paths of their tools."""
+
+
+_LOADING_CONTEXT = None
+
+_TOOLS = OrderedDict()
+_TOOLS_LOCK = threading.Lock()
+_TOOLS_SIZE = 8
+
+
+def _loading_context():
+    """Return a copy of the loading context shared by all executions.
+
+    The CWL schema is parsed only once per process by cwltool. The document
+    loader is not shared since identifiers of in-memory documents with the
+    same content would clash in the loader index.
+    """
+    global _LOADING_CONTEXT
+
+    if _LOADING_CONTEXT is None:
+        from cwltool.context import LoadingContext
+
+        _LOADING_CONTEXT = LoadingContext(
+            kwargs={
+                'construct_tool_object': _construct_tool_object,
+            }
+        )
+
+    loading_context = copy.copy(_LOADING_CONTEXT)
+    loading_context.loader = None
+    # Copies made by cwltool for workflow steps share the hooks.
+    loading_context.hooks = _Hooks()
+    return loading_context
+
+
+def _document_key(document):
+    """Return a key of the CWL document in the tool cache."""
+    if isinstance(document, str):
+        stat = os.stat(document)
+        return os.path.realpath(document), stat.st_mtime_ns, stat.st_size
+    return hashlib.sha256(
+        json.dumps(document, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def _take_tool(key):
+    """Return a cached tool and its loading context or ``None``.
+
+    The tool is removed from the cache while it is executed, hence
+    concurrent executions of the same document load their own tool.
+    """
+    with _TOOLS_LOCK:
+        return _TOOLS.pop(key, None)
+
+
+def _release_tool(key, tool, loading_context):
+    """Keep the tool for following executions of the same document."""
+    # The hooks are shared by the tool and its steps.
+    loading_context.hooks.prefetch = None
+    loading_context.hooks.usage = {}
+    with _TOOLS_LOCK:
+        _TOOLS[key] = tool, loading_context
+        while len(_TOOLS) > _TOOLS_SIZE:
+            _TOOLS.popitem(last=False)
+
+
+def _remove_prefix(location, prefix='file://'):
+    """Return a filesystem path of the location."""
+    if location.startswith(prefix):
+        return location[len(prefix):]
+    return location
+
+
+def _output_locations(outputs, output_dirs):
+    """Map paths in the repository to locations of produced outputs."""
+    locations = {}
+    for output in outputs.values():
+        if not isinstance(output, dict) or 'location' not in output:
+            continue
+        location = _remove_prefix(output['location'])
+        for output_dir in output_dirs:
+            if location.startswith(output_dir):
+                output_path = location[len(output_dir):].lstrip(os.path.sep)
+                locations[output_path] = location
+    return locations
+
+
+def _input_batches(client, workflow):
+    """Yield input paths of workflow steps in the order of execution."""
+    inputs = {input_.id: input_ for input_ in workflow.inputs}
+    for step in reversed(workflow.topological_steps):
+        yield [
+            os.path.normpath(
+                os.path.join(
+                    str(client.workflow_path),
+                    str(inputs[source].default.path),
+                )
+            ) for source in step.in_.values() if source in inputs and
+            inputs[source].type in PATH_OBJECTS and inputs[source].default
+        ]
+
+
+def execute(
+    client,
+    workflow,
+    output_paths=None,
+    jobs=1,
+    checkpoint=None,
+    keep_going=False,
+    step_metrics=None,
+):
+    """Run the generated workflow using cwltool library.
+
+    The ``workflow`` is either a path to a CWL file or a workflow instance
+    which is passed to cwltool without serializing it to the disk.
+    Independent steps are executed concurrently if ``jobs`` is greater than
+    one. Return resources used by the workflow execution.
+
+    Every job is measured separately. If ``step_metrics`` is a dictionary,
+    resources used by steps of a workflow instance are stored in it by the
+    step identifiers. Only the wall time is known for concurrent steps.
+
+    If the execution fails, ``checkpoint`` is called with the locations of
+    outputs of the completed steps before the error is raised. Independent
+    steps still run to completion if ``keep_going`` is set.
+
+    Inputs of a workflow instance are pulled from the external storage in
+    the order of execution while the steps run. Every step waits only for
+    its own inputs. Inputs of a workflow file have to be pulled by the
+    caller.
+    """
+    output_paths = output_paths or set()
+
+    import cwltool.factory
+    from cwltool.context import RuntimeContext
+    from cwltool.executors import MultithreadedJobExecutor
+
+    prefetch = None
+    if isinstance(workflow, (str, Path)):
+        document = os.path.relpath(str(workflow))
+    else:
+        # Paths of an in-memory workflow are absolute.
+        document = ascwl(workflow, filter=lambda _, x: x is not None)
+        # The loader resolves references against a file URI of the document.
+        for step in document.get('steps', {}).values():
+            if isinstance(step.get('run'), str):
+                step['run'] = Path(step['run']).as_uri()
+        document['id'] = (
+            client.workflow_path / '{0}.cwl'.format(_document_key(document))
+        ).as_uri()
+
+        if client.has_external_storage:
+            prefetch = client.prefetch_paths_from_storage(
+                *_input_batches(client, workflow)
+            )
+
+    # Keep temporary files on the filesystem of the repository.
+    client.tmp_path.mkdir(parents=True, exist_ok=True)
+    tmpdir = tempfile.mkdtemp(dir=str(client.tmp_path))
+
+    argv = sys.argv
+    sys.argv = ['cwltool']
+
+    try:
+        # Keep all environment variables.
+        runtime_kwargs = {
+            'rm_tmpdir': False,
+            'move_outputs': 'leave',
+            'preserve_entire_environment': True,
+            'tmpdir_prefix': os.path.join(tmpdir, 'tmp'),
+            'tmp_outdir_prefix': os.path.join(tmpdir, 'out'),
+        }
+        if keep_going:
+            runtime_kwargs['on_error'] = 'continue'
+
+        runtime_context = RuntimeContext(kwargs=runtime_kwargs)
+        executor = None
+        if jobs > 1:
+            executor = MultithreadedJobExecutor()
+            # Every step requires at least one core by default.
+            executor.max_cores = jobs
+
+        key = _document_key(document)
+        tool, loading_context = _take_tool(key) or (None, _loading_context())
+        hooks = loading_context.hooks
+        hooks.prefetch = prefetch
+        hooks.concurrent = jobs > 1
+        hooks.usage = usage = {}
+
+        factory = cwltool.factory.Factory(
+            executor=executor,
+            loading_context=loading_context,
+            runtime_context=runtime_context,
+        )
+        if tool is None:
+            process = factory.make(document)
+        else:
+            process = cwltool.factory.Callable(tool, factory)
+
+        snapshot = ResourceUsage.snapshot()
+        try:
+            with contextlib.ExitStack() as stack:
+                stack.callback(_release_tool, key, process.t, loading_context)
+                if prefetch is not None:
+                    stack.enter_context(prefetch)
+                outputs = process()
+        except cwltool.factory.WorkflowStatus as error:
+            if checkpoint is not None:
+                checkpoint(
+                    _output_locations(
+                        error.out or {}, process.factory.executor.output_dirs
+                    )
+                )
+            raise
+        metrics = ResourceUsage.since(snapshot)
+
+        if step_metrics is not None and not isinstance(document, str):
+            for step in workflow.steps:
+                path = os.path.normpath(str(step.run))
+                if path in usage:
+                    step_metrics[step.id] = usage[path]
+
+        # Move outputs to correct location in the repository.
+        locations = _output_locations(
+            outputs, process.factory.executor.output_dirs
+        )
+        sizes = {
+            location: _size(location)
+            for location in set(locations.values())
+        }
+
+        with progressbar(
+            length=sum(sizes.values()),
+            label='Moving outputs',
+        ) as bar:
+            for output_path, location in sorted(locations.items()):
+                _relocate(location, client.path / output_path)
+                bar.update(sizes[location])
+    finally:
+        sys.argv = argv
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    _remove_unmodified(client, output_paths)
+    return metrics
@@ -22,12 +22,12 @@ import functools
 import click
 
 
-def ascii(graph):
+def ascii(graph, metrics=False):
     """Format graph as an ASCII art."""
     from .._ascii import DAG
     from .._echo import echo_via_pager
 
-    echo_via_pager(str(DAG(graph)))
+    echo_via_pager(str(DAG(graph, metrics=metrics)))
 
 
 def _jsonld(graph, format, *args, **kwargs):
@@ -317,8 +317,26 @@ def makefile(graph):
 
 
 def jsonld(graph):
-    """Format graph as JSON-LD file."""
-    click.echo(_jsonld(graph, 'expand'))
+    """Format graph as JSON-LD file.
+
+    Activities are expanded and written one at a time, hence the whole
+    document is never held in memory.
+    """
+    import json
+    from textwrap import indent
+
+    from pyld import jsonld
+    from renku.models._jsonld import asjsonld
+
+    separator = '['
+    for activity in graph.activities.values():
+        for node in jsonld.expand(asjsonld(activity)):
+            click.echo(
+                separator + '\n' + indent(json.dumps(node, indent=2), '  '),
+                nl=False,
+            )
+            separator = ','
+    click.echo('[]' if separator == '[' else '\n]')
 
 
 def jsonld_graph(graph):
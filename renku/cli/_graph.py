@@ -18,12 +18,13 @@
 """Graph builder."""
 
 import os
-from collections import OrderedDict, defaultdict, deque
+from collections import OrderedDict, defaultdict
 
 import attr
 
 from renku import errors
 from renku._compat import Path
+from renku.models._datastructures import NodeIndex
 from renku.models._git import Range
 from renku.models.cwl.command_line_tool import CommandLineTool
 from renku.models.cwl.parameter import InputParameter, WorkflowOutputParameter
@@ -75,6 +76,47 @@ def _safe_path(filepath, can_be_cwl=False):
     return True
 
 
+def _in_paths(filepath, paths):
+    """Check if the path is one of the paths or inside of their directory."""
+    return any(
+        path == os.curdir or filepath == path or
+        filepath.startswith(path + os.sep) for path in paths
+    )
+
+
+_WORKER_CLIENTS = {}
+
+
+def _process_commit(args):
+    """Process a commit in a worker and return what it read from Git.
+
+    Only changes of the commit and of its parent are read instead of a log
+    pass over the whole history in every worker.
+    """
+    path, hexsha = args
+
+    client = _WORKER_CLIENTS.get(path)
+    if client is None:
+        from renku.api import LocalClient
+        client = _WORKER_CLIENTS[path] = LocalClient(path=path)
+
+    commit = client.repo.commit(hexsha)
+    changes = {
+        changed.hexsha: client.commit_changes(changed, revision=None)
+        for changed in [commit] + list(commit.parents[:1])
+        if len(changed.parents) < 2
+    }
+
+    cached = set(client.previous_commit_cache.data)
+    client.process_commit(commit)
+
+    return client.commit_cache.get(hexsha), {
+        key: value
+        for key, value in client.previous_commit_cache.data.items()
+        if key not in cached
+    }, changes
+
+
 @attr.s(cmp=False)
 class Graph(object):
     """Represent the provenance graph."""
@@ -87,6 +129,13 @@ class Graph(object):
     _latest_commits = attr.ib(default=attr.Factory(dict))
     _nodes = attr.ib()
     _need_update = attr.ib(default=attr.Factory(dict))
+    _outdated_ids = attr.ib(default=attr.Factory(dict))
+    _outdated_nodes = attr.ib(default=attr.Factory(list))
+    _head = attr.ib(default=None)
+    _frontier = attr.ib(default=attr.Factory(dict))
+
+    workers = attr.ib()
+    """Number of processes used for processing commits."""
 
     cwl_prefix = attr.ib(init=False)
 
@@ -94,65 +143,107 @@ class Graph(object):
         """Derive basic informations."""
         self.cwl_prefix = self.client.cwl_prefix
 
+    @workers.default
+    def default_workers(self):
+        """Use the number of graph workers configured for the client."""
+        return getattr(self.client, 'graph_workers', 1)
+
     @_nodes.default
     def default_nodes(self):
         """Build node index."""
         self.generated = {}
-        nodes = OrderedDict()
+        nodes = NodeIndex()
 
         for commit in reversed(self._sorted_commits):
             try:
-                activity = self.activities[commit]
-
-                # for node in reversed(list(activity.nodes)):
-                #     key = (node.commit, node.path)
-                #     if key in nodes:
-                #         del nodes[key]
-                #     nodes[key] = node
-
-                nodes.update(((node.commit, node.path), node)
-                             for node in reversed(list(activity.nodes)))
-
-                if isinstance(activity, ProcessRun):
-                    self.generated.update({
-                        generation.entity._id: generation
-                        for generation in activity.generated
-                    })
-
+                self._index_activity(nodes, self.activities[commit])
             except KeyError:
                 pass
 
         return nodes
 
+    def _index_activity(self, nodes, activity):
+        """Add nodes and generations of an activity to the index."""
+        # for node in reversed(list(activity.nodes)):
+        #     key = (node.commit, node.path)
+        #     if key in nodes:
+        #         del nodes[key]
+        #     nodes[key] = node
+
+        nodes.update(((node.commit, node.path), node)
+                     for node in reversed(list(activity.nodes)))
+
+        if isinstance(activity, ProcessRun):
+            self.generated.update({
+                generation.entity._id: generation
+                for generation in activity.generated
+            })
+
     def need_update(self, node):
         """Return out-dated nodes."""
         if node is None:
             return
 
-        skip = True
-        if isinstance(node, ProcessRun):
-            node = node.association.plan
-            skip = False
+        mask = self._outdated_mask(node)
+        result = []
 
-        if node._id in self._need_update:
-            return self._need_update[node._id]
+        while mask:
+            bit = mask & -mask
+            result.append(self._outdated_nodes[bit.bit_length() - 1])
+            mask ^= bit
 
-        latest = self.latest(node)
-        if latest:
-            return self._need_update.setdefault(node._id, [node])
+        return result
 
-        need_update_ = []
+    def _outdated_mask(self, node):
+        """Return a bitset of out-dated nodes the given node depends on.
 
-        for parent in self.parents(node):
-            # Skip Collections if it is not an input
-            if skip and isinstance(parent, Collection):
-                continue
+        Nodes are visited in depth-first post-order using an explicit stack,
+        hence each node is resolved once and its parents before itself.
+        """
 
-            parent_updates = self.need_update(parent)
-            if parent_updates:
-                need_update_.extend(parent_updates)
+        def _resolve(node):
+            """Use the plan instead of the process run."""
+            if isinstance(node, ProcessRun):
+                return node.association.plan
+            return node
 
-        return self._need_update.setdefault(node._id, need_update_)
+        masks = self._need_update
+        pending = {}
+        stack = [_resolve(node)]
+
+        while stack:
+            current = stack[-1]
+            key = current._id
+
+            if key in masks:
+                stack.pop()
+            elif key in pending:
+                mask = 0
+                for parent in pending.pop(key):
+                    mask |= masks.get(parent._id, 0)
+                masks[key] = mask
+                stack.pop()
+            elif self.latest(current):
+                index = self._outdated_ids.get(key)
+                if index is None:
+                    index = self._outdated_ids[key] = len(self._outdated_nodes)
+                    self._outdated_nodes.append(current)
+                masks[key] = 1 << index
+                stack.pop()
+            else:
+                parents = [
+                    _resolve(parent) for parent in self.parents(current)
+                    # Skip Collections if it is not an input
+                    if not isinstance(parent, Collection)
+                ]
+                pending[key] = parents
+                # Push in reverse to resolve parents in their original order.
+                stack.extend(
+                    parent for parent in reversed(parents)
+                    if parent._id not in masks and parent._id not in pending
+                )
+
+        return masks[_resolve(node)._id]
 
     def parents(self, node):
         """Return parents for a given node."""
@@ -229,6 +320,16 @@ class Graph(object):
         """Return a relative path based on the client configuration."""
         return os.path.relpath(str(self.client.path / path))
 
+    def _index_paths(self, revision='HEAD'):
+        """Return paths tracked in the revision."""
+        if revision == 'HEAD':
+            index = self.client.repo.index
+        else:
+            from git import IndexFile
+            index = IndexFile.from_tree(self.client.repo, revision)
+
+        return [path for path, _ in index.entries.keys()]
+
     def dependencies(self, revision='HEAD', paths=None):
         """Return dependencies from a revision or paths."""
         result = []
@@ -236,13 +337,11 @@ class Graph(object):
         if paths:
             paths = (self.normalize_path(path) for path in paths)
         else:
-            if revision == 'HEAD':
-                index = self.client.repo.index
-            else:
-                from git import IndexFile
-                index = IndexFile.from_tree(self.client.repo, revision)
+            paths = self._index_paths(revision)
 
-            paths = (path for path, _ in index.entries.keys())
+        frontier = self._frontier = (
+            self._previous_frontier() if revision == 'HEAD' else {}
+        )
 
         for path in paths:
             try:
@@ -250,7 +349,7 @@ class Graph(object):
                     Usage.from_revision(
                         self.client,
                         path=path,
-                        revision=revision,
+                        revision=frontier.get(path, revision),
                     )
                 )
             except KeyError:
@@ -258,46 +357,249 @@ class Graph(object):
 
         return result
 
-    def process_dependencies(self, dependencies, visited=None):
-        """Process given dependencies."""
+    def _previous_frontier(self):
+        """Return last modifying commits of paths unchanged since last build.
+
+        Paths are looked up from the commit of their previous lookup, hence
+        only commits added since the last build are searched.
+        """
+        previous = self._previous_build(self.client.repo.head.commit)
+        frontier = self.client.graph_cache.get('frontier')
+        if not previous or not frontier:
+            return {}
+
+        changed = set()
+        for hexsha in previous[1]:
+            changed.update(
+                path for _, path in
+                self.client.commit_changes(self.client.get_commit(hexsha))
+            )
+
+        return {
+            path: hexsha
+            for path, hexsha in frontier.items() if path not in changed
+        }
+
+    def process_dependencies(
+        self, dependencies, visited=None, head=None, commits=None
+    ):
+        """Process given dependencies.
+
+        When the ``head`` commit is given, activities reachable from the
+        dependencies keep their order from the previous build and only
+        commits added since then are sorted. Activities of the previous
+        build which are no longer reachable are dropped. When a set of
+        ``commits`` SHAs is given, other commits of the repository are not
+        processed.
+        """
+        # Out-dated nodes are resolved again for the new dependencies.
+        self._latest_commits = {}
+        self._need_update = {}
+        self._outdated_ids = {}
+        self._outdated_nodes = []
+
         for dependency in dependencies:
             # We can't simply reuse information from submodules
             if dependency.client != self.client:
                 continue
             self._latest_commits[dependency.path] = dependency.commit
 
+        previous = self._previous_build(head)
         visited = visited or set()
-        queue = deque(dependencies)
 
-        while queue:
-            processing = queue.popleft()
+        frontier = list(dependencies)
+        clients = {id(self.client): self.client}
+        pool = None
 
-            if processing.commit in visited:
-                continue
+        try:
+            # Process the graph level by level in the breadth-first order.
+            while frontier:
+                pending = self._pending_commits(frontier, visited, commits)
+                if self.workers > 1 and len(pending) > 1:
+                    if pool is None:
+                        import multiprocessing as mp
+                        pool = mp.Pool(self.workers)
+                    self._prefetch_commits(pool, pending)
 
-            # Mark as visited:
-            visited.add(processing.commit)
+                queue, frontier = frontier, []
 
-            activity = processing.client.process_commit(processing.commit)
+                for processing in queue:
+                    if processing.commit in visited:
+                        continue
 
-            if activity is None:
+                    # Mark as visited:
+                    visited.add(processing.commit)
+
+                    if commits is not None and \
+                            processing.client is self.client and \
+                            processing.commit.hexsha not in commits:
+                        continue
+
+                    activity = self.activities.get(processing.commit)
+
+                    if activity is None:
+                        clients.setdefault(
+                            id(processing.client), processing.client
+                        )
+                        activity = processing.client.process_commit(
+                            processing.commit
+                        )
+
+                        if activity is None:
+                            continue
+
+                        self.activities[activity.commit] = activity
+
+                    # Iterate over parents.
+                    if isinstance(activity, ProcessRun):
+                        for entity in activity.qualified_usage:
+                            for member in entity.entities:
+                                if member.commit not in visited:
+                                    frontier.append(member)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        added = self._merge_commits(
+            *previous, reached=visited
+        ) if previous else None
+
+        if added is None:
+            from renku.models._sort import topological
+            self._sorted_commits = topological({
+                commit: activity.parents
+                for commit, activity in self.activities.items()
+            })
+            self._nodes = self.default_nodes()
+            order = [
+                commit.hexsha
+                for commit in self._sorted_commits if commit in self.activities
+            ]
+        else:
+            order = [commit.hexsha for commit in added] + previous[0]
+
+        if head is not None:
+            self._head = head
+            state = {
+                'head': head.hexsha,
+                'commits': order,
+                'frontier': dict(self._frontier),
+            }
+            state['frontier'].update(
+                (dependency.path, dependency.commit.hexsha)
+                for dependency in dependencies
+                if dependency.client == self.client
+            )
+            if self.client.graph_cache.data != state:
+                self.client.graph_cache.update(state)
+
+        # Persist processed commits for following invocations. Parsed CWL
+        # documents are not needed once the activities are built.
+        for client in clients.values():
+            client.flush_caches()
+            client.commit_cache.release()
+
+    def _pending_commits(self, dependencies, visited, commits=None):
+        """Return commits of dependencies without a cached activity."""
+        pending = OrderedDict()
+        for dependency in dependencies:
+            commit = dependency.commit
+            if commit in visited or commit in self.activities or \
+                    len(commit.parents) > 1 or \
+                    commit.hexsha in dependency.client.commit_cache:
                 continue
+            if commits is not None and dependency.client is self.client \
+                    and commit.hexsha not in commits:
+                continue
+            pending.setdefault(commit, dependency.client)
+        return pending
+
+    def _prefetch_commits(self, pool, pending):
+        """Process commits in worker processes and merge their caches."""
+        results = pool.map(
+            _process_commit,
+            [(str(client.path), commit.hexsha)
+             for commit, client in pending.items()],
+        )
+
+        # Results are merged in the order of the breadth-first search, hence
+        # activities are built without running Git again.
+        for (commit, client), (data, previous,
+                               changes) in zip(pending.items(), results):
+            if data is not None:
+                client.commit_cache[commit.hexsha] = data
+            if previous:
+                client.previous_commit_cache.update(previous)
+            client.update_commit_changes(changes)
+
+    def _previous_build(self, head):
+        """Return commit order of the last build and commits added since."""
+        if head is None:
+            return
+
+        state = self.client.graph_cache
+        last_head = state.get('head')
+        if last_head is None:
+            return
 
-            self.activities[activity.commit] = activity
+        from git import GitCommandError
 
-            # Iterate over parents.
-            if isinstance(activity, ProcessRun):
-                for entity in activity.qualified_usage:
-                    for member in entity.entities:
-                        if member.commit not in visited:
-                            queue.append(member)
+        repo = self.client.repo
+        try:
+            if not repo.is_ancestor(last_head, head.hexsha):
+                return
+            added = {
+                commit.hexsha
+                for commit in
+                repo.iter_commits('{0}..{1}'.format(last_head, head.hexsha))
+            }
+        except (GitCommandError, ValueError):
+            return
+
+        return state.get('commits', []), added
+
+    def _merge_commits(self, order, added, reached):
+        """Merge activities added since the last build into the index.
 
+        Activities of commits which were not reached are dropped. Return
+        newly sorted commits or ``None`` if the previous order can not be
+        reused.
+        """
         from renku.models._sort import topological
-        self._sorted_commits = topological({
+
+        indexed = [
+            commit
+            for commit in self._sorted_commits if commit in self.activities
+        ]
+        for commit in list(self.activities):
+            if commit not in reached:
+                del self.activities[commit]
+
+        known = set(order)
+        unsorted = {
             commit: activity.parents
             for commit, activity in self.activities.items()
-        })
-        self._nodes = self.default_nodes()
+            if commit.hexsha not in known
+        }
+        if any(commit.hexsha not in added for commit in unsorted):
+            return
+
+        commits = {commit.hexsha: commit for commit in self.activities}
+        previous = [commits[hexsha] for hexsha in order if hexsha in commits]
+        new = [
+            commit for commit in topological(unsorted) if commit in unsorted
+        ]
+        self._sorted_commits = new + previous
+
+        if indexed == previous:
+            # Only activities of new commits are added to the index.
+            for commit in reversed(new):
+                self._index_activity(self._nodes, self.activities[commit])
+        else:
+            self._nodes = self.default_nodes()
+
+        return new
 
     def build(
         self, revision='HEAD', paths=None, dependencies=None, can_be_cwl=False
@@ -308,12 +610,17 @@ class Graph(object):
         if dependencies is None:
             dependencies = self.dependencies(revision=revision, paths=paths)
 
-        ignore = {
-            commit
-            for commit in self.client.repo.iter_commits(interval.start)
-        } if interval.start else set()
+        # Only commits from the range are processed.
+        commits = set(
+            self.client.repo.git.rev_list(str(interval)).split()
+        ) if interval.start else None
 
-        self.process_dependencies(dependencies, visited=ignore)
+        # Only builds of all paths are persisted for following invocations.
+        self.process_dependencies(
+            dependencies,
+            head=None if interval.start or paths else interval.stop,
+            commits=commits,
+        )
 
         return {
             self._nodes.get((dependency.commit, dependency.path), dependency)
@@ -330,8 +637,25 @@ class Graph(object):
                 paths |= {path for path in activity.outputs.keys() if path}
         return paths
 
-    def build_status(self, revision='HEAD', can_be_cwl=False):
-        """Return files from the revision grouped by their status."""
+    def reachability(self):
+        """Return a reachability index of paths generated until ``HEAD``."""
+        cache = self.client.reachability_cache
+        index = Reachability.from_cache(cache)
+
+        if index is None or index.head != self.client.repo.head.commit.hexsha:
+            self.build()
+            index = Reachability.from_graph(self)
+            index.to_cache(cache)
+            cache.flush()
+
+        return index
+
+    def build_status(self, revision='HEAD', can_be_cwl=False, paths=None):
+        """Return files from the revision grouped by their status.
+
+        When paths are given, only their ancestors are processed and the
+        status is reported only for the given paths.
+        """
         status = {
             'up-to-date': {},
             'outdated': {},
@@ -339,8 +663,22 @@ class Graph(object):
             'deleted': {},
         }
 
-        dependencies = self.dependencies(revision=revision)
+        requested = {
+            self.normalize_path(path)
+            for path in paths
+        } if paths else None
+
+        if requested is not None:
+            # Directories are expanded to the files they contain.
+            paths = [
+                self.client.path / path
+                for path in self._index_paths(revision)
+                if _in_paths(path, requested)
+            ] or paths
+
+        dependencies = self.dependencies(revision=revision, paths=paths)
         current_files = self.build(
+            paths=paths,
             dependencies=dependencies,
             can_be_cwl=can_be_cwl,
         )
@@ -354,7 +692,8 @@ class Graph(object):
                 nodes = activity.nodes if can_be_cwl else activity.generated
 
                 for node in nodes:
-                    paths[node.path] = node
+                    if requested is None or _in_paths(node.path, requested):
+                        paths[node.path] = node
 
         # First find all up-to-date nodes.
         for node in paths.values():
@@ -376,6 +715,19 @@ class Graph(object):
             for node in need_update:
                 multiple_versions[node.path].add(node)
 
+        if requested is not None and multiple_versions:
+            # Include current versions of inputs outside of requested paths.
+            current_files = current_files | {
+                self._nodes.get((dependency.commit, dependency.path),
+                                dependency)
+                for dependency in self.dependencies(
+                    revision=revision,
+                    paths=[
+                        self.client.path / path for path in multiple_versions
+                    ],
+                )
+            }
+
         for node in current_files:
             if node.path in multiple_versions:
                 multiple_versions[node.path].add(node)
@@ -387,9 +739,13 @@ class Graph(object):
 
         # Build a list of used files that have been deleted.
         current_paths = {node.path for node in current_files}
+        nodes = self.nodes
+        if requested is not None:
+            current_paths |= set(self._index_paths(revision))
+            nodes = (node for node in nodes if _in_paths(node.path, requested))
         status['deleted'] = {
             node.path: node
-            for node in self.nodes
+            for node in nodes
             if _safe_path(node.path, can_be_cwl=can_be_cwl) and
             node.path not in current_paths and
             not ((self.client.path / node.path).exists() or
@@ -431,10 +787,13 @@ class Graph(object):
         output_paths=None,
         outputs=None,
         use_latest=True,
+        steps=None,
     ):
         """Serialize graph to CWL workflow.
 
         :param global_step_outputs: Make all step outputs global.
+        :param steps: Optional empty mapping filled with process runs and their
+            step identifiers.
         """
         if output_paths is None:
             output_paths = {
@@ -547,10 +906,12 @@ class Graph(object):
                         stack.append(process_run)
                         processes.add(process_run)
 
-        steps = {
+        if steps is None:
+            steps = {}
+        steps.update({
             tool: 'step_{0}'.format(tool_index)
             for tool_index, tool in enumerate(processes, 1)
-        }
+        })
 
         def _source_name(commit, path):
             """Find source name for a node."""
@@ -639,3 +1000,193 @@ class Graph(object):
             )
 
         return workflow
+
+
+def _iter_bits(mask):
+    """Yield indices of set bits."""
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+def _closure(edges):
+    """Return bitsets of nodes reachable from each node.
+
+    Paths can depend on each other in cycles and their positions do not
+    follow any dependency order. Tarjan's algorithm emits strongly connected
+    components in reverse topological order, hence every component is
+    resolved once from the already resolved components it points to.
+    """
+    reachable = [0] * len(edges)
+    discovered = [None] * len(edges)
+    lowlink = [0] * len(edges)
+    stack, on_stack = [], set()
+
+    counter = 0
+    for root in range(len(edges)):
+        if discovered[root] is not None:
+            continue
+
+        discovered[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges[root]))]
+
+        while work:
+            node, targets = work[-1]
+            for target in targets:
+                if discovered[target] is None:
+                    discovered[target] = lowlink[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(edges[target])))
+                    break
+                elif target in on_stack:
+                    lowlink[node] = min(lowlink[node], discovered[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] != discovered[node]:
+                    continue
+
+                component = []
+                while not component or component[-1] != node:
+                    component.append(stack.pop())
+                    on_stack.discard(component[-1])
+
+                # Members of a cycle reach each other through its edges.
+                mask = 0
+                for member in component:
+                    for target in edges[member]:
+                        mask |= (1 << target) | reachable[target]
+                for member in component:
+                    reachable[member] = mask
+
+    return reachable
+
+
+@attr.s(cmp=False)
+class Reachability(object):
+    """Index transitive dependencies between paths of the latest activities.
+
+    Paths are numbered and every path stores bitsets of its ancestors and
+    descendants, hence queries do not have to walk the provenance graph.
+    """
+
+    head = attr.ib()
+    paths = attr.ib(default=attr.Factory(list))
+    ancestor_masks = attr.ib(default=attr.Factory(list))
+    descendant_masks = attr.ib(default=attr.Factory(list))
+
+    _index = attr.ib(init=False)
+
+    def __attrs_post_init__(self):
+        """Index path positions."""
+        self._index = {path: index for index, path in enumerate(self.paths)}
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Create the index from a built graph."""
+        client = graph.client
+        inputs = {}
+
+        def _path(entity):
+            return str((entity.client.path / entity.path).relative_to(
+                client.path
+            ))
+
+        # Only the latest activity generating a path defines its inputs.
+        for commit in reversed(graph._sorted_commits):
+            activity = graph.activities.get(commit)
+            if not isinstance(activity, ProcessRun):
+                continue
+
+            used = {
+                _path(entity)
+                for usage in activity.qualified_usage
+                for entity in usage.entity.entities
+            }
+            for generation in activity.generated:
+                for entity in generation.entity.entities:
+                    inputs[_path(entity)] = used
+
+        paths = sorted(
+            set(inputs) | {path
+                           for used in inputs.values() for path in used}
+        )
+        index = {path: position for position, path in enumerate(paths)}
+
+        children = [set() for _ in paths]
+        parents = [set() for _ in paths]
+        for output, used in inputs.items():
+            for path in used:
+                if path != output:
+                    children[index[path]].add(index[output])
+                    parents[index[output]].add(index[path])
+
+        return cls(
+            head=graph._head.hexsha if graph._head else None,
+            paths=paths,
+            ancestor_masks=_closure(parents),
+            descendant_masks=_closure(children),
+        )
+
+    @classmethod
+    def from_cache(cls, cache):
+        """Load the index from a persistent cache."""
+        if 'head' not in cache:
+            return
+
+        return cls(
+            head=cache['head'],
+            paths=cache['paths'],
+            ancestor_masks=[int(mask, 16) for mask in cache['ancestors']],
+            descendant_masks=[int(mask, 16) for mask in cache['descendants']],
+        )
+
+    def to_cache(self, cache):
+        """Store the index in a persistent cache."""
+        cache.clear()
+        cache.update({
+            'head': self.head,
+            'paths': self.paths,
+            'ancestors': [
+                '{0:x}'.format(mask) for mask in self.ancestor_masks
+            ],
+            'descendants': [
+                '{0:x}'.format(mask) for mask in self.descendant_masks
+            ],
+        })
+
+    def _position(self, path):
+        """Return an index of the path or its closest indexed folder."""
+        path = os.path.normpath(str(path))
+        while path not in self._index:
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise KeyError(path)
+            path = parent
+        return self._index[path]
+
+    def ancestors(self, path):
+        """Return paths the given path is generated from."""
+        mask = self.ancestor_masks[self._position(path)]
+        return {self.paths[index] for index in _iter_bits(mask)}
+
+    def descendants(self, path):
+        """Return paths generated from the given path."""
+        mask = self.descendant_masks[self._position(path)]
+        return {self.paths[index] for index in _iter_bits(mask)}
+
+    def is_reachable(self, source, target):
+        """Check if the target path is generated from the source path."""
+        try:
+            mask = self.descendant_masks[self._position(source)]
+            return bool(mask & (1 << self._position(target)))
+        except KeyError:
+            return False
@@ -181,6 +181,51 @@ def option_siblings(func):
     return option_check_siblings(option_with_siblings(func))
 
 
+option_jobs = click.option(
+    '-j',
+    '--jobs',
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help='Number of workflow steps executed in parallel.',
+)
+
+option_stream = click.option(
+    '--stream',
+    is_flag=True,
+    default=False,
+    help='Connect steps through pipes instead of intermediate files.',
+)
+
+option_no_cache = click.option(
+    '--no-cache',
+    'cache',
+    is_flag=True,
+    flag_value=False,
+    default=True,
+    help='Recompute all steps instead of restoring cached results.',
+)
+
+option_lock_timeout = click.option(
+    '--lock-timeout',
+    envvar='RENKU_LOCK_TIMEOUT',
+    type=float,
+    default=0,
+    show_default=True,
+    metavar='<seconds>',
+    help='Time to wait for the repository lock held by another command.'
+)
+
+option_graph_workers = click.option(
+    '--graph-workers',
+    envvar='RENKU_GRAPH_WORKERS',
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    metavar='<number>',
+    help='Number of processes which process new commits of the graph.'
+)
+
 option_use_external_storage = click.option(
     'use_external_storage',
     '--external-storage/--no-external-storage',
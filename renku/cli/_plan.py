@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Estimate execution of generated workflows."""
+
+import heapq
+from collections import defaultdict
+
+import attr
+from werkzeug.utils import cached_property
+
+
+@attr.s(cmp=False)
+class ExecutionPlan:
+    """Estimate durations of workflow steps from their history.
+
+    The duration of a step is the mean wall time of previous runs of the
+    same tool. Steps of recorded workflow runs use their own wall time.
+    Workflows recorded without it are used only if they have a single step.
+    """
+
+    graph = attr.ib()
+    workflow = attr.ib()
+    steps = attr.ib()
+    """Mapping from process runs to step identifiers."""
+
+    cached = attr.ib(default=attr.Factory(set))
+    """Identifiers of steps that are restored from the step cache."""
+
+    @cached_property
+    def processes(self):
+        """Return process runs by their step identifiers."""
+        return {step_id: process for process, step_id in self.steps.items()}
+
+    @cached_property
+    def order(self):
+        """Return step identifiers in the order of execution."""
+        return [step.id for step in reversed(self.workflow.topological_steps)]
+
+    @cached_property
+    def parents(self):
+        """Return identifiers of steps that each step depends on."""
+        return {
+            step.id: sorted({
+                source.split('/')[0]
+                for source in step.in_.values() if '/' in source
+            })
+            for step in self.workflow.steps
+        }
+
+    @cached_property
+    def history(self):
+        """Return recorded wall times of tools in the graph.
+
+        Steps of workflow runs, e.g. from previous updates, are measured
+        separately.
+        """
+        samples = defaultdict(dict)
+        activities = set(self.graph.activities.values()) | set(self.steps)
+
+        for activity in activities:
+            subprocesses = getattr(activity, 'subprocesses', None) or {}
+            runs = list(subprocesses.values()) or [activity]
+
+            for run in runs:
+                metrics = getattr(run, 'metrics', None)
+                if metrics is None and len(runs) == 1:
+                    # Workflows recorded before steps were measured.
+                    metrics = getattr(activity, 'metrics', None)
+                if metrics is None or metrics.wall_time is None:
+                    continue
+
+                plan = run.association.plan
+                samples[plan.path][run._id] = metrics.wall_time
+
+        return samples
+
+    @cached_property
+    def durations(self):
+        """Return expected durations of steps or ``None`` if unknown."""
+        durations = {}
+        for step_id in self.order:
+            process = self.processes[step_id]
+            samples = list(self.history.get(process.path, {}).values())
+
+            if step_id in self.cached:
+                durations[step_id] = 0.0
+            elif samples:
+                durations[step_id] = sum(samples) / len(samples)
+            else:
+                durations[step_id] = None
+        return durations
+
+    def _duration(self, step_id):
+        """Return the expected duration counting unknown ones as zero."""
+        return self.durations[step_id] or 0.0
+
+    def critical_path(self):
+        """Return the expected duration and steps of the longest chain."""
+        finish, previous = {}, {}
+
+        for step_id in self.order:
+            start = 0.0
+            for parent in self.parents[step_id]:
+                if previous.get(step_id) is None or finish[parent] > start:
+                    start = finish[parent]
+                    previous[step_id] = parent
+            finish[step_id] = start + self._duration(step_id)
+
+        if not finish:
+            return 0.0, []
+
+        step_id = max(self.order, key=lambda step_id: finish[step_id])
+        duration, path = finish[step_id], []
+        while step_id is not None:
+            path.append(step_id)
+            step_id = previous.get(step_id)
+
+        return duration, list(reversed(path))
+
+    def wall_time(self, jobs=1):
+        """Return the expected wall time with ``jobs`` concurrent steps.
+
+        Ready steps are started in the order of their remaining critical
+        path, which approximates the behavior of the parallel executor.
+        """
+        index = {
+            step_id: position
+            for position, step_id in enumerate(self.order)
+        }
+        children = defaultdict(list)
+        for step_id, parents in self.parents.items():
+            for parent in parents:
+                children[parent].append(step_id)
+
+        rank = {}
+        for step_id in reversed(self.order):
+            rank[step_id] = self._duration(step_id) + max(
+                (rank[child] for child in children[step_id]), default=0.0
+            )
+
+        pending = {
+            step_id: len(parents)
+            for step_id, parents in self.parents.items()
+        }
+        ready = [(-rank[step_id], index[step_id], step_id)
+                 for step_id, count in pending.items() if not count]
+        heapq.heapify(ready)
+
+        running, now = [], 0.0
+        while ready or running:
+            while ready and len(running) < jobs:
+                _, position, step_id = heapq.heappop(ready)
+                heapq.heappush(
+                    running,
+                    (now + self._duration(step_id), position, step_id),
+                )
+
+            now, _, step_id = heapq.heappop(running)
+            for child in children[step_id]:
+                pending[child] -= 1
+                if not pending[child]:
+                    heapq.heappush(ready, (-rank[child], index[child], child))
+
+        return now
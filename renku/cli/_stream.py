@@ -0,0 +1,526 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Stream intermediate files between workflow steps."""
+
+import contextlib
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import attr
+import click
+from werkzeug.utils import cached_property
+
+from renku import errors
+from renku._compat import Path
+from renku._contexts import chdir
+from renku.models._sort import topological
+from renku.models.cwl._ascwl import CWLClass
+from renku.models.cwl.command_line_tool import CommandLineTool
+from renku.models.cwl.types import File
+from renku.models.provenance.metrics import ResourceUsage
+
+from ._cwl import _remove_unmodified
+
+
+def _input_id(expression):
+    """Return an input identifier referenced by ``$(inputs.<id>...)``."""
+    if expression.startswith('$(inputs.') and expression.endswith(')'):
+        return expression[len('$(inputs.'):-1].split('.')[0]
+
+
+def _redirect(argv, streams):
+    """Return arguments running the command with redirected streams."""
+    return [
+        'sh', '-c', 'exec "$@"' + ''.join(
+            ' {0} {1}'.
+            format(CommandLineTool.STD_STREAMS_REPR[name], shlex.quote(path))
+            for name, path in sorted(streams.items())
+        ), 'sh'
+    ] + list(argv)
+
+
+def _drain(fd, reader):
+    """Discard data left in a pipe after its reader has finished.
+
+    The read end is held open by renku, hence the writing process neither
+    fails nor blocks if the reader does not read the whole stream.
+    """
+    try:
+        reader.wait()
+        while os.read(fd, 65536):
+            pass
+    finally:
+        os.close(fd)
+
+
+def _group(order, parents, edges):
+    """Merge steps connected by edges and return groups in order.
+
+    :raises ValueError: If groups depend on each other.
+    """
+    groups = {step_id: (step_id, ) for step_id in order}
+    for producer, consumer in edges:
+        merged = tuple(
+            step_id for step_id in order
+            if step_id in groups[producer] or step_id in groups[consumer]
+        )
+        for step_id in merged:
+            groups[step_id] = merged
+
+    dependencies = defaultdict(set)
+    for step_id, group in groups.items():
+        dependencies[group] |= {groups[parent]
+                                for parent in parents[step_id]} - {group}
+
+    return list(reversed(topological(dependencies)))
+
+
+@attr.s(cmp=False)
+class Command:
+    """Command line and standard streams of a workflow step."""
+
+    argv = attr.ib()
+    streams = attr.ib()
+    success_codes = attr.ib()
+    pipes = attr.ib(default=attr.Factory(dict))
+    """Streamed outputs read by the command and paths of their pipes."""
+    stdout = attr.ib(default=None)
+    """Streamed output written to the standard output."""
+
+
+@attr.s(cmp=False)
+class StreamingPlan:
+    """Connect steps of a workflow through pipes.
+
+    An output written to the standard output of a step is streamed if it
+    was not requested and exactly one other step consumes it. Both steps
+    are started at once and the consumer reads the output from a pipe
+    instead of its file, hence the output is never written. Only workflows
+    of command line tools without requirements and hints are supported.
+    """
+
+    client = attr.ib()
+    workflow = attr.ib()
+    requested_paths = attr.ib(converter=set)
+
+    @cached_property
+    def steps(self):
+        """Return workflow steps by their identifiers."""
+        return {step.id: step for step in self.workflow.steps}
+
+    @cached_property
+    def order(self):
+        """Return step identifiers in the order of execution."""
+        return [step.id for step in reversed(self.workflow.topological_steps)]
+
+    @cached_property
+    def parents(self):
+        """Return identifiers of steps that each step depends on."""
+        return {
+            step.id: {
+                source.split('/')[0]
+                for source in step.in_.values() if '/' in source
+            }
+            for step in self.workflow.steps
+        }
+
+    @cached_property
+    def consumers(self):
+        """Return identifiers of steps consuming each step output."""
+        consumers = defaultdict(set)
+        for step in self.workflow.steps:
+            for source in step.in_.values():
+                if '/' in source:
+                    consumers[source].add(step.id)
+        return consumers
+
+    @cached_property
+    def tools(self):
+        """Return tools by step identifiers."""
+        tools = {}
+        for step in self.workflow.steps:
+            tool = step.run
+            if isinstance(tool, (str, Path)):
+                tool = CWLClass.from_yaml(Path(tool))
+            tools[step.id] = tool
+        return tools
+
+    @cached_property
+    def unsupported(self):
+        """Return identifiers of steps that can not be executed."""
+        return sorted(
+            step_id for step_id, tool in self.tools.items()
+            if not isinstance(tool, CommandLineTool) or tool.requirements or
+            tool.hints
+        )
+
+    def _values(self, step_id, outputs, pipes=None):
+        """Return values of tool inputs of a step."""
+        pipes = pipes or {}
+        inputs = {input_.id: input_ for input_ in self.workflow.inputs}
+        step = self.steps[step_id]
+
+        values = {}
+        for input_ in self.tools[step_id].inputs:
+            source = step.in_.get(input_.id)
+            if source is None:
+                values[input_.id] = input_.default
+            elif source in pipes:
+                values[input_.id] = File(path=Path(pipes[source]))
+            elif '/' in source:
+                path = outputs.get(source)
+                values[input_.id] = File(
+                    path=self.client.path / path
+                ) if path else None
+            else:
+                values[input_.id] = inputs[source].default
+        return values
+
+    @cached_property
+    def outputs(self):
+        """Return paths of step outputs relative to the repository."""
+        outputs = {}
+        for step_id in self.order:
+            tool = self.tools[step_id]
+            if step_id in self.unsupported:
+                outputs.update(('{0}/{1}'.format(step_id, output.id), None)
+                               for output in tool.outputs)
+                continue
+
+            values = self._values(step_id, outputs)
+
+            for output in tool.outputs:
+                if output.type in {'stdout', 'stderr'}:
+                    path = getattr(tool, output.type)
+                elif output.outputBinding and output.outputBinding.glob:
+                    glob = output.outputBinding.glob
+                    input_id = _input_id(glob)
+                    path = values.get(input_id) if input_id else glob
+                else:
+                    path = None
+
+                outputs['{0}/{1}'.format(step_id, output.id)
+                        ] = (path if isinstance(path, str) else None)
+        return outputs
+
+    @cached_property
+    def streams(self):
+        """Return step outputs connected through pipes."""
+        streams = set()
+        for step_id in self.order:
+            if step_id in self.unsupported:
+                continue
+
+            for output in self.tools[step_id].outputs:
+                source = '{0}/{1}'.format(step_id, output.id)
+                path = self.outputs[source]
+                if (
+                    output.type == 'stdout' and path and
+                    path not in self.requested_paths and
+                    len(self.consumers[source] - {step_id}) == 1
+                ):
+                    streams.add(source)
+
+        try:
+            _group(self.order, self.parents, self._edges(streams))
+        except ValueError:
+            # Concurrent steps would wait for each other.
+            return set()
+        return streams
+
+    def _edges(self, streams):
+        """Return producers and consumers of streamed outputs."""
+        return [(
+            source.split('/')[0],
+            next(iter(self.consumers[source])),
+        ) for source in sorted(streams)]
+
+    @cached_property
+    def groups(self):
+        """Return lists of step identifiers executed concurrently."""
+        return _group(self.order, self.parents, self._edges(self.streams))
+
+    @property
+    def streamed_paths(self):
+        """Return paths of outputs connected through pipes."""
+        return {self.outputs[source] for source in self.streams}
+
+    def _locations(self, groups):
+        """Return locations of outputs written by steps of groups."""
+        return {
+            path: str(self.client.path / path)
+            for group in groups for step_id in group
+            for source, path in self.outputs.items()
+            if path and source.split('/')[0] == step_id
+        }
+
+    def _revert(self):
+        """Restore outputs written by a failed execution."""
+        repo = self.client.repo
+        paths = {path for path in self.outputs.values() if path}
+        tracked = {path for path in paths if (path, 0) in repo.index.entries}
+        if tracked:
+            repo.git.checkout('HEAD', '--', *sorted(tracked))
+
+        for path in paths - tracked:
+            filepath = self.client.path / path
+            if filepath.is_file():
+                filepath.unlink()
+
+    def _inputs(self, group):
+        """Return paths of workflow inputs read by steps of a group."""
+        inputs = {input_.id: input_ for input_ in self.workflow.inputs}
+        return [
+            os.path.normpath(
+                os.path.join(
+                    str(self.client.workflow_path),
+                    str(inputs[source].default.path),
+                )
+            ) for step_id in group
+            for source in self.steps[step_id].in_.values()
+            if source in inputs and isinstance(inputs[source].default, File)
+        ]
+
+    def command(self, step_id, pipes=None):
+        """Return the command of a step reading and writing pipes."""
+        pipes = pipes or {}
+        tool = self.tools[step_id]
+        values = self._values(step_id, self.outputs, pipes=pipes)
+        tool = attr.evolve(
+            tool,
+            inputs=[
+                attr.evolve(input_, default=values[input_.id])
+                for input_ in tool.inputs
+            ],
+        )
+
+        streams = {}
+        with chdir(str(self.client.path)):
+            argv = tool.to_argv()
+            if tool.stdin:
+                streams['stdin'] = os.path.abspath(
+                    str(values[_input_id(tool.stdin)])
+                )
+
+        stdout = None
+        for output in tool.outputs:
+            if output.type in {'stdout', 'stderr'}:
+                source = '{0}/{1}'.format(step_id, output.id)
+                if source in pipes:
+                    stdout = source
+                else:
+                    streams[output.type] = str(
+                        self.client.path / getattr(tool, output.type)
+                    )
+
+        return Command(
+            argv=argv,
+            streams=streams,
+            success_codes=tool.successCodes or [0],
+            pipes={
+                source: pipes[source]
+                for source in self.steps[step_id].in_.values()
+                if source in pipes
+            },
+            stdout=stdout,
+        )
+
+    def _run(self, commands):
+        """Run commands at once and wait for all of them.
+
+        Streamed outputs are written to anonymous pipes. Consumers inherit
+        the read end and open it through a link to ``/dev/fd``, which does
+        not block even if the producer has already finished.
+        """
+        processes = {}
+        fds = {}
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            try:
+                for command in commands:
+                    if command.stdout:
+                        fds[command.stdout] = os.pipe()
+
+                for command in commands:
+                    for source, path in command.pipes.items():
+                        os.symlink('/dev/fd/{0}'.format(fds[source][0]), path)
+                    for name, path in command.streams.items():
+                        if name != 'stdin':
+                            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                    process = subprocess.Popen(
+                        _redirect(command.argv, command.streams),
+                        cwd=str(self.client.path),
+                        stdin=subprocess.DEVNULL,
+                        stdout=fds[command.stdout][1]
+                        if command.stdout else None,
+                        pass_fds=[fds[source][0] for source in command.pipes],
+                    )
+                    processes[process] = command
+
+                # Only producers keep the write ends open.
+                drains = []
+                for process, command in processes.items():
+                    for source in command.pipes:
+                        read, write = fds.pop(source)
+                        os.close(write)
+                        drains.append(executor.submit(_drain, read, process))
+
+                running = dict(processes)
+                while running:
+                    for process, command in list(running.items()):
+                        returncode = process.poll()
+                        if returncode is None:
+                            continue
+                        del running[process]
+
+                        if returncode not in command.success_codes:
+                            raise errors.InvalidSuccessCode(
+                                returncode,
+                                success_codes=command.success_codes
+                                if command.success_codes != [0] else None,
+                            )
+                    if running:
+                        time.sleep(0.01)
+
+                for drain in drains:
+                    drain.result()
+            finally:
+                for process in processes:
+                    if process.poll() is None:
+                        process.kill()
+                        process.wait()
+                for read, write in fds.values():
+                    os.close(read)
+                    os.close(write)
+
+    def execute(self, output_paths=None, checkpoint=None):
+        """Execute the workflow and return its resource usage.
+
+        Streamed outputs are recorded by the workflow only. Their committed
+        versions are kept since the outputs are never written. If a step
+        fails, ``checkpoint`` is called with the locations of outputs of the
+        groups completed before and the outputs are restored to their
+        committed content.
+        """
+        output_paths = set(output_paths or ())
+
+        self.client.tmp_path.mkdir(parents=True, exist_ok=True)
+        tmpdir = tempfile.mkdtemp(dir=str(self.client.tmp_path))
+        completed = []
+        try:
+            pipes = {}
+            for index, source in enumerate(sorted(self.streams)):
+                # Keep the name since tools might check the extension.
+                directory = os.path.join(tmpdir, str(index))
+                os.mkdir(directory)
+                pipes[source] = os.path.join(
+                    directory, os.path.basename(self.outputs[source])
+                )
+
+            prefetch = None
+            if self.client.has_external_storage:
+                prefetch = self.client.prefetch_paths_from_storage(
+                    *(self._inputs(group) for group in self.groups)
+                )
+
+            snapshot = ResourceUsage.snapshot()
+            with contextlib.ExitStack() as stack:
+                if prefetch is not None:
+                    stack.enter_context(prefetch)
+                for group in self.groups:
+                    if prefetch is not None:
+                        prefetch.wait(self._inputs(group))
+                    self._run([
+                        self.command(step_id, pipes) for step_id in group
+                    ])
+                    completed.append(group)
+            metrics = ResourceUsage.since(snapshot)
+        except Exception:
+            if checkpoint is not None:
+                checkpoint(self._locations(completed))
+            self._revert()
+            raise
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        click.echo(
+            'Streamed files:\n\n\t{0}\n'.format(
+                '\n\t'.join(
+                    click.style(path, fg='blue')
+                    for path in sorted(self.streamed_paths)
+                )
+            )
+        )
+
+        _remove_unmodified(self.client, output_paths - self.streamed_paths)
+        return metrics
+
+
+def execute(
+    client,
+    workflow,
+    requested_paths,
+    output_paths=None,
+    jobs=1,
+    checkpoint=None,
+    keep_going=False,
+    step_metrics=None,
+):
+    """Run the workflow streaming intermediate files if it is possible.
+
+    Other workflows are executed by cwltool with the remaining arguments.
+    Streamed steps always stop at the first failure and they are measured
+    only together, hence ``step_metrics`` is left empty for them.
+
+    :raises errors.UsageError: If steps connected through pipes would be
+        executed with more than one job or the workflow contains steps that
+        can not be executed without cwltool.
+    """
+    plan = StreamingPlan(client, workflow, requested_paths)
+    if plan.streams:
+        if jobs > 1:
+            raise errors.UsageError(
+                'Streamed steps can not be executed with "--jobs".'
+            )
+        if plan.unsupported:
+            raise errors.UsageError(
+                'Streamed workflows support only command line tools without '
+                'requirements and hints: {0}'.format(
+                    ', '.join(plan.unsupported)
+                )
+            )
+        return plan.execute(output_paths=output_paths, checkpoint=checkpoint)
+
+    click.echo('No intermediate files can be streamed.')
+
+    from ._cwl import execute
+    return execute(
+        client,
+        workflow,
+        output_paths=output_paths,
+        jobs=jobs,
+        checkpoint=checkpoint,
+        keep_going=keep_going,
+        step_metrics=step_metrics,
+    )
@@ -45,6 +45,17 @@ Provenance examples
    Show the history of files ``D`` and ``E`` as it looked in the commit
    ``e3f0bd5a``.
 
+Resource usage
+~~~~~~~~~~~~~~
+
+Use the ``--metrics`` option to display the wall clock time, CPU time, peak
+memory usage and number of bytes read and written by every process in the
+``ascii`` format. The other formats always contain them.
+
+.. code-block:: console
+
+   $ renku log --metrics B
+
 Output formats
 ~~~~~~~~~~~~~~
 
@@ -65,7 +76,6 @@ using the :program:`dot` program.
 """
 
 import click
-from git import NULL_TREE
 
 from ._client import pass_local_client
 from ._format.graph import FORMATS
@@ -86,9 +96,15 @@ from ._graph import Graph
     default=False,
     help='Display commands without output files.'
 )
+@click.option(
+    '--metrics',
+    is_flag=True,
+    default=False,
+    help='Display resources used by processes.'
+)
 @click.argument('paths', type=click.Path(exists=True), nargs=-1)
 @pass_local_client
-def log(client, revision, format, no_output, paths):
+def log(client, revision, format, no_output, metrics, paths):
     """Show logs for a file."""
     graph = Graph(client)
     if not paths:
@@ -100,12 +116,15 @@ def log(client, revision, format, no_output, paths):
 
         commit = client.repo.rev_parse(stop)
         paths = (
-            str(client.path / item.a_path)
-            for item in commit.diff(commit.parents or NULL_TREE)
-            # if not item.deleted_file
+            str(client.path / path)
+            for _, path in client.commit_changes(commit, revision=stop)
+            # if change_type != 'D'
         )
 
     # NOTE shall we warn when "not no_output and not paths"?
     graph.build(paths=paths, revision=revision, can_be_cwl=no_output)
 
-    FORMATS[format](graph)
+    if format == 'ascii':
+        FORMATS[format](graph, metrics=metrics)
+    else:
+        FORMATS[format](graph)
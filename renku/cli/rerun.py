@@ -39,21 +39,83 @@ Recreate a specific output file by running:
 If you would like to recreate a file which was one of several produced by
 a tool, then these files must be recreated as well. See the explanation in
 :ref:`updating siblings <cli-update-with-siblings>`.
+
+Changing inputs
+~~~~~~~~~~~~~~~
+
+Inputs of the generated workflow are listed with ``--show-inputs``. They
+can be changed interactively with ``--edit-inputs`` or by their identifier
+using ``--set``.
+
+.. code-block:: console
+
+   $ renku rerun --show-inputs C
+   input_1: A
+   input_2: 0.1
+   $ renku rerun --set input_2=0.5 C
+
+Parameter sweeps
+~~~~~~~~~~~~~~~~
+
+A sweep file lists input values of several variants. Values in the
+``grid`` section are combined with each other and the ``variants`` section
+adds individual variants. File inputs are relative to the repository root.
+
+.. code-block:: yaml
+
+   grid:
+     input_2: [0.1, 0.5]
+     input_3: [10, 100]
+   variants:
+     - input_2: 1.0
+       input_3: 1
+
+Each variant is executed in a worktree from the pool used by isolated
+commands and its result is committed to a separate branch. The current
+branch is not changed. The ``--workers`` option sets how many variants are
+executed at once.
+
+.. code-block:: console
+
+   $ renku rerun --sweep sweep.yml --workers 4 C
+   Variant 1 (input_2=0.1, input_3=10): renku/rerun/sweep/.../1
+   ...
+
+Parallel execution
+~~~~~~~~~~~~~~~~~~
+
+Independent steps can be executed in parallel using the ``--jobs`` option.
+Intermediate files that are read by a single step can be streamed through
+pipes instead of being written using the ``--stream`` option. See
+:ref:`cli-update` for details.
 """
 
+import contextlib
+import itertools
 import os
+import subprocess
 import sys
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 
+from renku import errors
 from renku._compat import Path
 from renku.models.cwl._ascwl import ascwl
 from renku.models.cwl.types import File
 
 from ._client import pass_local_client
 from ._graph import Graph
-from ._options import option_siblings
+from ._options import option_jobs, option_siblings, option_stream
+
+INPUT_TYPES = {
+    'int': int,
+    'string': str,
+    'File': lambda x: File(path=Path(x).resolve()),
+}
+"""Convert input values by their type."""
 
 
 def _format_default(client, value):
@@ -79,13 +141,8 @@ def show_inputs(client, workflow):
 
 def edit_inputs(client, workflow):
     """Edit workflow inputs."""
-    types = {
-        'int': int,
-        'string': str,
-        'File': lambda x: File(path=Path(x).resolve()),
-    }
     for input_ in workflow.inputs:
-        convert = types.get(input_.type, str)
+        convert = INPUT_TYPES.get(input_.type, str)
         input_.default = convert(
             click.prompt(
                 '{0.id} ({0.type})'.format(input_),
@@ -95,6 +152,142 @@ def edit_inputs(client, workflow):
     return workflow
 
 
+def set_inputs(workflow, overrides):
+    """Set workflow inputs from ``ID=VALUE`` pairs."""
+    inputs = {input_.id: input_ for input_ in workflow.inputs}
+    for override in overrides:
+        input_id, separator, value = override.partition('=')
+        if not separator or input_id not in inputs:
+            raise errors.UsageError(
+                'Unknown workflow input "{0}".'.format(override)
+            )
+
+        input_ = inputs[input_id]
+        try:
+            input_.default = INPUT_TYPES.get(input_.type, str)(value)
+        except ValueError:
+            raise errors.UsageError(
+                'Invalid value of "{0}" ({1}).'.format(input_id, input_.type)
+            )
+    return workflow
+
+
+def _variants(path):
+    """Return input values of variants defined in a sweep file."""
+    import yaml
+
+    with open(path, 'r') as fp:
+        data = yaml.safe_load(fp) or {}
+
+    if not isinstance(data, dict):
+        raise errors.UsageError('Invalid sweep file "{0}".'.format(path))
+
+    grid = data.get('grid') or {}
+    keys = sorted(grid)
+    values = [
+        grid[key] if isinstance(grid[key], list) else [grid[key]]
+        for key in keys
+    ]
+    variants = [
+        dict(zip(keys, combination))
+        for combination in itertools.product(*values)
+    ] if keys else []
+    variants.extend(data.get('variants') or [])
+
+    if not variants or not all(
+        isinstance(variant, dict) for variant in variants
+    ):
+        raise errors.UsageError(
+            'Sweep file "{0}" does not define variants.'.format(path)
+        )
+    return variants
+
+
+def sweep(client, workflow, variants, args, workers=1):
+    """Rerun each variant in a pooled worktree and commit it to a branch.
+
+    Variants are executed by separate processes, hence they do not share
+    the working directory nor standard streams.
+    """
+    inputs = {input_.id for input_ in workflow.inputs}
+    for variant in variants:
+        unknown = set(variant) - inputs
+        if unknown:
+            raise errors.UsageError(
+                'Unknown workflow inputs: {0}'.format(
+                    ', '.join(sorted(unknown))
+                )
+            )
+
+    prefix = 'renku/rerun/sweep/' + uuid.uuid4().hex
+    head = client.repo.head.commit.hexsha
+    lock = threading.Lock()
+
+    def execute(index, variant):
+        """Execute a variant and return its branch and output."""
+        branch = '{0}/{1}'.format(prefix, index)
+
+        stack = contextlib.ExitStack()
+
+        # Git does not support concurrent changes of worktrees.
+        with lock:
+            path = stack.enter_context(
+                client.pooled_worktree(branch, commit=head)
+            )
+
+        try:
+            argv = [sys.executable, '-m', 'renku', 'rerun']
+            for key, value in sorted(variant.items()):
+                argv.extend(['--set', '{0}={1}'.format(key, value)])
+
+            process = subprocess.run(
+                argv + list(args),
+                cwd=str(path),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+        finally:
+            with lock:
+                stack.close()
+
+        if process.returncode != 0:
+            with lock:
+                client.repo.git.branch('-D', branch)
+            branch = None
+
+        return branch, process.stdout.decode('utf-8', 'replace')
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(
+            executor.map(execute, range(1,
+                                        len(variants) + 1), variants)
+        )
+
+    failed = 0
+    for index, (variant, (branch,
+                          output)) in enumerate(zip(variants, results), 1):
+        label = 'Variant {0} ({1})'.format(
+            index, ', '.join(
+                '{0}={1}'.format(key, value)
+                for key, value in sorted(variant.items())
+            )
+        )
+        if branch:
+            click.echo(
+                '{0}: {1}'.format(label, click.style(branch, fg='green'))
+            )
+        else:
+            failed += 1
+            click.secho('{0}: failed'.format(label), fg='red')
+            click.echo(output)
+
+    if failed:
+        raise click.ClickException(
+            '{0} of {1} variant(s) failed.'.format(failed, len(variants))
+        )
+
+
 @click.command()
 @click.option('--revision', default='HEAD')
 @click.option(
@@ -124,14 +317,42 @@ def edit_inputs(client, workflow):
     flag_value=edit_inputs,
     help=edit_inputs.__doc__,
 )
+@click.option(
+    '--set',
+    'overrides',
+    multiple=True,
+    metavar='ID=VALUE',
+    help='Set a workflow input.',
+)
+@click.option(
+    '--sweep',
+    'sweep_file',
+    type=click.Path(exists=True, dir_okay=False),
+    help='Rerun all input variants defined in the file.',
+)
+@click.option(
+    '--workers',
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help='Number of variants executed at once.',
+)
+@option_jobs
+@option_stream
 @click.argument(
     'paths',
     type=click.Path(exists=True, dir_okay=True),
     nargs=-1,
     required=True,
 )
-@pass_local_client(clean=True, commit=True)
-def rerun(client, revision, roots, siblings, inputs, paths):
+@pass_local_client(
+    clean=True,
+    commit=lambda kwargs: not kwargs['sweep_file'],
+)
+def rerun(
+    client, revision, roots, siblings, inputs, overrides, sweep_file, workers,
+    jobs, stream, paths
+):
     """Recreate files generated by a sequence of ``run`` commands."""
     graph = Graph(client)
     outputs = graph.build(paths=paths, revision=revision)
@@ -139,6 +360,7 @@ def rerun(client, revision, roots, siblings, inputs, paths):
     # Check or extend siblings of outputs.
     outputs = siblings(graph, outputs)
     output_paths = {node.path for node in outputs}
+    requested_paths = set(output_paths)
 
     # Normalize and check all starting paths.
     roots = {graph.normalize_path(root) for root in roots}
@@ -154,38 +376,75 @@ def rerun(client, revision, roots, siblings, inputs, paths):
             outputs=outputs,
         )
     )
+    set_inputs(workflow, overrides)
+
+    if sweep_file:
+        args = ['--revision', revision, '--jobs', str(jobs)]
+        for root in sorted(roots):
+            args.extend(['--from', root])
+        if stream:
+            args.append('--stream')
 
-    # Don't compute paths if storage is disabled.
-    if client.has_external_storage:
-        # Make sure all inputs are pulled from a storage.
-        paths_ = (
-            path
-            for _, path in workflow.iter_input_files(client.workflow_path)
+        # Values of variants take precedence over the common values.
+        common = dict(override.split('=', 1) for override in overrides)
+        sweep(
+            client,
+            workflow,
+            [dict(common, **variant) for variant in _variants(sweep_file)],
+            args + sorted(requested_paths),
+            workers=workers,
         )
-        client.pull_paths_from_storage(*paths_)
+        return
 
     # Store the generated workflow used for updating paths.
     import yaml
 
-    output_file = client.workflow_path / '{0}.cwl'.format(uuid.uuid4().hex)
-    with output_file.open('w') as f:
-        f.write(
-            yaml.dump(
-                ascwl(
-                    workflow,
-                    filter=lambda _, x: x is not None,
-                    basedir=client.workflow_path,
-                ),
-                default_flow_style=False
+    def dump():
+        """Write the workflow to a file."""
+        with output_file.open('w') as f:
+            f.write(
+                yaml.dump(
+                    ascwl(
+                        workflow,
+                        filter=lambda _, x: x is not None,
+                        basedir=client.workflow_path,
+                    ),
+                    default_flow_style=False
+                )
             )
-        )
 
-    # Execute the workflow and relocate all output files.
-    from ._cwl import execute
+    output_file = client.workflow_path / '{0}.cwl'.format(uuid.uuid4().hex)
+
+    # Write the workflow for provenance while it is executed.
+    writer = threading.Thread(target=dump)
+    writer.start()
+
+    # Execute the workflow and relocate all output files. Inputs are pulled
+    # from a storage while steps are executed.
     # FIXME get new output paths for edited tools
     # output_paths = {path for _, path in workflow.iter_output_files()}
-    execute(
-        client,
-        output_file,
-        output_paths=output_paths,
-    )
+    step_metrics = {}
+    try:
+        if stream:
+            from ._stream import execute
+            metrics = execute(
+                client,
+                workflow,
+                requested_paths,
+                output_paths=output_paths,
+                jobs=jobs,
+                step_metrics=step_metrics,
+            )
+        else:
+            from ._cwl import execute
+            metrics = execute(
+                client,
+                workflow,
+                output_paths=output_paths,
+                jobs=jobs,
+                step_metrics=step_metrics,
+            )
+    finally:
+        writer.join()
+
+    client.store_metrics(output_file, metrics, steps=step_metrics)
@@ -72,6 +72,19 @@ those paths. Therefore:
   outputs using ``git rm <path>`` followed by ``git commit`` before running
   the ``renku run`` command.
 
+.. topic:: Limiting the detection (``--output`` and ``--input-hint``)
+
+   By default all files in the repository are checked for changes after the
+   execution. In large repositories you can limit the check to paths given
+   as arguments, standard streams, paths given with ``--output`` and
+   directories or files passed with ``--input-hint``:
+
+   .. code-block:: console
+
+      $ renku run --input-hint results python train.py data/
+
+   Files changed elsewhere are committed but not recorded as outputs.
+
 .. topic:: Command does not produce any files (``--no-output``)
 
    If the program does not produce any outputs, the execution ends with an
@@ -117,20 +130,324 @@ with ``--success-code=<INT>`` parameter.
 
    $ renku run --success-code=1 --no-output fail
 
+Isolated execution
+~~~~~~~~~~~~~~~~~~
+
+With ``--isolation`` the command runs in a separate worktree and its commit
+is merged back afterwards. The repository is locked only during the merge,
+hence many isolated commands can run at once. A command waiting for the
+lock to merge gives up after the number of seconds in the
+``RENKU_LOCK_TIMEOUT`` environment variable or the ``--lock-timeout``
+option (60 by default). Other commands fail at once if the repository is
+locked unless the timeout is set.
+
+Worktrees are kept in ``.git/renku-worktrees`` and reused by following
+commands. The pool holds a worktree per CPU and further commands run in
+temporary worktrees. Only files which differ from the previous command are
+updated and only inputs of the command are pulled from the external storage.
+
+.. code-block:: console
+
+   $ renku run --isolation python train.py --seed 1 > model-1.txt &
+   $ renku run --isolation python train.py --seed 2 > model-2.txt &
+
+Resource usage
+~~~~~~~~~~~~~~
+
+The wall clock time, CPU time, peak memory usage and number of bytes read
+and written by the command are stored next to the generated tool and are
+part of its provenance. Use ``renku show metrics`` or ``renku log`` to see
+them.
+
+.. code-block:: console
+
+   $ renku run wc < source.txt > result.wc
+   $ renku show metrics result.wc
+   result.wc wall_time=0.004 user_time=0.0 system_time=0.002 ...
+
+Running many commands
+~~~~~~~~~~~~~~~~~~~~~
+
+Commands listed in a file, one per line, can be tracked at once with
+``--batch``. Lines are split like in a shell, redirections of standard
+streams are supported and comments are ignored. Every command is tracked as
+if it was passed to ``renku run`` and committed separately, so that the
+provenance does not depend on how the commands were run.
+
+.. code-block:: console
+
+   $ cat commands.txt
+   wc < source.txt > result.wc
+   grep test source.txt > result.grep
+   $ renku run --batch commands.txt --jobs 2
+
+With ``--jobs``, consecutive commands which do not share any path in their
+arguments run in parallel. Outputs of such commands are detected only among
+their arguments and standard streams like with ``--input-hint``. Changes of
+other paths are refused since they could not be assigned to a command.
+Only the wall time is recorded for commands run in parallel, since the
+resources used by them can not be told apart. Separate the command with
+``--`` when it uses an option of ``renku run`` itself, e.g.
+``renku run -- make -j 2``.
+
 """
 
+import contextlib
+import itertools
 import os
+import re
+import shlex
 import sys
-from subprocess import call
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
+import attr
 import click
 
 from renku import errors
 from renku.api._git import _mapped_std_streams
-from renku.models.cwl.command_line_tool import CommandLineToolFactory
+from renku.models.cwl.command_line_tool import CommandLineTool, \
+    CommandLineToolFactory
+from renku.models.provenance.metrics import ResourceUsage
 
 from ._client import pass_local_client
-from ._options import option_isolation
+from ._options import option_isolation, option_jobs
+
+_RE_REDIRECT = re.compile(r'^(<|>|2>)(.*)$')
+
+_REDIRECTS = {
+    value: key
+    for key, value in CommandLineTool.STD_STREAMS_REPR.items()
+}
+
+
+def _split_line(line):
+    """Return arguments and redirected streams of a line in a batch file."""
+    argv = []
+    streams = {}
+    tokens = iter(shlex.split(line, comments=True))
+    for token in tokens:
+        match = _RE_REDIRECT.match(token)
+        if not match:
+            argv.append(token)
+            continue
+
+        path = match.group(2) or next(tokens, None)
+        if not path:
+            raise click.UsageError('Missing path after "{0}".'.format(token))
+        streams[_REDIRECTS[match.group(1)]] = os.path.abspath(path)
+
+    if streams and not argv:
+        raise click.UsageError('Missing command in "{0}".'.format(line))
+    return argv, streams
+
+
+def _paths(argv, streams):
+    """Return absolute paths which a command might use."""
+    paths = set(streams.values())
+    for argument in argv:
+        paths.add(os.path.abspath(argument))
+        paths.add(os.path.abspath(argument.split('=', 1)[-1]))
+    return paths
+
+
+def _overlap(paths, others):
+    """Check if a path is equal to or contained in one of the others."""
+
+    def contains(parent, path):
+        return path == parent or path.startswith(parent + os.sep)
+
+    return any(
+        contains(path, other) or contains(other, path) for path in paths
+        for other in others
+    )
+
+
+def _waves(commands, jobs, hints=()):
+    """Group consecutive commands which do not share any paths."""
+    hints = {os.path.abspath(hint) for hint in hints}
+    waves = []
+    used = set()
+    for command in commands:
+        paths = _paths(*command) | hints
+        if (not waves or len(waves[-1]) >= jobs or _overlap(paths, used)):
+            waves.append([])
+            used = set()
+        waves[-1].append(command)
+        used |= paths
+    return waves
+
+
+@attr.s(cmp=False)
+class _Step:
+    """Record a command in the workflow storage while it runs."""
+
+    factory = attr.ib()
+    streams = attr.ib()
+    """Files used as standard streams of the command."""
+
+    tool = attr.ib(default=None, init=False)
+    _stack = attr.ib(default=attr.Factory(contextlib.ExitStack))
+    _workflow = attr.ib(default=None, init=False)
+    _metrics = attr.ib(default=attr.Factory(dict), init=False)
+
+    @classmethod
+    def from_paths(cls, client, command_line, streams, success_codes):
+        """Open files of standard streams and create the step."""
+        stack = contextlib.ExitStack()
+        files = {
+            name:
+            stack.enter_context(open(path, 'rb' if name == 'stdin' else 'wb'))
+            for name, path in streams.items()
+        }
+        return cls(
+            _factory(client, command_line, streams, success_codes),
+            files,
+            stack=stack,
+        )
+
+    def start(self, client, **kwargs):
+        """Start watching the repository for outputs."""
+        self._workflow = self._stack.enter_context(
+            client.with_workflow_storage(metrics=self._metrics)
+        )
+        self.tool = self._stack.enter_context(
+            self.factory.watch(client, **kwargs)
+        )
+
+        # Don't compute paths if storage is disabled.
+        if client.has_external_storage:
+            # Make sure all inputs are pulled from a storage.
+            paths_ = (
+                path for _, path in
+                self.tool.iter_input_files(client.workflow_path)
+            )
+            client.pull_paths_from_storage(*paths_)
+
+    def call(self):
+        """Execute the command and return its exit code and usage."""
+        return ResourceUsage.call(
+            self.factory.command_line,
+            cwd=os.getcwd(),
+            **self.streams,
+        )
+
+    def finish(self, returncode, usage):
+        """Detect outputs and write the tool if the command succeeded."""
+        with self._stack:
+            step_id = uuid.uuid4()
+            self._metrics[step_id] = usage
+
+            success_codes = self.factory.successCodes
+            if returncode not in (success_codes or {0}):
+                raise errors.InvalidSuccessCode(
+                    returncode, success_codes=success_codes
+                )
+
+            self._workflow.add_step(run=self.tool, id=step_id)
+
+
+def _factory(client, command_line, streams, success_codes):
+    """Create a tool factory for a command with mapped streams."""
+    working_dir = client.repo.working_dir
+    return CommandLineToolFactory(
+        command_line=command_line,
+        directory=os.getcwd(),
+        working_dir=working_dir,
+        successCodes=success_codes,
+        **{
+            name: os.path.relpath(path, working_dir)
+            for name, path in streams.items()
+        }
+    )
+
+
+def _undeclared_changes(client, scopes):
+    """Return changed paths outside of the scopes of concurrent commands.
+
+    Git lists candidates from stat information and only the candidates
+    outside of the scopes are hashed, so outputs are not read again.
+    """
+    repo = client.repo
+    paths = set(itertools.chain.from_iterable(scopes))
+    candidates = set(repo.git.diff_files(name_only=True, z=True).split('\0'))
+    candidates.update(
+        repo.git.ls_files(others=True, exclude_standard=True,
+                          z=True).split('\0')
+    )
+    candidates = [
+        path for path in candidates if path and not _overlap({path}, paths)
+    ]
+    return sorted(client.filter_changed_paths(candidates))
+
+
+def _run_batch(client, batch, jobs, success_codes, hints=(), **kwargs):
+    """Run commands from a batch file and commit each of them.
+
+    The last command is committed by the caller.
+    """
+    commands = [_split_line(line) for line in batch]
+    commands = [command for command in commands if command[0]]
+    if not commands:
+        raise click.UsageError('The batch file does not contain commands.')
+
+    program = os.path.basename(sys.argv[0])
+    last = commands[-1]
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for wave in _waves(commands, jobs, hints=hints):
+            # Concurrent commands change the repository at once.
+            concurrent = len(wave) > 1
+
+            with contextlib.ExitStack() as stack:
+                # Unfinished steps are closed if another one fails.
+                steps = []
+                for argv, streams in wave:
+                    step = _Step.from_paths(
+                        client, argv, streams, success_codes
+                    )
+                    stack.push(step._stack)
+                    step.start(
+                        client, hints=hints, scoped=concurrent, **kwargs
+                    )
+                    steps.append(step)
+
+                results = list(executor.map(lambda step: step.call(), steps))
+                if concurrent:
+                    # Counters of concurrent commands can not be told apart.
+                    results = [(returncode, usage.wall_time_only())
+                               for returncode, usage in results]
+
+                scopes = {}
+                if concurrent:
+                    scopes = {
+                        step: step.factory.snapshot_paths(client, hints=hints)
+                        for step in steps
+                    }
+                    undeclared = _undeclared_changes(client, scopes.values())
+                    if undeclared:
+                        raise errors.UndeclaredChanges(undeclared)
+
+                for command, step, result in zip(wave, steps, results):
+                    if command is last:
+                        step.finish(*result)
+                        break
+
+                    paths = None
+                    if concurrent:
+                        paths = scopes[step] + ['.gitattributes']
+                        existing = set(client.workflow_path.glob('*'))
+
+                    message = ' '.join([program, 'run'] + command[0])
+                    with client.commit(message=message, paths=paths):
+                        step.finish(*result)
+                        if concurrent:
+                            # Paths are staged after the tool is written.
+                            paths.extend(
+                                str(path.relative_to(client.path))
+                                for path in client.workflow_path.glob('*')
+                                if path not in existing
+                            )
 
 
 @click.command(context_settings=dict(ignore_unknown_options=True, ))
@@ -140,6 +457,12 @@ from ._options import option_isolation
     multiple=True,
     help='Force a path to be considered an output.',
 )
+@click.option(
+    'hints',
+    '--input-hint',
+    multiple=True,
+    help='Path changed by the command without being its argument.',
+)
 @click.option(
     '--no-output',
     is_flag=True,
@@ -154,6 +477,12 @@ from ._options import option_isolation
     callback=lambda _, __, values: [int(value) % 256 for value in values],
     help='Allowed command exit-code.',
 )
+@click.option(
+    '--batch',
+    type=click.File('r'),
+    help='Run commands listed in a file, one per line.',
+)
+@option_jobs
 @option_isolation
 @click.argument('command_line', nargs=-1, type=click.UNPROCESSED)
 @pass_local_client(
@@ -162,47 +491,35 @@ from ._options import option_isolation
     commit=True,
     ignore_std_streams=True,
 )
-def run(client, outputs, no_output, success_codes, isolation, command_line):
+def run(
+    client, outputs, hints, no_output, success_codes, batch, jobs, isolation,
+    command_line
+):
     """Tracking work on a specific problem."""
-    working_dir = client.repo.working_dir
-    mapped_std = _mapped_std_streams(client.candidate_paths)
-    factory = CommandLineToolFactory(
-        command_line=command_line,
-        directory=os.getcwd(),
-        working_dir=working_dir,
-        successCodes=success_codes,
-        **{
-            name: os.path.relpath(path, working_dir)
-            for name, path in mapped_std.items()
-        }
-    )
-
-    with client.with_workflow_storage() as wf:
-        with factory.watch(
-            client, no_output=no_output, outputs=outputs
-        ) as tool:
-            # Don't compute paths if storage is disabled.
-            if client.has_external_storage:
-                # Make sure all inputs are pulled from a storage.
-                paths_ = (
-                    path
-                    for _, path in tool.iter_input_files(client.workflow_path)
-                )
-                client.pull_paths_from_storage(*paths_)
-
-            returncode = call(
-                factory.command_line,
-                cwd=os.getcwd(),
-                **{key: getattr(sys, key)
-                   for key in mapped_std.keys()},
+    if batch:
+        if command_line or outputs:
+            raise click.UsageError(
+                'Use either "--batch" or a command line with outputs.'
             )
+        return _run_batch(
+            client,
+            batch,
+            jobs,
+            success_codes,
+            no_output=no_output,
+            hints=hints,
+        )
 
-            if returncode not in (success_codes or {0}):
-                raise errors.InvalidSuccessCode(
-                    returncode, success_codes=success_codes
-                )
+    mapped_std = _mapped_std_streams(client.candidate_paths)
+    step = _Step(
+        _factory(client, command_line, mapped_std, success_codes),
+        {key: getattr(sys, key)
+         for key in mapped_std.keys()},
+    )
+    step.start(client, no_output=no_output, outputs=outputs, hints=hints)
+    returncode, usage = step.call()
 
-            sys.stdout.flush()
-            sys.stderr.flush()
+    sys.stdout.flush()
+    sys.stderr.flush()
 
-            wf.add_step(run=tool)
+    step.finish(returncode, usage)
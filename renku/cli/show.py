@@ -65,6 +65,39 @@ respectively.
    $ echo $?  # last command finished with an error code
    1
 
+Impact of changes
+~~~~~~~~~~~~~~~~~
+
+You can list all files which are generated directly or indirectly from a file
+by running ``renku show impact PATH`` command. The answer comes from an index
+that is stored in the Git directory. The index is rebuilt only after a new
+commit.
+
+.. code-block:: console
+
+   $ renku run wc < source.txt > result.wc
+   $ renku run cat result.wc > summary.txt
+   $ renku show impact source.txt
+   result.wc
+   summary.txt
+
+Resource usage
+~~~~~~~~~~~~~~
+
+You can display resources used by the executions that generated files by
+running ``renku show metrics PATH...`` command. Times are in seconds and
+sizes in bytes. Files generated by ``renku update`` or ``renku rerun`` show
+the resources used by the step that generated them. Only the wall time is
+known for steps executed concurrently with ``--jobs``. Nothing is shown for
+steps restored from the step cache. Workflows without recorded steps show
+the resources used by the whole workflow.
+
+.. code-block:: console
+
+   $ renku show metrics result.wc
+   result.wc wall_time=0.004 user_time=0.0 system_time=0.002 max_rss=2080768 \
+   read_bytes=11093 written_bytes=17
+
 """
 
 import click
@@ -177,6 +210,54 @@ def outputs(ctx, client, revision, paths):
                 return
 
 
+@show.command()
+@click.option('--revision', default='HEAD')
+@click.argument(
+    'paths',
+    type=click.Path(exists=True, dir_okay=True),
+    nargs=-1,
+)
+@pass_local_client
+def metrics(client, revision, paths):
+    """Show resources used to generate the given paths."""
+    graph = Graph(client)
+    nodes = graph.build(paths=paths, revision=revision)
+
+    for node in sorted(nodes, key=lambda node: node.path):
+        activity = getattr(node, 'activity', None)
+        usage = getattr(activity, 'metrics', None)
+        if usage is None and not getattr(activity, 'restored', False):
+            usage = getattr(
+                getattr(activity, 'part_of', None), 'metrics', None
+            )
+        if usage is None:
+            continue
+
+        click.echo(
+            ' '.join([graph._format_path(node.path)] + [
+                '{0}={1}'.format(key, value)
+                for key, value in usage.as_dict().items()
+            ])
+        )
+
+
+@show.command()
+@click.argument('path', type=click.Path(dir_okay=True))
+@pass_local_client
+def impact(client, path):
+    """Show files generated from the given path."""
+    graph = Graph(client)
+    reachability = graph.reachability()
+
+    try:
+        paths = reachability.descendants(graph.normalize_path(path))
+    except KeyError:
+        paths = set()
+
+    for path in sorted(paths):
+        click.echo(graph._format_path(path))
+
+
 def _context_names():
     """Return list of valid context names."""
     import inspect
@@ -26,6 +26,10 @@ and paths of files that have been used in diverent versions.
 The first paths are what need to be recreated by running ``renku update``.
 See more in section about :ref:`renku update <cli-update>`.
 
+You can limit the status to given files by running ``renku status PATH...``.
+In that case only the history of the given files is inspected. Directories
+include all files below them.
+
 The paths mentioned in the output are made relative to the current directory
 if you are working in a subdirectory (this is on purpose, to help
 cutting and pasting to other commands). They also contain first 8 characters
@@ -53,14 +57,15 @@ from ._graph import Graph
     default=False,
     help='Display commands without output files.'
 )
-@click.argument('path', type=click.Path(exists=True, dir_okay=False), nargs=-1)
+@click.argument('path', type=click.Path(exists=True, dir_okay=True), nargs=-1)
 @pass_local_client(clean=True, commit=False)
 @click.pass_context
 def status(ctx, client, revision, no_output, path):
     """Show a status of the repository."""
     graph = Graph(client)
-    # TODO filter only paths = {graph.normalize_path(p) for p in path}
-    status = graph.build_status(revision=revision, can_be_cwl=no_output)
+    status = graph.build_status(
+        revision=revision, can_be_cwl=no_output, paths=path
+    )
 
     click.echo('On branch {0}'.format(client.repo.active_branch))
     if status['outdated']:
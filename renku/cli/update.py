@@ -115,18 +115,168 @@ The following commands will produce the same result.
    $ renku update --with-siblings C
    $ renku update B C D
 
+Parallel execution
+~~~~~~~~~~~~~~~~~~
+
+Steps that do not depend on each other can be executed in parallel by
+specifying the maximal number of concurrently running steps.
+
+.. code-block:: console
+
+   $ renku update --jobs 4
+
+Streaming intermediate files
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Use ``--stream`` to connect steps through pipes when an output written to
+the standard output of a step is read by exactly one other step and it was
+not requested. Such steps run concurrently and the consumer reads the
+intermediate file from the pipe, hence it is never written. The file is
+still recorded as an output of the generated workflow and its committed
+version is kept as it is. Outdated intermediate files of the requested
+paths are recreated as well instead of being used as they are.
+
+.. code-block:: console
+
+   $ renku run sh -c 'tr a-z A-Z' < source > upper
+   $ renku run wc -c < upper > count
+   $ renku update --stream count
+   Streamed files:
+
+       upper
+
+Streaming requires workflows of command line tools without requirements
+and hints and it can not be combined with ``--jobs``. Other workflows with
+streamable files are rejected. The consuming tool has to read the stream
+once from its beginning to the end. Workflows without streamable files are
+executed as usual.
+
+Reusing results
+~~~~~~~~~~~~~~~
+
+Results of every executed step are recorded by the blobs of its tool
+definition and its inputs. When a step would be executed again with the
+same tool and the same input content, its outputs are restored from the
+Git object database instead. The restored paths and the number of cache
+hits and misses are displayed before the execution. The committed workflow
+contains all steps and its resource usage lists the restored ones.
+
+.. code-block:: console
+
+   $ renku update
+   Restored from cache:
+
+       B
+
+   Step cache: 1 hit(s), 1 miss(es)
+
+Use ``--no-cache`` to recompute all steps.
+
+Resuming a failed update
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+If a step fails, the update stops and the outputs of the steps completed
+before are recorded as checkpoints together with the blobs of their tool
+definition and inputs. With ``--keep-going`` the steps that do not depend
+on the failed one are still executed and checkpointed. The repository is
+left unchanged. After fixing the cause of the failure, the update
+continues from the checkpoints whose tool and inputs are unchanged.
+
+.. code-block:: console
+
+   $ renku update
+   Error: ...
+   2 step(s) completed before the failure were checkpointed.
+   Use "renku update --resume" to continue.
+   $ renku update --resume
+
+Planning an update
+~~~~~~~~~~~~~~~~~~
+
+Use ``--dry-run`` to display the steps in the order of their execution
+without changing the repository. The expected duration of every step is
+the mean wall time of previous executions of the same tool. The output
+also shows the critical path of the workflow and the estimated wall time
+for the number of jobs given by ``--jobs``.
+
+.. code-block:: console
+
+   $ renku update --dry-run --jobs 2
+   The following steps would be executed:
+
+       1. .renku/workflow/..._wc.cwl -> B (1.20s)
+       2. .renku/workflow/..._wc.cwl -> C (0.80s)
+       3. .renku/workflow/..._cat.cwl -> D (0.10s)
+
+   Critical path: 1.30s (steps 1 -> 3)
+   Estimated wall time with 2 job(s): 1.30s
+
 """
 
 import sys
+import threading
 import uuid
 
 import click
 
 from renku.models.cwl._ascwl import ascwl
 
+from ._cache import StepCache
 from ._client import pass_local_client
 from ._graph import Graph, _safe_path
-from ._options import option_siblings
+from ._options import option_jobs, option_no_cache, option_siblings, \
+    option_stream
+from ._plan import ExecutionPlan
+
+
+def _echo_plan(graph, plan, jobs):
+    """Display steps of the execution plan with their expected duration."""
+
+    def duration(step_id):
+        if step_id in plan.cached:
+            return click.style('cached', fg='green')
+        if plan.durations[step_id] is None:
+            return click.style('unknown', fg='yellow')
+        return '{0:.2f}s'.format(plan.durations[step_id])
+
+    click.echo('The following steps would be executed:\n')
+    for position, step_id in enumerate(plan.order, 1):
+        process = plan.processes[step_id]
+        click.echo(
+            '\t{0}. {1} -> {2} ({3})'.format(
+                position,
+                graph._format_path(process.path) if process.path else step_id,
+                ', '.join(
+                    click.style(graph._format_path(path), fg='blue')
+                    for path in sorted(process.outputs)
+                ),
+                duration(step_id),
+            )
+        )
+
+    critical, path = plan.critical_path()
+    unknown = sum(1 for value in plan.durations.values() if value is None)
+
+    positions = {
+        step_id: position
+        for position, step_id in enumerate(plan.order, 1)
+    }
+    click.echo(
+        '\nCritical path: {0:.2f}s (steps {1})'.format(
+            critical,
+            ' -> '.join(str(positions[step_id]) for step_id in path),
+        )
+    )
+    click.echo(
+        'Estimated wall time with {0} job(s): {1:.2f}s'.format(
+            jobs, plan.wall_time(jobs=jobs)
+        )
+    )
+    if unknown:
+        click.echo(
+            '{0} step(s) without recorded duration are not included.'.
+            format(unknown)
+        )
 
 
 @click.command()
@@ -138,9 +288,36 @@ from ._options import option_siblings
     help='Display commands without output files.'
 )
 @option_siblings
+@option_jobs
+@option_stream
+@option_no_cache
+@click.option(
+    '--resume',
+    is_flag=True,
+    default=False,
+    help='Reuse steps completed by a previous failed update.'
+)
+@click.option(
+    '--keep-going',
+    is_flag=True,
+    default=False,
+    help='Execute steps which do not depend on a failed step.'
+)
+@click.option(
+    '--dry-run',
+    is_flag=True,
+    default=False,
+    help='Show steps that would be executed and their expected duration.'
+)
 @click.argument('paths', type=click.Path(exists=True, dir_okay=True), nargs=-1)
-@pass_local_client(clean=True, commit=True)
-def update(client, revision, no_output, siblings, paths):
+@pass_local_client(
+    clean=lambda kwargs: not kwargs['dry_run'],
+    commit=lambda kwargs: not kwargs['dry_run'],
+)
+def update(
+    client, revision, no_output, siblings, jobs, stream, cache, resume,
+    keep_going, dry_run, paths
+):
     """Update existing files by rerunning their outdated workflow."""
     graph = Graph(client)
     outputs = graph.build(revision=revision, can_be_cwl=no_output, paths=paths)
@@ -159,36 +336,164 @@ def update(client, revision, no_output, siblings, paths):
     # Get all clean nodes.
     input_paths = {node.path for node in graph.nodes} - output_paths
 
+    if stream:
+        # Recreate outdated intermediate files so they can be streamed.
+        input_paths -= {
+            node.path
+            for node in graph.nodes if graph.need_update(node)
+        }
+
     # Store the generated workflow used for updating paths.
     import yaml
 
+    def dump(workflow, path):
+        """Write the workflow to a file."""
+        with path.open('w') as f:
+            f.write(
+                yaml.dump(
+                    ascwl(
+                        workflow,
+                        filter=lambda _, x: x is not None,
+                        basedir=client.workflow_path,
+                    ),
+                    default_flow_style=False
+                )
+            )
+
+    requested_paths = set(output_paths)
+    requested = set(outputs)
+
+    steps = {}
     output_file = client.workflow_path / '{0}.cwl'.format(uuid.uuid4().hex)
     workflow = graph.ascwl(
         input_paths=input_paths,
         output_paths=output_paths,
         outputs=outputs,
+        steps=steps,
     )
 
-    # Don't compute paths if storage is disabled.
-    if client.has_external_storage:
-        # Make sure all inputs are pulled from a storage.
-        paths_ = (
-            path
-            for _, path in workflow.iter_input_files(client.workflow_path)
+    caches = []
+    if cache:
+        caches.append(client.step_cache)
+    if resume:
+        caches.append(client.checkpoint_cache)
+    step_cache = StepCache(client, caches=caches)
+
+    if dry_run:
+        if caches:
+            step_cache.lookup(steps)
+        plan = ExecutionPlan(
+            graph,
+            workflow,
+            steps,
+            cached={steps[process_run]
+                    for process_run in step_cache.hits},
         )
-        client.pull_paths_from_storage(*paths_)
-
-    with output_file.open('w') as f:
-        f.write(
-            yaml.dump(
-                ascwl(
+        _echo_plan(graph, plan, jobs)
+        return
+
+    # Write the workflow for provenance while the steps are executed.
+    writer = threading.Thread(target=dump, args=(workflow, output_file))
+    writer.start()
+
+    checkpointed = []
+
+    def checkpoint(locations):
+        """Record steps completed before a failure."""
+        checkpointed.append(step_cache.checkpoint(steps, locations))
+
+    try:
+        restored = step_cache.restore(steps) if caches else set()
+        if caches:
+            step_cache.report()
+
+        # The recorded workflow keeps restored steps for the provenance.
+        restored_steps = {
+            steps[process_run]
+            for process_run in step_cache.hits
+        }
+
+        # Execute only steps that were not restored from the cache.
+        step_ids = {step_id: step_id for step_id in steps.values()}
+        if restored:
+            remaining = {
+                node
+                for node in requested if node.path not in restored
+            }
+            rebuilt = {}
+            workflow = graph.ascwl(
+                input_paths=input_paths | restored,
+                output_paths=requested_paths - restored,
+                outputs=remaining,
+                steps=rebuilt,
+            ) if remaining else None
+            # Steps of the rebuilt workflow are numbered again.
+            step_ids = {
+                step_id: steps[process_run]
+                for process_run, step_id in rebuilt.items()
+            }
+
+        if workflow is not None:
+            step_metrics = {}
+            # Inputs are pulled from a storage while steps are executed.
+            if stream:
+                from ._stream import execute
+                metrics = execute(
+                    client,
                     workflow,
-                    filter=lambda _, x: x is not None,
-                    basedir=client.workflow_path,
-                ),
-                default_flow_style=False
+                    requested_paths - restored,
+                    output_paths=output_paths,
+                    jobs=jobs,
+                    checkpoint=checkpoint,
+                    keep_going=keep_going,
+                    step_metrics=step_metrics,
+                )
+            else:
+                from ._cwl import execute
+                metrics = execute(
+                    client,
+                    workflow,
+                    output_paths=output_paths,
+                    jobs=jobs,
+                    checkpoint=checkpoint,
+                    keep_going=keep_going,
+                    step_metrics=step_metrics,
+                )
+            client.store_metrics(
+                output_file,
+                metrics,
+                steps={
+                    step_ids[step_id]: usage
+                    for step_id, usage in step_metrics.items()
+                },
+                restored=restored_steps,
             )
-        )
+        else:
+            client.remove_unmodified(output_paths)
+            client.store_metrics(output_file, None, restored=restored_steps)
+    except Exception:
+        # Leave the repository as it was before the update.
+        writer.join()
+        step_cache.revert()
+        if output_file.exists():
+            output_file.unlink()
+
+        if any(checkpointed):
+            click.secho(
+                '{0} step(s) completed before the failure were '
+                'checkpointed.\nUse "renku update --resume" to continue.'.
+                format(sum(checkpointed)),
+                err=True,
+                fg='yellow',
+            )
+        raise
+    finally:
+        writer.join()
+
+    if cache:
+        step_cache.store(steps)
 
-    from ._cwl import execute
-    execute(client, output_file, output_paths=output_paths)
+    if resume:
+        # Checkpoints of a completed update are not needed anymore.
+        client.checkpoint_cache.clear()
+        client.checkpoint_cache.flush()
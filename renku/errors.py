@@ -167,6 +167,18 @@ class FailedMerge(RenkuException, click.ClickException):
         )
 
 
+class LockTimeout(RenkuException, click.ClickException):
+    """Raise when the repository lock can not be acquired in time."""
+
+    def __init__(self, path, timeout):
+        """Build a custom message."""
+        super(LockTimeout, self).__init__(
+            'The repository is locked by another command.\n\n'
+            'Waited {0} seconds for "{1}". Set the RENKU_LOCK_TIMEOUT '
+            'environment variable to wait longer.'.format(timeout, path)
+        )
+
+
 class UnmodifiedOutputs(RenkuException, click.ClickException):
     """Raise when there are unmodified outputs in the repository."""
 
@@ -186,6 +198,22 @@ class UnmodifiedOutputs(RenkuException, click.ClickException):
         )
 
 
+class UndeclaredChanges(RenkuException, click.ClickException):
+    """Raise when commands run in parallel change paths they do not use."""
+
+    def __init__(self, paths):
+        """Build a custom message."""
+        super(UndeclaredChanges, self).__init__(
+            'Commands run in parallel changed paths which are not their '
+            'arguments:'
+            '\n\n' +
+            '\n'.join('\t' + click.style(path, fg='yellow')
+                      for path in paths) + '\n\n'
+            'Use the "--input-hint" option to declare them or run the '
+            'commands with "--jobs 1".'
+        )
+
+
 class InvalidOutputPath(RenkuException, click.ClickException):
     """Raise when trying to work with an invalid output path."""
 
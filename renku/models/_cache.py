@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Persistent caches for immutable repository data."""
+
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import attr
+
+from renku._compat import Path
+
+
+@attr.s(cmp=False)
+class JSONCache:
+    """Store JSON serializable values in a single file.
+
+    The file is loaded lazily on first access and written back only when
+    :meth:`flush` is called after a modification. Unreadable files or files
+    written by a different version are silently discarded. If ``max_size``
+    is set, the least recently stored values are dropped when the cache is
+    written.
+    """
+
+    path = attr.ib(converter=Path)
+    version = attr.ib(default=1)
+    max_size = attr.ib(default=None)
+
+    _data = attr.ib(default=None, init=False)
+    _modified = attr.ib(default=False, init=False)
+
+    @property
+    def data(self):
+        """Return loaded cache content."""
+        if self._data is None:
+            self._data = OrderedDict()
+            try:
+                with self.path.open('r') as fp:
+                    content = json.load(fp, object_pairs_hook=OrderedDict)
+                if content.get('version') == self.version:
+                    self._data = content.get('data', {})
+            except (OSError, ValueError, AttributeError):
+                pass
+        return self._data
+
+    def get(self, key, default=None):
+        """Return a cached value."""
+        return self.data.get(key, default)
+
+    def __contains__(self, key):
+        """Check if the key is cached."""
+        return key in self.data
+
+    def __getitem__(self, key):
+        """Return a cached value."""
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        """Store a value in the cache."""
+        self.data.pop(key, None)
+        self.data[key] = value
+        self._modified = True
+
+    def update(self, values):
+        """Store multiple values in the cache."""
+        for key, value in values.items():
+            self[key] = value
+
+    def clear(self):
+        """Remove all cached values."""
+        self._data = OrderedDict()
+        self._modified = True
+
+    def flush(self):
+        """Atomically write the modified cache to the disk."""
+        if not self._modified:
+            return
+
+        if self.max_size is not None:
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=str(self.path.parent), prefix='.' + self.path.name
+            )
+            try:
+                with os.fdopen(fd, 'w') as fp:
+                    json.dump({
+                        'version': self.version,
+                        'data': self._data,
+                    }, fp)
+                os.replace(tmp_path, str(self.path))
+            except (TypeError, ValueError):
+                # Values that can not be serialized are not persisted.
+                os.unlink(tmp_path)
+        except OSError:
+            # Caching is best effort only (e.g. read-only repository).
+            pass
+
+        self._modified = False
+
+    def release(self):
+        """Write the modified cache and drop the loaded content.
+
+        The file is loaded again on the next access.
+        """
+        self.flush()
+        self._data = None
@@ -237,3 +237,88 @@ class DirectoryTree(dict):
                     queue.append((value, parents + [key]))
                 else:
                     yield os.path.sep.join(parents + [key])
+
+
+class NodeIndex(object):
+    """Ordered index of graph nodes by their commit and path.
+
+    Commits and paths are interned to integer identifiers, hence a node is
+    stored under a single integer instead of a tuple of both.
+
+    >>> index = NodeIndex()
+    >>> index.update([(('c1', 'a'), 'A'), (('c1', 'b'), 'B')])
+    >>> index[('c2', 'a')] = 'C'
+    >>> index[('c1', 'a')] = 'D'
+    >>> list(index)
+    [('c1', 'a'), ('c1', 'b'), ('c2', 'a')]
+    >>> list(index.values())
+    ['D', 'B', 'C']
+    >>> index.get(('c2', 'b')) is None
+    True
+    >>> ('c2', 'a') in index, len(index)
+    (True, 3)
+
+    """
+
+    __slots__ = ('_commit_ids', '_commits', '_path_ids', '_paths', '_nodes')
+
+    #: Bits used by path identifiers in a key.
+    _PATH_BITS = 32
+
+    def __init__(self):
+        """Create an empty index."""
+        self._commit_ids = {}
+        self._commits = []
+        self._path_ids = {}
+        self._paths = []
+        self._nodes = {}
+
+    def _key(self, key, intern=False):
+        """Return the integer key of a commit and path or ``None``."""
+        commit, path = key
+        commit_id = self._commit_ids.get(commit)
+        path_id = self._path_ids.get(path)
+
+        if intern:
+            if commit_id is None:
+                commit_id = self._commit_ids[commit] = len(self._commits)
+                self._commits.append(commit)
+            if path_id is None:
+                path_id = self._path_ids[path] = len(self._paths)
+                self._paths.append(path)
+        elif commit_id is None or path_id is None:
+            return
+
+        return commit_id << self._PATH_BITS | path_id
+
+    def get(self, key, default=None):
+        """Return the node of a commit and path if indexed."""
+        return self._nodes.get(self._key(key), default)
+
+    def update(self, items):
+        """Index nodes from pairs of commit and path keys with nodes."""
+        for key, node in items:
+            self[key] = node
+
+    def values(self):
+        """Return indexed nodes in their insertion order."""
+        return self._nodes.values()
+
+    def __setitem__(self, key, node):
+        """Index a node keeping the position of an existing key."""
+        self._nodes[self._key(key, intern=True)] = node
+
+    def __contains__(self, key):
+        """Check if a commit and path is indexed."""
+        return self._key(key) in self._nodes
+
+    def __iter__(self):
+        """Yield pairs of commit and path in the insertion order."""
+        bits = self._PATH_BITS
+        mask = (1 << bits) - 1
+        for key in self._nodes:
+            yield self._commits[key >> bits], self._paths[key & mask]
+
+    def __len__(self):
+        """Return the number of indexed nodes."""
+        return len(self._nodes)
@@ -17,6 +17,7 @@
 # limitations under the License.
 """Git utilities."""
 
+import os
 import re
 
 import attr
@@ -177,3 +178,140 @@ class Range:
         if self.start:
             return '{self.start}..{self.stop}'.format(self=self)
         return str(self.stop)
+
+
+@attr.s(cmp=False)
+class CommitLog:
+    """Index changed paths of all commits reachable from a revision.
+
+    The output of a single ``git log`` process is parsed lazily and every
+    parsed commit is memoized, hence lookups of many paths cost at most one
+    pass over the history. Paths found only after a merge are listed in
+    :attr:`ambiguous` since history simplification of a path limited log
+    can follow another parent.
+    """
+
+    repo = attr.ib()
+    revision = attr.ib(default='HEAD')
+    max_count = attr.ib(default=None)
+
+    changes = attr.ib(default=attr.Factory(dict))
+    """Map commit SHA to a list of ``(change_type, path)`` tuples."""
+
+    latest = attr.ib(default=attr.Factory(dict), init=False)
+    """Map paths and their parent folders to the last modifying commit."""
+
+    ambiguous = attr.ib(default=attr.Factory(set), init=False)
+    """Paths whose last modifying commit was found after a merge."""
+
+    _records = attr.ib(default=None, init=False)
+    _merged = attr.ib(default=False, init=False)
+
+    def __attrs_post_init__(self):
+        """Prepare the lazy log parser."""
+        self._records = self._iter_records()
+
+    def _iter_records(self):
+        """Yield commit SHA, its parents, changes and all touched paths."""
+        options = ['--max-count={0}'.format(self.max_count)
+                   ] if self.max_count else []
+        process = self.repo.git.log(
+            self.revision,
+            '--root',
+            '--name-status',
+            '-M',
+            '-c',
+            '-z',
+            '--format=%x01%H %P',
+            *options,
+            as_process=True,
+        )
+
+        try:
+            yield from self._parse(process.stdout)
+        finally:
+            # Unfinished logs are closed together with the generator.
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+
+    @staticmethod
+    def _parse(stream):
+        """Parse records of the log from the stream."""
+        buffer = b''
+        while True:
+            chunk = stream.read(65536)
+            records = (buffer + chunk).split(b'\x01')
+            buffer = records.pop() if chunk else b''
+
+            for record in records:
+                if not record:
+                    continue
+
+                header, _, rest = record.partition(b'\0')
+                hexsha, *parents = header.decode().split()
+                tokens = iter(rest.lstrip(b'\n').split(b'\0'))
+                changes, paths = [], []
+
+                for status in tokens:
+                    if not status:
+                        continue
+
+                    status = status.decode()
+                    path = next(tokens).decode('utf-8', 'replace')
+
+                    if status[0] in 'RC' and status[1:].isdigit():
+                        # Renamed or copied files list the source path first
+                        # except in combined diffs of merges.
+                        paths.append(path)
+                        path = next(tokens).decode('utf-8', 'replace')
+                        status = status[0]
+
+                    changes.append((status, path))
+                    paths.append(path)
+
+                yield hexsha, parents, changes, paths
+
+            if not chunk:
+                break
+
+    def _next(self):
+        """Parse the next commit and return ``False`` if there is none."""
+        try:
+            hexsha, parents, changes, paths = next(self._records)
+        except StopIteration:
+            return False
+
+        self.changes[hexsha] = changes
+        self._merged = self._merged or len(parents) > 1
+
+        if paths:
+            paths.append('.')
+
+        for path in paths:
+            while path and path not in self.latest:
+                self.latest[path] = hexsha
+                if self._merged:
+                    self.ambiguous.add(path)
+                path = os.path.dirname(path)
+
+        return True
+
+    def close(self):
+        """Stop the ``git log`` process if the log was not parsed entirely."""
+        self._records.close()
+
+    def find_changes(self, hexsha):
+        """Return changes of the commit or ``None`` if it is not reachable."""
+        while hexsha not in self.changes:
+            if not self._next():
+                return
+        return self.changes[hexsha]
+
+    def find(self, path):
+        """Return SHA of the last commit modifying the path or ``None``."""
+        while path not in self.latest:
+            if not self._next():
+                return
+        return self.latest[path]
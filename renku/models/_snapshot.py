@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Detect changed files from their stat information."""
+
+import os
+import stat
+
+import attr
+
+#: The Git index stores only the lower 32 bits of sizes and inodes.
+_MASK = 0xffffffff
+
+
+def _key(value):
+    """Return comparable stat information of a file."""
+    return (
+        int(value.st_mtime),
+        value.st_mtime_ns % 10**9,
+        value.st_size & _MASK,
+        value.st_ino & _MASK,
+    )
+
+
+def _is_racy(mtime, index_mtime):
+    """Check if a file could change unnoticed after the index was written.
+
+    Git can not tell a file modified within the same timestamp tick from
+    the indexed one, hence it compares content of such entries.
+    """
+    seconds, nanoseconds = mtime
+    if not nanoseconds:
+        # Git might be built without support for nanoseconds.
+        return seconds >= index_mtime[0]
+    return (seconds, nanoseconds) >= index_mtime
+
+
+def _changed(before, after):
+    """Check if stat information of a file differs."""
+    if before is None:
+        return True
+
+    seconds, nanoseconds, size, inode = before
+    if (seconds, size, inode) != (after[0], after[2], after[3]):
+        return True
+    # Git might be built without support for nanoseconds.
+    return bool(nanoseconds and after[1] and nanoseconds != after[1])
+
+
+@attr.s(cmp=False)
+class Snapshot:
+    """Stat information of files in a working tree.
+
+    Paths are relative to the root and directories are listed separately
+    to answer whether they existed when the snapshot was taken.
+    """
+
+    root = attr.ib(converter=str)
+    files = attr.ib(default=attr.Factory(dict))
+    directories = attr.ib(default=attr.Factory(set))
+
+    @classmethod
+    def from_index(cls, repo, paths=()):
+        """Use stat information stored in the Git index.
+
+        Only directories among the given paths and their parents are looked
+        up in the working tree, since they can exist without tracked files.
+        Racily clean entries are always reported as changed.
+        """
+        index = os.stat(repo.index.path)
+        index_mtime = (int(index.st_mtime), index.st_mtime_ns % 10**9)
+
+        files = {}
+        directories = {'.'}
+        for (path, _), entry in repo.index.entries.items():
+            if _is_racy(entry.mtime, index_mtime):
+                files[path] = None
+            else:
+                files[path] = entry.mtime + (entry.size, entry.inode)
+            parent = os.path.dirname(path)
+            while parent and parent not in directories:
+                directories.add(parent)
+                parent = os.path.dirname(parent)
+
+        for path in paths:
+            path = os.path.normpath(path)
+            while path and path not in directories:
+                if os.path.isdir(os.path.join(repo.working_dir, path)):
+                    directories.add(path)
+                path = os.path.dirname(path)
+
+        return cls(repo.working_dir, files=files, directories=directories)
+
+    @classmethod
+    def scan(cls, root, paths=None):
+        """Record stat information of files below the given paths.
+
+        The whole working tree is scanned if no paths are given.
+        """
+        self = cls(root)
+        parents = {'.'}
+        for path in ('.', ) if paths is None else paths:
+            path = os.path.normpath(path)
+            parent = os.path.dirname(path)
+            while parent and os.path.isdir(os.path.join(self.root, parent)):
+                parents.add(parent)
+                parent = os.path.dirname(parent)
+            self._visit(path)
+        self.directories |= parents
+        return self
+
+    def _visit(self, path):
+        """Record a file or a directory recursively."""
+        if os.path.basename(path) == '.git':
+            return
+        try:
+            value = os.lstat(os.path.join(self.root, path))
+        except (FileNotFoundError, NotADirectoryError):
+            return
+
+        if not stat.S_ISDIR(value.st_mode):
+            self.files[path] = _key(value)
+        elif path not in self.directories:
+            self.directories.add(path)
+            for entry in os.scandir(os.path.join(self.root, path)):
+                self._visit(os.path.normpath(os.path.join(path, entry.name)))
+
+    def is_unchanged(self, path):
+        """Check if a file still has the recorded stat information."""
+        before = self.files.get(path)
+        try:
+            after = _key(os.lstat(os.path.join(self.root, path)))
+        except OSError:
+            return False
+        return before is not None and not _changed(before, after)
+
+    def diff(self, after):
+        """Return paths of files created or modified since the snapshot."""
+        return {
+            path
+            for path, value in after.files.items()
+            if path not in self.files or _changed(self.files[path], value)
+        }
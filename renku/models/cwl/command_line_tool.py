@@ -18,6 +18,7 @@
 """Represent a ``CommandLineTool`` from the Common Workflow Language."""
 
 import fnmatch
+import itertools
 import os
 import re
 import shlex
@@ -34,7 +35,7 @@ from ._ascwl import CWLClass, mapped
 from .parameter import CommandInputParameter, CommandLineBinding, \
     CommandOutputParameter
 from .process import Process
-from .types import PATH_OBJECTS, Directory, File
+from .types import PATH_OBJECTS, PATH_TYPES, Directory, File
 
 
 def convert_arguments(value):
@@ -228,9 +229,45 @@ class CommandLineToolFactory(object):
             successCodes=self.successCodes,
         )
 
+    def snapshot_paths(self, client, outputs=None, hints=None):
+        """Return repository paths which can be changed by the command.
+
+        These are the declared outputs and hints together with paths given
+        as arguments and standard streams. Directories contain all files
+        below them.
+        """
+        paths = [
+            os.path.abspath(path)
+            for path in itertools.chain(outputs or (), hints or ())
+        ]
+        for input_ in self.inputs:
+            if isinstance(input_.default, PATH_TYPES):
+                paths.append(str(input_.default.path))
+            elif isinstance(input_.default, str):
+                paths.append(str(self.directory / input_.default))
+        for stream_name in ('stdout', 'stderr'):
+            stream = getattr(self, stream_name)
+            if stream:
+                paths.append(str(self.working_dir / stream))
+
+        relative = (os.path.relpath(path, str(client.path)) for path in paths)
+        return sorted({
+            path
+            for path in relative
+            if path != '..' and not path.startswith('..' + os.sep)
+        })
+
     @contextmanager
-    def watch(self, client, no_output=False, outputs=None):
-        """Watch a Renku repository for changes to detect outputs."""
+    def watch(
+        self, client, no_output=False, outputs=None, hints=None, scoped=False
+    ):
+        """Watch a Renku repository for changes to detect outputs.
+
+        If outputs or hints are given or the watch is scoped, changes are
+        detected by comparing stat information of paths from
+        :meth:`snapshot_paths` before and after the execution. Otherwise the
+        working tree is scanned once by ``git status`` after the execution.
+        """
         tool = self.generate_tool()
         repo = client.repo
 
@@ -247,11 +284,19 @@ class CommandLineToolFactory(object):
             for directory in directories:
                 Path(directory).mkdir(parents=True, exist_ok=True)
 
-        # NOTE consider to use git index instead
-        existing_directories = {
-            str(p.relative_to(client.path))
-            for p in client.path.glob('**/')
-        }
+        from renku.models._snapshot import Snapshot
+
+        if outputs or hints or scoped:
+            scope = self.snapshot_paths(client, outputs, hints)
+            snapshot = Snapshot.scan(client.path, scope)
+        else:
+            # Nothing has changed since the index was written. Untracked
+            # directories given as arguments can still be outputs.
+            scope = None
+            snapshot = Snapshot.from_index(
+                repo, paths=self.snapshot_paths(client)
+            )
+        existing_directories = snapshot.directories
 
         yield tool
 
@@ -261,11 +306,24 @@ class CommandLineToolFactory(object):
             # Keep track of unmodified output files.
             unmodified = set()
             # Possible output paths.
-            candidates = set(repo.untracked_files)
-            candidates |= {
-                item.a_path
-                for item in repo.index.diff(None) if not item.deleted_file
-            }
+            # Redirected streams are created before the snapshot.
+            streams = {
+                getattr(self, stream_name)
+                for stream_name in ('stdout', 'stderr')
+            } - {None}
+            if scope is None:
+                # The repository was clean before the execution.
+                status = client.refresh_status()
+                candidates = set(status.untracked) | {
+                    path
+                    for path in status.modified
+                    if os.path.lexists(os.path.join(repo.working_dir, path))
+                }
+            else:
+                after = Snapshot.scan(client.path, scope)
+                candidates = client.filter_changed_paths(
+                    snapshot.diff(after) | streams
+                )
 
             from renku.cli._graph import _safe_path
             candidates = {path for path in candidates if _safe_path(path)}
@@ -24,6 +24,7 @@ from .activities import Activity, ProcessRun, WorkflowRun
 from .agents import Person, SoftwareAgent
 from .entities import Collection, Entity, Process, Workflow
 from .expanded import Project
+from .metrics import ResourceUsage
 from .qualified import Generation, Usage
 
 __all__ = (
@@ -35,6 +36,7 @@ __all__ = (
     'Process',
     'ProcessRun',
     'Project',
+    'ResourceUsage',
     'SoftwareAgent',
     'Usage',
     'Workflow',
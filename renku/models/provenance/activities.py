@@ -17,12 +17,13 @@
 # limitations under the License.
 """Represent a Git commit."""
 
+import json
 import os
 from collections import OrderedDict
 from pathlib import Path
 
 import attr
-from git import NULL_TREE
+from werkzeug.utils import cached_property
 
 from renku.models import _jsonld as jsonld
 from renku.models.cwl import WORKFLOW_STEP_RUN_TYPES
@@ -30,6 +31,7 @@ from renku.models.cwl._ascwl import CWLClass
 from renku.models.cwl.types import PATH_OBJECTS
 
 from .entities import Collection, CommitMixin, Entity, Process, Workflow
+from .metrics import ResourceUsage
 from .qualified import Association, Generation, Usage
 
 
@@ -175,9 +177,9 @@ class Activity(CommitMixin):
     def paths(self):
         """Return all paths in the commit."""
         return {
-            item.a_path
-            for item in self.commit.diff(self.commit.parents or NULL_TREE)
-            # if not item.deleted_file
+            path
+            for _, path in self.client.commit_changes(self.commit)
+            # if change_type != 'D'
         }
 
     @classmethod
@@ -236,14 +238,62 @@ class Activity(CommitMixin):
         yield from reversed(collections.values())
 
 
+class _MetricsMixin:
+    """Load resource usage recorded next to a process on first access.
+
+    attrs removes the definition of the ``metrics`` field from
+    :class:`ProcessRun`, hence the loader is defined on a base class.
+    """
+
+    @cached_property
+    def _recorded_metrics(self):
+        """Return resource usage stored next to the process or ``None``."""
+        if self.path and self.commit:
+            try:
+                blob = self.commit.tree / self.client.metrics_path(self.path)
+                return json.loads(blob.data_stream.read().decode('utf-8'))
+            except (KeyError, TypeError, ValueError):
+                pass
+
+    @cached_property
+    def metrics(self):
+        """Load resource usage recorded next to the process.
+
+        Steps of a workflow run share the file recorded for the workflow.
+        """
+        if self.part_of is None:
+            data = self._recorded_metrics
+        else:
+            data = (self.part_of._recorded_metrics or {}).get('steps', {})
+            data = data.get(self._step_id)
+
+        # Nothing is recorded if all steps were restored.
+        if data and data.keys() & ResourceUsage._jsonld_fields:
+            return ResourceUsage.from_dict(data)
+
+    @property
+    def _step_id(self):
+        """Return the identifier of the step in its workflow."""
+        return self._id.rpartition('/steps/')[2]
+
+    @property
+    def restored(self):
+        """Check if outputs of the step were restored from a step cache."""
+        if self.part_of is None:
+            return False
+        recorded = self.part_of._recorded_metrics or {}
+        return self._step_id in recorded.get('restored', ())
+
+
 @jsonld.s(
     type='wfprov:ProcessRun',
     context={
+        'renku': 'https://swissdatasciencecenter.github.io/renku-ontology#',
         'wfprov': 'http://purl.org/wf4ever/wfprov#',
     },
     cmp=False,
 )
-class ProcessRun(Activity):
+class ProcessRun(Activity, _MetricsMixin):
     """A process run is a particular execution of a Process description."""
 
     __association_cls__ = Process
@@ -267,6 +317,8 @@ class ProcessRun(Activity):
 
     qualified_usage = jsonld.ib(context='prov:qualifiedUsage', kw_only=True)
 
+    metrics = jsonld.ib(context='renku:resourceUsage', init=False, repr=False)
+
     @generated.default
     def default_generated(self):
         """Calculate default values."""
@@ -17,6 +17,7 @@
 # limitations under the License.
 """Represent provenance entities."""
 
+import sys
 import weakref
 
 import attr
@@ -25,8 +26,8 @@ from renku.models import _jsonld as jsonld
 
 
 def _str_or_none(data):
-    """Return str representation or None."""
-    return str(data) if data is not None else data
+    """Return interned str representation or None."""
+    return sys.intern(str(data)) if data is not None else data
 
 
 @attr.s(cmp=False)
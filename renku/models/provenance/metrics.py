@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Represent resources used by an execution."""
+
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+import attr
+
+from renku.models import _jsonld as jsonld
+
+
+def _io_counters():
+    """Return bytes read and written by the process and reaped children."""
+    try:
+        with open('/proc/self/io', 'r') as fp:
+            counters = dict(line.split(':', 1) for line in fp)
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+@jsonld.s(
+    type='renku:ResourceUsage',
+    context={
+        'renku': 'https://swissdatasciencecenter.github.io/renku-ontology#',
+    },
+    frozen=True,
+    slots=True,
+)
+class ResourceUsage:
+    """Represent resources used by child processes of an execution.
+
+    Times are in seconds and sizes in bytes. The peak memory usage is the
+    largest resident set size of a single child process or ``None`` if it
+    can not be attributed to the execution.
+    """
+
+    wall_time = jsonld.ib(context='renku:wallTime', kw_only=True)
+    user_time = jsonld.ib(context='renku:userTime', kw_only=True)
+    system_time = jsonld.ib(context='renku:systemTime', kw_only=True)
+    max_rss = jsonld.ib(context='renku:maxResidentSetSize', kw_only=True)
+    read_bytes = jsonld.ib(context='renku:readBytes', kw_only=True)
+    written_bytes = jsonld.ib(context='renku:writtenBytes', kw_only=True)
+
+    @staticmethod
+    def snapshot():
+        """Return counters to measure the following execution."""
+        return (
+            time.monotonic(),
+            resource.getrusage(resource.RUSAGE_CHILDREN),
+            _io_counters(),
+        )
+
+    @classmethod
+    def since(cls, snapshot, usage=None):
+        """Create an instance with resources used since the snapshot.
+
+        :param usage: Resource usage of the only measured child process. If
+            it is not given, usage of all children reaped since the snapshot
+            is used.
+        """
+        started, before, io_before = snapshot
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        io_after = _io_counters()
+
+        # Forked children inherit the peak memory usage of this process.
+        floor = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        if usage is not None:
+            before = None
+        else:
+            floor = max(floor, before.ru_maxrss)
+            usage = after
+
+        # Otherwise the peak can not be attributed to the execution.
+        max_rss = usage.ru_maxrss if usage.ru_maxrss > floor else None
+
+        def delta(name):
+            value = getattr(usage, name)
+            return value - getattr(before, name) if before else value
+
+        if io_before and io_after:
+            read_bytes = io_after[0] - io_before[0]
+            written_bytes = io_after[1] - io_before[1]
+        else:
+            # Fall back to block operations which are counted in 512 bytes.
+            read_bytes = delta('ru_inblock') * 512
+            written_bytes = delta('ru_oublock') * 512
+
+        if max_rss is not None and sys.platform != 'darwin':
+            # Linux reports the resident set size in kilobytes.
+            max_rss *= 1024
+
+        return cls(
+            wall_time=round(time.monotonic() - started, 3),
+            user_time=round(delta('ru_utime'), 3),
+            system_time=round(delta('ru_stime'), 3),
+            max_rss=max_rss,
+            read_bytes=read_bytes,
+            written_bytes=written_bytes,
+        )
+
+    def wall_time_only(self):
+        """Return only the wall time of an execution run concurrently.
+
+        Counters of child processes can not be attributed to one of several
+        concurrent executions.
+        """
+        return self.__class__(
+            wall_time=self.wall_time,
+            user_time=None,
+            system_time=None,
+            max_rss=None,
+            read_bytes=None,
+            written_bytes=None,
+        )
+
+    @classmethod
+    def call(cls, args, **kwargs):
+        """Run a command like :func:`subprocess.call` and measure it.
+
+        Return the exit code of the command and its resource usage.
+        """
+        snapshot = cls.snapshot()
+        with subprocess.Popen(args, **kwargs) as process:
+            try:
+                _, status, usage = os.wait4(process.pid, 0)
+            except BaseException:
+                # Including KeyboardInterrupt, see subprocess.call.
+                process.kill()
+                raise
+
+            if os.WIFSIGNALED(status):
+                process.returncode = -os.WTERMSIG(status)
+            else:
+                process.returncode = os.WEXITSTATUS(status)
+
+        return process.returncode, cls.since(snapshot, usage=usage)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create an instance from a dictionary ignoring unknown keys."""
+        return cls(**{key: data.get(key) for key in cls._jsonld_fields})
+
+    def as_dict(self):
+        """Return the values as an ordered dictionary."""
+        return OrderedDict((field.name, getattr(self, field.name))
+                           for field in attr.fields(self.__class__)
+                           if field.name in self._jsonld_fields)
+
+    def __str__(self):
+        """Format the values for humans."""
+
+        def seconds(value):
+            if value is None:
+                return 'unknown'
+            return '{0:.2f}s'.format(value)
+
+        def size(value):
+            if value is None:
+                return 'unknown'
+            for unit in ('B', 'KiB', 'MiB', 'GiB'):
+                if value < 1024:
+                    break
+                value /= 1024
+            return '{0:.1f} {1}'.format(value, unit)
+
+        return (
+            'wall {0}, user {1}, system {2}, peak RSS {3}, '
+            'read {4}, written {5}'.format(
+                seconds(self.wall_time),
+                seconds(self.user_time),
+                seconds(self.system_time),
+                size(self.max_rss),
+                size(self.read_bytes),
+                size(self.written_bytes),
+            )
+        )
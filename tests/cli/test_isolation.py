@@ -21,6 +21,8 @@ import subprocess
 import sys
 import time
 
+import pytest
+
 from renku._compat import Path
 
 
@@ -108,3 +110,121 @@ def test_file_modification_during_run(tmpdir, runner, project, client, run):
         for modification in diff if modification.change_type == 'M'
     ]
     assert 0 == len(modifications)
+
+
+def test_parallel_runs_in_isolation(tmpdir, runner, project, client):
+    """Test that isolated runs execute and commit concurrently."""
+    script = client.path / 'script.py'
+    started = Path(str(tmpdir.mkdir('started')))
+
+    with client.commit():
+        with script.open('w') as fp:
+            fp.write(
+                'import os, sys, time\n'
+                'open(os.path.join("{started}", sys.argv[1]), "w").close()\n'
+                'while len(os.listdir("{started}")) < 2:\n'
+                '    time.sleep(0.1)\n'
+                'open(sys.argv[1], "w").write(sys.argv[1])\n'.format(
+                    started=str(started)
+                )
+            )
+
+    prefix = [sys.executable, '-m', 'renku', 'run', '--isolation']
+    processes = [
+        subprocess.Popen(prefix + ['python', script.name, name])
+        for name in ('first', 'second')
+    ]
+    assert [0, 0] == [process.wait(timeout=60) for process in processes]
+
+    assert (client.path / 'first').exists()
+    assert (client.path / 'second').exists()
+    assert not client.repo.is_dirty(untracked_files=True)
+
+
+def test_reuse_worktree_in_isolation(runner, project, client, run):
+    """Test that isolated runs reuse the same worktree."""
+    pool = Path(client.repo.git_dir) / client.WORKTREES
+    prefix = ['run', '--isolation']
+
+    assert 0 == run(prefix + ['touch', 'first'])
+    worktrees = set(pool.iterdir())
+
+    assert 0 == run(prefix + ['touch', 'second'])
+    assert worktrees == set(pool.iterdir())
+
+    assert (client.path / 'first').exists()
+    assert (client.path / 'second').exists()
+    assert not client.repo.is_dirty(untracked_files=True)
+
+
+def test_abort_failed_merge_in_isolation(runner, project):
+    """Test that a conflicting isolated run leaves the repository clean."""
+    from renku import errors
+    from renku.api import LocalClient
+
+    client = LocalClient(path=project, use_external_storage=False)
+    with pytest.raises(errors.FailedMerge):
+        with client.worktree() as isolated:
+            (isolated.path / 'conflict').write_text('isolated')
+            isolated.repo.index.add(['conflict'])
+            isolated.repo.index.commit('Isolated change')
+
+            (client.path / 'conflict').write_text('concurrent')
+            client.repo.index.add(['conflict'])
+            client.repo.index.commit('Concurrent change')
+
+    head = client.repo.head.commit
+    assert 'Concurrent change' == head.message
+    assert not (Path(client.repo.git_dir) / 'MERGE_HEAD').exists()
+    assert not client.repo.is_dirty(untracked_files=True)
+
+
+def test_invalid_lock_timeout(runner, project, monkeypatch):
+    """Test validation of the repository lock timeout."""
+    from renku.api import LocalClient
+    from renku.cli import cli
+
+    result = runner.invoke(
+        cli, ['run', 'touch', 'output'], env={'RENKU_LOCK_TIMEOUT': 'forever'}
+    )
+    assert 2 == result.exit_code
+    assert '--lock-timeout' in result.output
+
+    # The environment is read only by the command line interface.
+    monkeypatch.setenv('RENKU_LOCK_TIMEOUT', 'forever')
+    assert 0 == LocalClient(project).lock_timeout
+
+
+def test_prune_worktrees_in_isolation(
+    monkeypatch, runner, project, client, run
+):
+    """Test that the worktree pool is capped and merged branches removed."""
+    import os
+
+    import filelock
+
+    pool = Path(client.repo.git_dir) / client.WORKTREES
+    prefix = ['run', '--isolation']
+    branches = set(client.repo.branches)
+
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    assert 0 == run(prefix + ['touch', 'first'])
+    (pool / '5').mkdir()
+
+    # Ignored files are removed from reused worktrees.
+    ignored = pool / '0' / 'backup~'
+    ignored.write_text('previous')
+
+    monkeypatch.setattr(os, 'cpu_count', lambda: 1)
+    assert 0 == run(prefix + ['touch', 'second'])
+    assert {'0'} == {path.name for path in pool.iterdir() if path.is_dir()}
+    assert not ignored.exists()
+
+    # Commands exceeding the pool use a temporary worktree.
+    with filelock.FileLock(str(pool / '0.lock')):
+        assert 0 == run(prefix + ['touch', 'third'])
+    assert {'0'} == {path.name for path in pool.iterdir() if path.is_dir()}
+    assert 1 == len(client.repo.git.worktree('list').splitlines()) - 1
+
+    assert branches == set(client.repo.branches)
+    assert not client.repo.is_dirty(untracked_files=True)
@@ -111,3 +111,24 @@ def test_output_directory_without_separate_outputs(runner, client, run):
 
     assert 1 == len(cwl.outputs)
     assert 'Directory' == cwl.outputs[0].type
+
+
+def test_input_hint_limits_detection(runner, client, run):
+    """Test that only hinted paths and arguments are checked for changes."""
+    (client.path / 'results').mkdir()
+    base_sh = ['sh', '-c', 'touch results/foo "$0" other']
+
+    assert 0 == run(
+        args=['run', '--input-hint', 'results'] + base_sh + ['hello.txt']
+    )
+
+    tools = list(client.workflow_path.glob('*_sh.cwl'))
+    assert 1 == len(tools)
+
+    with tools[0].open('r') as f:
+        cwl = CWLClass.from_cwl(yaml.safe_load(f))
+
+    globs = {output.outputBinding.glob for output in cwl.outputs}
+    assert 'results/foo' in globs
+    assert 'other' not in globs
+    assert 2 == len(cwl.outputs)
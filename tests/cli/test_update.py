@@ -242,3 +242,482 @@ def test_siblings_in_output_directory(runner, project, run):
 
     assert 0 == run(args=['update', 'output'])
     check_files()
+
+
+def test_update_jobs(runner, project, run):
+    """Test parallel update of independent outputs."""
+    cwd = Path(project)
+    repo = git.Repo(project)
+    sources = [cwd / 'first.txt', cwd / 'second.txt']
+
+    def update_sources(data):
+        """Update all sources."""
+        for source in sources:
+            with source.open('w') as fp:
+                fp.write(data)
+
+        repo.git.add('--all')
+        repo.index.commit('Updated sources')
+
+    update_sources('1')
+
+    for source in sources:
+        output = source.with_suffix('.wc')
+        assert 0 == run(args=('run', 'wc', '-c'), stdin=source, stdout=output)
+
+    update_sources('12')
+
+    result = runner.invoke(cli.cli, ['status'])
+    assert 1 == result.exit_code
+
+    assert 0 == run(args=('update', '--jobs', '2'))
+
+    result = runner.invoke(cli.cli, ['status'])
+    assert 0 == result.exit_code
+
+    for source in sources:
+        with source.with_suffix('.wc').open('r') as fp:
+            assert fp.read().strip() == '2'
+
+
+def test_update_cache(runner, project, run, tmpdir):
+    """Test restoring of previously computed outputs."""
+    cwd = Path(project)
+    repo = git.Repo(project)
+    source = cwd / 'source.txt'
+    output = cwd / 'source.wc'
+    log = Path(str(tmpdir.join('update.log')))
+
+    def update_source(data):
+        """Update the source."""
+        with source.open('w') as fp:
+            fp.write(data)
+
+        repo.git.add('--all')
+        repo.index.commit('Updated source')
+
+    def update(*args):
+        """Run the update and return its output."""
+        assert 0 == run(args=('update', ) + args, stdout=log)
+        with log.open('r') as fp:
+            return fp.read()
+
+    update_source('1')
+    assert 0 == run(args=('run', 'wc', '-c'), stdin=source, stdout=output)
+
+    for data in ('12', '1'):
+        update_source(data)
+        assert '0 hit(s), 1 miss(es)' in update()
+
+    update_source('12')
+    assert '1 hit(s), 0 miss(es)' in update()
+
+    with output.open('r') as fp:
+        assert fp.read().strip() == '2'
+
+    result = runner.invoke(cli.cli, ['status'])
+    assert 0 == result.exit_code
+
+    from renku.api import LocalClient
+    cached = LocalClient(project).step_cache.data
+
+    update_source('1')
+    assert 'Step cache' not in update('--no-cache')
+    assert cached == LocalClient(project).step_cache.data
+
+
+def test_update_dry_run(runner, project, run):
+    """Test planning of an update without executing it."""
+    cwd = Path(project)
+    repo = git.Repo(project)
+    source = cwd / 'source.txt'
+
+    with source.open('w') as fp:
+        fp.write('1')
+    repo.git.add('--all')
+    repo.index.commit('Added source')
+
+    for name in ('first', 'second'):
+        assert 0 == run(
+            args=('run', 'wc', '-c'), stdin=source, stdout=cwd / name
+        )
+    assert 0 == run(args=('run', 'cat', 'first', 'second'), stdout=cwd / 'all')
+
+    with source.open('w') as fp:
+        fp.write('12')
+    repo.git.add('--all')
+    repo.index.commit('Updated source')
+    head = repo.head.commit
+
+    result = runner.invoke(
+        cli.cli, ['update', '--dry-run', '--jobs', '2'],
+        catch_exceptions=False
+    )
+    assert 0 == result.exit_code
+    assert '3. ' in result.output
+    assert '-> all (' in result.output.splitlines()[-4]
+    assert 'Critical path' in result.output
+    assert 'Estimated wall time with 2 job(s)' in result.output
+
+    assert head == repo.head.commit
+    assert not repo.is_dirty(untracked_files=True)
+
+    # A dry run neither requires a clean repository nor the lock.
+    from renku.api import LocalClient
+
+    untracked = cwd / 'untracked.txt'
+    untracked.write_text('dirty')
+    with LocalClient(project).lock:
+        result = runner.invoke(
+            cli.cli, ['update', '--dry-run'], catch_exceptions=False
+        )
+    assert 0 == result.exit_code
+    assert head == repo.head.commit
+    untracked.unlink()
+
+
+def test_update_stream(runner, project, run):
+    """Test streaming of intermediate files through pipes."""
+    cwd = Path(project)
+    repo = git.Repo(project)
+    source = cwd / 'source.txt'
+    upper = cwd / 'upper.txt'
+    output = cwd / 'count.txt'
+
+    with source.open('w') as fp:
+        fp.write('abc')
+    repo.git.add('--all')
+    repo.index.commit('Added source')
+
+    assert 0 == run(
+        args=('run', 'tr', 'a-z', 'A-Z'), stdin=source, stdout=upper
+    )
+    assert 0 == run(args=('run', 'wc', '-c'), stdin=upper, stdout=output)
+
+    with source.open('w') as fp:
+        fp.write('abcdef')
+    repo.git.add('--all')
+    repo.index.commit('Updated source')
+
+    result = runner.invoke(
+        cli.cli, ['update', '--stream', 'count.txt'], catch_exceptions=False
+    )
+    assert 0 == result.exit_code
+    assert 'Streamed files' in result.output
+
+    with output.open('r') as f:
+        assert f.read().strip() == '6'
+    # The committed intermediate is kept instead of being written.
+    with upper.open('r') as f:
+        assert f.read() == 'ABC'
+    assert 'upper.txt' in repo.head.commit.tree
+
+    assert not repo.is_dirty(untracked_files=True)
+
+    result = runner.invoke(cli.cli, ['status'])
+    assert 0 == result.exit_code
+    assert 'All files were generated from the latest inputs.' in \
+        result.output
+
+
+def test_update_stream_unread(runner, project, run):
+    """Test streaming to a step which does not read the whole stream."""
+    cwd = Path(project)
+    repo = git.Repo(project)
+    source = cwd / 'unread_source.txt'
+    upper = cwd / 'unread_upper.txt'
+    output = cwd / 'unread_done.txt'
+
+    with source.open('w') as fp:
+        fp.write('abc')
+    repo.git.add('--all')
+    repo.index.commit('Added source')
+
+    assert 0 == run(
+        args=('run', 'tr', 'a-z', 'A-Z'), stdin=source, stdout=upper
+    )
+    assert 0 == run(
+        args=('run', 'sh', '-c', 'echo done'), stdin=upper, stdout=output
+    )
+
+    with source.open('w') as fp:
+        fp.write('abcdef')
+    repo.git.add('--all')
+    repo.index.commit('Updated source')
+    head = repo.head.commit
+
+    result = runner.invoke(
+        cli.cli, ['update', '--stream', '--jobs', '2', 'unread_done.txt']
+    )
+    assert 2 == result.exit_code
+    assert head == repo.head.commit
+
+    result = runner.invoke(
+        cli.cli, ['update', '--stream', 'unread_done.txt'],
+        catch_exceptions=False
+    )
+    assert 0 == result.exit_code, result.output
+    assert 'Streamed files' in result.output
+
+    with upper.open('r') as f:
+        assert f.read() == 'ABC'
+    with output.open('r') as f:
+        assert f.read() == 'done\n'
+    assert not repo.is_dirty(untracked_files=True)
+
+
+def test_update_stream_failure(runner, project, run):
+    """Test that a failed streamed step leaves the repository unchanged."""
+    cwd = Path(project)
+    repo = git.Repo(project)
+    source = cwd / 'failing_source.txt'
+    upper = cwd / 'failing_upper.txt'
+    output = cwd / 'failing_count.txt'
+
+    with source.open('w') as fp:
+        fp.write('abc')
+    repo.git.add('--all')
+    repo.index.commit('Added source')
+
+    assert 0 == run(
+        args=('run', 'tr', 'a-z', 'A-Z'), stdin=source, stdout=upper
+    )
+    assert 0 == run(
+        args=('run', 'sh', '-c', 'wc -c; test ! -e fail'),
+        stdin=upper,
+        stdout=output,
+    )
+
+    with source.open('w') as fp:
+        fp.write('abcdef')
+    (cwd / 'fail').touch()
+    with (cwd / '.gitignore').open('a') as fp:
+        fp.write('\nfail\n')
+    repo.git.add('--all')
+    repo.index.commit('Updated source')
+    head = repo.head.commit
+
+    result = runner.invoke(
+        cli.cli, ['update', '--stream', 'failing_count.txt']
+    )
+    assert 1 == result.exit_code
+    assert head == repo.head.commit
+
+    with upper.open('r') as f:
+        assert f.read() == 'ABC'
+    assert not repo.is_dirty(untracked_files=True)
+
+
+def test_update_stream_unsupported(runner, project, run):
+    """Test that streaming rejects tools with requirements."""
+    cwd = Path(project)
+    repo = git.Repo(project)
+    source = cwd / 'required_source.txt'
+    upper = cwd / 'required_upper.txt'
+    directory = cwd / 'required'
+    directory.mkdir()
+
+    with source.open('w') as fp:
+        fp.write('abc')
+    (directory / 'existing').touch()
+    repo.git.add('--all')
+    repo.index.commit('Added source')
+
+    assert 0 == run(
+        args=('run', 'tr', 'a-z', 'A-Z'), stdin=source, stdout=upper
+    )
+    assert 0 == run(
+        args=('run', 'sh', '-c', 'wc -c > required/count'), stdin=upper
+    )
+
+    with source.open('w') as fp:
+        fp.write('abcdef')
+    repo.git.add('--all')
+    repo.index.commit('Updated source')
+    head = repo.head.commit
+
+    result = runner.invoke(cli.cli, ['update', '--stream', 'required/count'])
+    assert 2 == result.exit_code
+    assert 'without requirements' in result.output
+    assert head == repo.head.commit
+    assert not repo.is_dirty(untracked_files=True)
+
+
+def test_relocate_failure(tmpdir, monkeypatch):
+    """Test restoring an output directory if it can not be replaced."""
+    import errno
+    import os
+
+    from renku.cli import _cwl
+
+    source = Path(str(tmpdir.mkdir('source')))
+    (source / 'new').write_text('new')
+    destination = Path(str(tmpdir.mkdir('destination')))
+    (destination / 'old').write_text('old')
+
+    rename = os.rename
+
+    def cross_device(src, dst):
+        """Fail to rename the source like on another filesystem."""
+        if src == str(source):
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+        return rename(src, dst)
+
+    def fail(src, dst):
+        """Fail to replace the destination."""
+        raise OSError(errno.EIO, 'Input/output error')
+
+    monkeypatch.setattr(os, 'rename', cross_device)
+    monkeypatch.setattr(os, 'replace', fail)
+
+    try:
+        _cwl._relocate(str(source), destination)
+    except OSError as e:
+        assert errno.EIO == e.errno
+    else:
+        assert False, 'The replacement should fail.'
+
+    assert ['old'] == os.listdir(str(destination))
+    assert ['new'] == os.listdir(str(source))
+    assert {'destination', 'source'} == set(os.listdir(str(tmpdir)))
+
+    monkeypatch.setattr(os, 'replace', rename)
+    _cwl._relocate(str(source), destination)
+    assert 'new' == (destination / 'new').read_text()
+    assert ['new'] == os.listdir(str(destination))
+    assert {'destination', 'source'} == set(os.listdir(str(tmpdir)))
+
+
+def test_update_step_metrics(runner, project, run):
+    """Test that steps of updates are planned with their own metrics."""
+    import uuid
+
+    import yaml
+
+    from renku.api import LocalClient
+    from renku.cli._graph import Graph
+    from renku.cli._plan import ExecutionPlan
+    from renku.models.cwl._ascwl import ascwl
+    from renku.models.provenance import ResourceUsage
+
+    cwd = Path(project)
+    repo = git.Repo(project)
+    source = cwd / 'metered_source.txt'
+    source.write_text('1')
+    repo.git.add('--all')
+    repo.index.commit('Added source')
+
+    for name in ('metered_first', 'metered_second'):
+        assert 0 == run(
+            args=('run', 'wc', '-c'), stdin=source, stdout=cwd / name
+        )
+
+    # Record a workflow like an update with resource usage of its steps.
+    client = LocalClient(project)
+    graph = Graph(client)
+    outputs = graph.build(paths=['metered_first', 'metered_second'])
+    steps = {}
+    workflow = graph.ascwl(
+        input_paths={'metered_source.txt'},
+        output_paths={'metered_first', 'metered_second'},
+        outputs=outputs,
+        steps=steps,
+    )
+    output_file = client.workflow_path / '{0}.cwl'.format(uuid.uuid4().hex)
+    output_file.write_text(
+        yaml.dump(
+            ascwl(
+                workflow,
+                filter=lambda _, x: x is not None,
+                basedir=client.workflow_path,
+            ),
+            default_flow_style=False,
+        )
+    )
+    usage = {
+        step.id: ResourceUsage(
+            wall_time=float(index),
+            user_time=None,
+            system_time=None,
+            max_rss=None,
+            read_bytes=None,
+            written_bytes=None,
+        )
+        for index, step in enumerate(workflow.steps, 10)
+    }
+    client.store_metrics(output_file, usage[workflow.steps[0].id], usage)
+    for name in ('metered_first', 'metered_second'):
+        (cwd / name).write_text('updated\n')
+    repo.git.add('--all')
+    repo.index.commit('renku update')
+
+    activity = LocalClient(project).process_commit()
+    assert {
+        step_id: subprocess.metrics
+        for step_id, subprocess in activity.subprocesses.items()
+    } == usage
+
+    graph = Graph(LocalClient(project))
+    graph.build(paths=['metered_first', 'metered_second'])
+    plan = ExecutionPlan(graph, workflow, steps)
+    for process_run, step_id in steps.items():
+        samples = plan.history[process_run.path].values()
+        assert usage[step_id].wall_time in samples
+
+
+def test_update_cache_step_metrics(project, run):
+    """Test that metrics of a partially restored update keep step ids."""
+    from renku.api import LocalClient
+
+    cwd = Path(project)
+    repo = git.Repo(project)
+    sources = [cwd / 'cached_source.txt', cwd / 'executed_source.txt']
+
+    def update_sources(*data):
+        """Update the sources."""
+        for source, value in zip(sources, data):
+            source.write_text(value)
+
+        repo.git.add('--all')
+        repo.index.commit('Updated sources')
+
+    update_sources('1', '1')
+    for source in sources:
+        output = source.with_suffix('.wc')
+        assert 0 == run(args=('run', 'wc', '-c'), stdin=source, stdout=output)
+
+    for data in ('12', '1'):
+        update_sources(data, data)
+        assert 0 == run(args=('update', ))
+
+    update_sources('12', '123')
+    assert 0 == run(args=('update', ))
+
+    activity = LocalClient(project).process_commit()
+    executed = {
+        step_id
+        for step_id, subprocess in activity.subprocesses.items()
+        if 'executed_source.wc' in subprocess.outputs
+    }
+    assert executed == {
+        step_id
+        for step_id, subprocess in activity.subprocesses.items()
+        if subprocess.metrics is not None
+    }
+    assert executed == {
+        step_id
+        for step_id, subprocess in activity.subprocesses.items()
+        if not subprocess.restored
+    }
+
+    # Only restored steps are recorded if nothing was executed.
+    update_sources('1', '1')
+    assert 0 == run(args=('update', ))
+
+    activity = LocalClient(project).process_commit()
+    assert 2 == len(activity.subprocesses)
+    assert activity.metrics is None
+    assert all(
+        subprocess.restored and subprocess.metrics is None
+        for subprocess in activity.subprocesses.values()
+    )
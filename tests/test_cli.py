@@ -297,6 +297,107 @@ def test_streams_cleanup(runner, project, run):
         assert fp.read() == '1'
 
 
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_run_batch(runner, client, jobs):
+    """Test tracking of commands listed in a batch file."""
+    repo = client.repo
+    (client.path / 'source.txt').write_text('first,second,third\n')
+    repo.git.add('--all')
+    repo.index.commit('Added source.txt')
+    head = repo.head.commit
+
+    batch = client.path / '.git' / 'commands.txt'
+    batch.write_text(
+        '# Count and cut the source.\n'
+        'wc < source.txt > result.wc\n'
+        'cut -d, -f 2 source.txt > result.cut\n'
+        '\n'
+        'cat result.wc result.cut > result.txt\n'
+    )
+
+    result = runner.invoke(
+        cli.cli,
+        ['run', '--batch', str(batch), '--jobs',
+         str(jobs)]
+    )
+    assert 0 == result.exit_code, result.output
+
+    commits = list(repo.iter_commits('{0}..HEAD'.format(head)))
+    assert 3 == len(commits)
+    for commit in commits:
+        cwls = [path for path in commit.stats.files if path.endswith('.cwl')]
+        assert 1 == len(cwls)
+
+    assert not repo.is_dirty(untracked_files=True)
+
+    result = runner.invoke(cli.cli, ['status'])
+    assert 0 == result.exit_code
+
+    result = runner.invoke(cli.cli, ['show', 'inputs'])
+    assert 0 == result.exit_code
+    assert {'source.txt', 'result.cut',
+            'result.wc'} == set(result.output.split())
+
+
+def test_run_batch_metrics(runner, client):
+    """Test that only the wall time of parallel commands is recorded."""
+    repo = client.repo
+    for name in ('first', 'second'):
+        (client.path / '{0}.txt'.format(name)).write_text(name)
+    repo.git.add('--all')
+    repo.index.commit('Added sources')
+
+    batch = client.path / '.git' / 'commands.txt'
+    batch.write_text(
+        'wc < first.txt > first.wc\ncat < second.txt > second.cat\n'
+    )
+
+    result = runner.invoke(
+        cli.cli,
+        ['run', '--batch', str(batch), '--jobs', '2']
+    )
+    assert 0 == result.exit_code, result.output
+
+    result = runner.invoke(cli.cli, ['show', 'metrics'])
+    assert 0 == result.exit_code
+    lines = result.output.splitlines()
+    assert ['first.wc', 'second.cat'] == [line.split()[0] for line in lines]
+    for line in lines:
+        assert 'wall_time=None' not in line
+        assert 'user_time=None' in line
+        assert 'read_bytes=None' in line
+
+
+def test_run_batch_undeclared_changes(runner, client):
+    """Test that parallel commands can not change paths they do not use."""
+    repo = client.repo
+    head = repo.head.commit
+
+    batch = client.path / '.git' / 'commands.txt'
+    batch.write_text('touch first\nsh -c "touch hidden"\n')
+
+    result = runner.invoke(
+        cli.cli,
+        ['run', '--batch', str(batch), '--jobs', '2']
+    )
+    assert 1 == result.exit_code
+    assert 'hidden' in result.output
+    assert 'first' not in result.output
+    assert head == repo.head.commit
+
+    (client.path / 'first').unlink()
+    (client.path / 'hidden').unlink()
+
+    batch.write_text('touch first\nsh -c "exit 1"\n')
+    result = runner.invoke(
+        cli.cli,
+        ['run', '--batch', str(batch), '--jobs', '2']
+    )
+    assert 1 == result.exit_code
+    assert 'touch first' in repo.head.commit.message
+    assert not repo.is_dirty(untracked_files=True)
+
+
 def test_streams_and_args_names(runner, project, capsys):
     """Test streams and conflicting argument names."""
     with capsys.disabled():
@@ -599,6 +700,48 @@ def test_status_consistency(runner, client, project):
     ) == comp_result.output
 
 
+def test_status_with_paths(runner, client):
+    """Test status limited to the given paths."""
+    repo = client.repo
+    for name in ('first', 'second'):
+        (client.path / name).write_text(name)
+    repo.index.add(['first', 'second'])
+    repo.index.commit('add inputs')
+
+    for name in ('first', 'second'):
+        cmd = ['run', 'cp', name, name + '.out']
+        assert 0 == runner.invoke(cli.cli, cmd).exit_code
+
+    (client.path / 'first').write_text('modified')
+    repo.index.add(['first'])
+    repo.index.commit('modify first')
+
+    result = runner.invoke(cli.cli, ['status'])
+    assert 1 == result.exit_code
+    assert 'first.out' in result.output
+
+    result = runner.invoke(cli.cli, ['status', 'second.out'])
+    assert 0 == result.exit_code
+
+    result = runner.invoke(cli.cli, ['status', 'first.out'])
+    assert 1 == result.exit_code
+    assert 'first.out' in result.output
+    assert 'second.out' not in result.output
+
+    output = client.path / 'outputs'
+    output.mkdir()
+    cmd = ['run', 'cp', 'first', str(output / 'first.out')]
+    assert 0 == runner.invoke(cli.cli, cmd).exit_code
+    (client.path / 'first').write_text('modified again')
+    repo.index.add(['first'])
+    repo.index.commit('modify first again')
+
+    result = runner.invoke(cli.cli, ['status', 'outputs'])
+    assert 1 == result.exit_code
+    assert os.path.join('outputs', 'first.out') in result.output
+    assert 'second.out' not in result.output
+
+
 def test_unchanged_output(runner, project):
     """Test detection of unchanged output."""
     cmd = ['run', 'touch', '1']
@@ -787,6 +930,100 @@ def test_only_child(runner, project):
     assert 'only_child\n' == result.output
 
 
+def test_show_impact(runner, client):
+    """Test listing of files generated from a path."""
+    cmd = ['run', 'touch', 'source']
+    assert 0 == runner.invoke(cli.cli, cmd).exit_code
+
+    cmd = ['run', 'cp', 'source', 'result']
+    assert 0 == runner.invoke(cli.cli, cmd).exit_code
+
+    cmd = ['run', 'cp', 'result', 'summary']
+    assert 0 == runner.invoke(cli.cli, cmd).exit_code
+
+    result = runner.invoke(cli.cli, ['show', 'impact', 'source'])
+    assert 0 == result.exit_code
+    assert 'result\nsummary\n' == result.output
+
+    result = runner.invoke(cli.cli, ['show', 'impact', 'summary'])
+    assert 0 == result.exit_code
+    assert '' == result.output
+
+    from renku.cli._graph import Reachability
+    reachability = Reachability.from_cache(client.reachability_cache)
+    assert client.repo.head.commit.hexsha == reachability.head
+    assert {'source', 'result'} == reachability.ancestors('summary')
+    assert reachability.is_reachable('source', 'summary')
+    assert not reachability.is_reachable('summary', 'source')
+
+
+def test_reachability_closure():
+    """Test transitive closure of path dependencies with cycles."""
+    from renku.cli._graph import _closure
+
+    # 0 -> 1 -> 2 -> 1 and 3 -> 0
+    assert [0b110, 0b110, 0b110, 0b111] == _closure([{1}, {2}, {1}, {0}])
+    assert [0, 0b1, 0b11] == _closure([set(), {0}, {1}])
+
+
+def test_show_metrics(runner, client):
+    """Test recording of resources used by a command."""
+    cmd = ['run', 'touch', 'source']
+    assert 0 == runner.invoke(cli.cli, cmd).exit_code
+
+    cmd = ['run', 'cp', 'source', 'result']
+    assert 0 == runner.invoke(cli.cli, cmd).exit_code
+
+    result = runner.invoke(cli.cli, ['show', 'metrics', 'result'])
+    assert 0 == result.exit_code
+    path, *values = result.output.split()
+    assert 'result' == path
+    assert [
+        'wall_time', 'user_time', 'system_time', 'max_rss', 'read_bytes',
+        'written_bytes'
+    ] == [value.split('=')[0] for value in values]
+
+    from renku.models.provenance import ProcessRun
+    activity = client.process_commit()
+    assert isinstance(activity, ProcessRun)
+    assert 'metrics' not in vars(activity)
+    assert activity.metrics.wall_time >= 0
+    assert 'metrics' in activity.asjsonld()
+
+    result = runner.invoke(cli.cli, ['log', 'result'])
+    assert 0 == result.exit_code
+    assert str(activity.metrics) not in result.output
+
+    result = runner.invoke(cli.cli, ['log', '--metrics', 'result'])
+    assert 0 == result.exit_code
+    assert str(activity.metrics) in result.output
+
+
+def test_resource_usage_interrupt(monkeypatch):
+    """Test that an interrupted command is killed and reaped."""
+    from renku.models.provenance import ResourceUsage
+
+    processes = []
+    popen = subprocess.Popen
+
+    def record(*args, **kwargs):
+        processes.append(popen(*args, **kwargs))
+        return processes[-1]
+
+    def interrupt(*args):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(subprocess, 'Popen', record)
+    monkeypatch.setattr(os, 'wait4', interrupt)
+
+    with pytest.raises(KeyboardInterrupt):
+        ResourceUsage.call(['sleep', '60'])
+
+    process, = processes
+    assert process.returncode is not None
+    assert process.returncode < 0
+
+
 def test_outputs(runner, project):
     """Test detection of outputs."""
     siblings = {'brother', 'sister'}
@@ -941,6 +1178,60 @@ def test_rerun_with_edited_inputs(runner, project, run):
             assert third_fp.read() == second_fp.read()
 
 
+def test_rerun_sweep(runner, project, run):
+    """Test rerunning of input variants in separate branches."""
+    cwd = Path(project)
+    repo = git.Repo(project)
+    source = cwd / 'source.txt'
+    upper = cwd / 'upper.txt'
+    output = cwd / 'count.txt'
+
+    with source.open('w') as fp:
+        fp.write('abc')
+    repo.git.add('--all')
+    repo.index.commit('Added source')
+
+    assert 0 == run(
+        args=('run', 'sh', '-c', 'cat'), stdin=source, stdout=upper
+    )
+    assert 0 == run(args=('run', 'wc', '-c'), stdin=upper, stdout=output)
+    head = repo.head.commit
+
+    sweep = cwd.parent / 'sweep.yml'
+    with sweep.open('w') as fp:
+        fp.write('grid:\n  input_1: [cat, "echo hello"]\n')
+
+    result = runner.invoke(
+        cli.cli,
+        [
+            'rerun', '--stream', '--sweep',
+            str(sweep), '--workers', '2',
+            str(output)
+        ],
+        catch_exceptions=False,
+    )
+    assert 0 == result.exit_code, result.output
+    assert head == repo.head.commit
+
+    branches = [
+        line.split(': ')[1]
+        for line in result.output.splitlines() if line.startswith('Variant ')
+    ]
+    assert 2 == len(branches)
+    assert '3' == repo.git.show(branches[0] + ':count.txt').strip()
+    assert '6' == repo.git.show(branches[1] + ':count.txt').strip()
+
+    # Only worktrees from the pool are kept.
+    from renku.api import LocalClient
+
+    pool = Path(repo.git_dir) / LocalClient.WORKTREES
+    worktrees = repo.git.worktree('list', '--porcelain').splitlines()
+    assert all(
+        Path(line.split(' ', 1)[1]).parent == pool
+        for line in worktrees[1:] if line.startswith('worktree ')
+    )
+
+
 @pytest.mark.skipif(
     shutil.which('docker') is None, reason='requires docker command line'
 )
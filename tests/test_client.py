@@ -17,6 +17,9 @@
 # limitations under the License.
 """Test Python SDK client."""
 
+import os
+
+import git
 import pytest
 
 
@@ -39,3 +42,592 @@ def test_local_client(tmpdir):
 def test_ignored_paths(paths, ignored, client):
     """Test resolution of ignored paths."""
     assert client.find_ignored_paths(*paths) == ignored
+
+
+def test_process_commit_cache(client, run):
+    """Test reuse of processed commits from the persistent cache."""
+    from renku.api import LocalClient
+    from renku.models.provenance import ProcessRun
+
+    assert 0 == run(args=('run', 'touch', 'output'))
+
+    commit = client.repo.head.commit
+    activity = client.process_commit(commit)
+    assert isinstance(activity, ProcessRun)
+    client.flush_caches()
+
+    cached_client = LocalClient(path=client.path)
+    assert commit.hexsha in cached_client.commit_cache
+
+    cached_activity = cached_client.process_commit(commit)
+    assert isinstance(cached_activity, ProcessRun)
+    assert activity.path == cached_activity.path
+    assert activity.outputs == cached_activity.outputs
+
+
+def test_release_commit_cache(client, run):
+    """Test that parsed CWL documents are dropped after a graph build."""
+    from renku.cli._graph import Graph
+
+    assert 0 == run(args=('run', 'touch', 'output'))
+
+    commit = client.repo.head.commit
+    Graph(client).build()
+    assert client.commit_cache._data is None
+    assert commit.hexsha in client.commit_cache
+
+
+def test_incremental_graph_build(client, run, monkeypatch):
+    """Test merging of new commits into a previously built graph."""
+    from renku.api import LocalClient
+    from renku.models import _sort
+    from renku.cli._graph import Graph
+
+    assert 0 == run(args=('run', 'touch', 'input'))
+    assert 0 == run(args=('run', 'cp', 'input', 'output'))
+
+    graph = Graph(client)
+    graph.build()
+    assert client.repo.head.commit.hexsha == client.graph_cache['head']
+
+    assert 0 == run(args=('run', 'cp', 'output', 'result'))
+    graph.build()
+
+    frontier = client.graph_cache['frontier']
+    assert client.repo.head.commit.hexsha == frontier['result']
+    assert frontier['input'] != frontier['result']
+
+    fresh_client = LocalClient(path=client.path)
+    incremental = Graph(fresh_client)
+    dependencies = incremental.dependencies()
+    assert set(frontier) == {dependency.path for dependency in dependencies}
+    for dependency in dependencies:
+        assert client.find_previous_commit(dependency.path) == \
+            dependency.commit
+    incremental.build()
+    full = Graph(fresh_client)
+    fresh_client.graph_cache.clear()
+    full.build()
+
+    for result in (graph, incremental):
+        assert list(full._sorted_commits) == list(result._sorted_commits)
+        assert list(full._nodes) == list(result._nodes)
+        assert set(full.generated) == set(result.generated)
+
+    # Builds of some paths do not replace the order of the full build.
+    order = client.graph_cache['commits']
+    assert 0 == run(args=('run', 'cp', 'result', 'final'))
+    scoped = Graph(LocalClient(path=client.path))
+    scoped.build(paths=['final'])
+    assert order == LocalClient(path=client.path).graph_cache['commits']
+
+    # Only commits added since the last build are processed.
+    processed = []
+    fresh_client = LocalClient(path=client.path)
+    process_commit = fresh_client.process_commit
+
+    def _process_commit(commit=None, path=None):
+        processed.append(commit)
+        return process_commit(commit=commit, path=path)
+
+    fresh_client.process_commit = _process_commit
+    sorted_ = []
+    topological = _sort.topological
+
+    def _topological(graph):
+        sorted_.append(set(graph))
+        return topological(graph)
+
+    monkeypatch.setattr(_sort, 'topological', _topological)
+    incremental = Graph(fresh_client)
+    incremental.build()
+    assert [client.repo.head.commit] == [
+        commit for commit in processed if commit.hexsha not in order
+    ]
+    assert [{client.repo.head.commit}] == sorted_
+    monkeypatch.undo()
+
+    full = Graph(LocalClient(path=client.path))
+    full.client.graph_cache.clear()
+    full.build()
+    assert list(full._sorted_commits) == list(incremental._sorted_commits)
+    assert list(full._nodes) == list(incremental._nodes)
+    assert set(full.generated) == set(incremental.generated)
+
+
+def test_incremental_graph_status(client, run):
+    """Test that a warm build reports the status of a cold build."""
+    from renku.api import LocalClient
+    from renku.cli._graph import Graph
+
+    repo = client.repo
+    source = client.path / 'source'
+    source.write_text('source')
+    repo.index.add(['source'])
+    repo.index.commit('Add source')
+
+    assert 0 == run(args=('run', 'cp', 'source', 'second'))
+    tool = [
+        path
+        for path in repo.head.commit.stats.files if path.startswith('.renku')
+    ]
+    assert 0 == run(args=('run', 'cp', 'source', 'first'))
+
+    graph = Graph(client)
+    graph.build_status()
+
+    # The generator of the removed output is no longer reachable.
+    repo.index.remove(['second'] + tool, working_tree=True)
+    repo.index.commit('Remove second')
+    source.write_text('modified')
+    repo.index.add(['source'])
+    repo.index.commit('Modify source')
+
+    def paths(status):
+        return {key: set(value) for key, value in status.items()}
+
+    warm = Graph(LocalClient(path=client.path))
+    cold_client = LocalClient(path=client.path)
+    cold_client.graph_cache.clear()
+    cold = paths(Graph(cold_client).build_status())
+
+    assert {'first'} == set(cold['outdated'])
+    assert not cold['deleted']
+    assert cold == paths(warm.build_status())
+    assert cold == paths(graph.build_status())
+
+
+def test_commit_log_index(client, run):
+    """Test lookups of previous commits from the commit log index."""
+    assert 0 == run(args=('run', 'touch', 'input'))
+    assert 0 == run(args=('run', 'cp', 'input', 'output'))
+
+    repo = client.repo
+    repo.index.remove(['input'], working_tree=True)
+    repo.index.commit('Remove input')
+    paths = {path for path, _ in repo.index.entries}
+    paths |= {os.path.dirname(path) or '.' for path in paths}
+    paths |= {'input', 'missing'}
+
+    for path in paths:
+        expected = list(repo.iter_commits('HEAD', paths=path, max_count=1))
+        try:
+            found = [client.find_previous_commit(path)]
+        except KeyError:
+            found = []
+        assert expected == found, path
+
+    for commit in repo.iter_commits('HEAD'):
+        revisions = [commit.hexsha]
+        if commit.parents:
+            revisions.append(commit.hexsha + '^')
+        for revision in revisions:
+            for path in paths:
+                expected = list(
+                    repo.iter_commits(revision, paths=path, max_count=1)
+                )
+                try:
+                    found = [client.find_previous_commit(path, revision)]
+                except KeyError:
+                    found = []
+                assert expected == found, (revision, path)
+
+    # Other revisions do not start a log pass of their own.
+    assert [repo.head.commit.hexsha] == list(client._commit_logs)
+
+    log = client.commit_log('HEAD')
+    assert log is client.commit_log(repo.head.commit.hexsha)
+    assert [('D', 'input')] == log.changes[repo.head.commit.hexsha]
+
+
+def test_commit_log_merge(client):
+    """Test parsing of combined diffs of merge commits."""
+    repo = client.repo
+    (client.path / 'data.txt').write_text('\n'.join(map(str, range(50))))
+    (client.path / 'w').write_text('w')
+    repo.index.add(['data.txt', 'w'])
+    repo.index.commit('Add data')
+    base = repo.head.commit
+
+    repo.git.checkout('-b', 'merge-side')
+    (client.path / 's').write_text('s')
+    repo.index.add(['s'])
+    repo.index.commit('Add s')
+    repo.git.checkout('-')
+    repo.git.merge('--no-ff', '--no-commit', 'merge-side')
+    repo.git.mv('data.txt', 'moved.txt')
+    with (client.path / 'moved.txt').open('a') as fp:
+        fp.write('\n50')
+    (client.path / 'w').write_text('w2')
+    repo.git.add('--all')
+    repo.git.commit('-m', 'Merge')
+
+    merge = repo.head.commit
+    changes = client.commit_log(merge.hexsha).find_changes(merge.hexsha)
+    assert {'moved.txt', 'w'} == {path for _, path in changes}
+    assert merge == client.find_previous_commit('w')
+    assert base != merge
+
+    # Paths found after the merge are looked up with a path limited log.
+    log = client.commit_log(merge.hexsha)
+    assert log.find('s')
+    assert 's' in log.ambiguous
+    for path in ('s', 'data.txt', '.'):
+        assert next(repo.iter_commits('HEAD', paths=path, max_count=1)) == \
+            client.find_previous_commit(path)
+
+
+def test_commit_changes(client, run):
+    """Test memoized changes of commits."""
+    assert 0 == run(args=('run', 'touch', 'input'))
+    assert 0 == run(args=('run', 'cp', 'input', 'output'))
+
+    for commit in client.repo.iter_commits('HEAD'):
+        expected = {
+            item.a_path
+            for item in commit.diff(commit.parents or git.NULL_TREE)
+        }
+        assert expected == {path for _, path in client.commit_changes(commit)}
+
+    commit = client.repo.head.commit
+    assert ('A', 'output') in client.commit_changes(commit)
+    assert commit.hexsha in client.commit_log('HEAD').changes
+
+
+def test_parallel_graph_build(client, run):
+    """Test processing of commits in worker processes."""
+    from renku.api import LocalClient
+    from renku.cli._graph import Graph
+
+    assert 0 == run(args=('run', 'touch', 'input1'))
+    assert 0 == run(args=('run', 'touch', 'input2'))
+    assert 0 == run(args=('run', 'cp', 'input1', 'output1'))
+    assert 0 == run(args=('run', 'cp', 'input2', 'output2'))
+
+    sequential = Graph(client, workers=1)
+    sequential.build()
+
+    client.commit_cache.clear()
+    client.previous_commit_cache.clear()
+    client.graph_cache.clear()
+    client.flush_caches()
+
+    parallel_client = LocalClient(path=client.path, graph_workers=2)
+    parallel = Graph(parallel_client)
+    assert 2 == parallel.workers
+    parallel.build()
+
+    assert len(parallel_client.commit_cache.data) >= 4
+    assert [activity._id for activity in sequential.activities.values()] == [
+        activity._id for activity in parallel.activities.values()
+    ]
+    assert [(node.commit, node.path) for node in sequential.nodes
+            ] == [(node.commit, node.path) for node in parallel.nodes]
+
+
+@pytest.mark.parametrize('value', ['0', '-1', 'many'])
+def test_invalid_graph_workers(runner, project, value):
+    """Test validation of the number of graph workers."""
+    from renku.cli import cli
+
+    result = runner.invoke(cli, ['status'], env={'RENKU_GRAPH_WORKERS': value})
+    assert 2 == result.exit_code
+    assert '--graph-workers' in result.output
+
+
+def test_graph_need_update(client, run):
+    """Test propagation of out-dated inputs through shared ancestors."""
+    from renku.cli._graph import Graph
+
+    repo = client.repo
+    source = client.path / 'source'
+    source.write_text('source')
+    repo.index.add(['source'])
+    repo.index.commit('Add source')
+
+    assert 0 == run(args=('run', 'cp', 'source', 'first'))
+    assert 0 == run(args=('run', 'cp', 'source', 'second'))
+    assert 0 == run(args=('run', 'diff', 'first', 'second'), stdout='result')
+
+    source.write_text('modified')
+    repo.index.add(['source'])
+    repo.index.commit('Modify source')
+
+    graph = Graph(client)
+    status = graph.build_status()
+
+    assert {'first', 'second', 'result'} == set(status['outdated'])
+    outdated = status['outdated']['result']
+    assert {'source'} == {node.path for node in outdated}
+    assert len(outdated) == len({node._id for node in outdated})
+
+    activity = graph.activities[repo.commit('HEAD~1')]
+    assert outdated == graph.need_update(activity)
+
+
+def test_shared_commits(client):
+    """Test that nodes share commit instances and paths."""
+    from renku.models.provenance import Usage
+
+    repo = client.repo
+    for name in ('first', 'second'):
+        (client.path / name).write_text(name)
+    repo.index.add(['first', 'second'])
+    repo.index.commit('Add files')
+
+    first = Usage.from_revision(client, path='first')
+    second = Usage.from_revision(client, path='second')
+    assert first.commit is second.commit
+    assert first.commit is client.get_commit(repo.head.commit.hexsha)
+
+    other = Usage.from_revision(client, path='first', revision=first.commit)
+    assert other.path is first.path
+
+
+def test_working_tree_status(client):
+    """Test that one status snapshot serves all dirty checks."""
+    from renku import errors
+
+    tracked = next(
+        path for path, _ in client.repo.index.entries
+        if (client.path / path).is_file()
+    )
+    with (client.path / tracked).open('a') as fp:
+        fp.write('modified')
+    (client.path / 'untracked dir').mkdir()
+    (client.path / 'untracked dir' / 'file').write_text('new')
+
+    status = client.status
+    assert status is client.status
+    assert {tracked: '.M'} == status.changed
+    assert ['untracked dir/file'] == status.untracked
+    assert {
+        str(client.path / tracked),
+        str(client.path / 'untracked dir' / 'file'),
+    } == client.dirty_paths
+    assert str(
+        client.path / 'untracked dir' / 'file'
+    ) in client.candidate_paths
+
+    with pytest.raises(errors.DirtyRepository):
+        client.ensure_clean()
+
+    with client.commit():
+        pass
+
+    assert not client.status.is_dirty
+    client.ensure_clean()
+
+    # A reused client does not check a stale snapshot.
+    (client.path / 'untracked dir' / 'other').write_text('new')
+    with pytest.raises(errors.DirtyRepository):
+        with client.transaction(commit=False):
+            pass
+    assert ['untracked dir/other'] == client.status.untracked
+
+
+def test_snapshot_racily_clean_entries(client):
+    """Test that files modified within the index timestamp are compared."""
+    from renku.models._snapshot import Snapshot
+
+    repo = client.repo
+    data = client.path / 'data'
+    data.write_text('before')
+    repo.index.add(['data'])
+    repo.index.write()
+
+    # Rewrite the file in place within the timestamp of its entry.
+    entry = repo.index.entries[('data', 0)]
+    mtime_ns = entry.mtime[0] * 10**9
+    data.write_text('after!')
+    os.utime(str(data), ns=(mtime_ns, mtime_ns))
+    os.utime(repo.index.path, ns=(mtime_ns, mtime_ns))
+    repo.index.update()
+
+    changed = Snapshot.from_index(repo).diff(Snapshot.scan(client.path))
+    assert 'data' in changed
+    assert {'data'} == client.filter_changed_paths({'data'})
+
+
+def test_snapshot_untracked_directories(client):
+    """Test that an index snapshot lists untracked directories of paths."""
+    from renku.models._snapshot import Snapshot
+
+    (client.path / 'empty' / 'nested').mkdir(parents=True)
+    (client.path / 'other').mkdir()
+
+    assert 'empty' not in Snapshot.from_index(client.repo).directories
+    paths = ['empty/nested/result.txt', 'missing/result.txt']
+    snapshot = Snapshot.from_index(client.repo, paths=paths)
+    assert {'empty', 'empty/nested'} <= snapshot.directories
+    assert not {'missing', 'other'} & snapshot.directories
+
+
+def test_step_cache(client, run):
+    """Test restoring of step outputs from the step cache."""
+    from renku.cli._cache import StepCache
+    from renku.cli._graph import Graph
+
+    repo = client.repo
+    source = client.path / 'source'
+    source.write_text('source')
+    repo.index.add(['source'])
+    repo.index.commit('Add source')
+
+    assert 0 == run(args=('run', 'cp', 'source', 'first'))
+    assert 0 == run(args=('run', 'cp', 'first', 'second'))
+
+    graph = Graph(client)
+    outputs = graph.build(paths=['second'])
+    steps = {}
+    graph.ascwl(
+        input_paths={'source'},
+        output_paths={'second'},
+        outputs=outputs,
+        steps=steps,
+    )
+    assert 2 == len(steps)
+
+    step_cache = StepCache(client)
+    assert set() == step_cache.restore(steps)
+    assert 2 == len(step_cache.misses)
+    step_cache.store(steps)
+
+    (client.path / 'first').write_text('changed')
+    (client.path / 'second').unlink()
+
+    step_cache = StepCache(client)
+    assert {'first', 'second'} == step_cache.restore(steps)
+    assert 2 == len(step_cache.hits)
+    assert 'source' == (client.path / 'first').read_text()
+    assert 'source' == (client.path / 'second').read_text()
+
+    source.write_text('modified')
+
+    step_cache = StepCache(client)
+    assert set() == step_cache.restore(steps)
+    assert 2 == len(step_cache.misses)
+
+
+def test_step_cache_size(client):
+    """Test that the least recently stored steps are dropped."""
+    from renku.models._cache import JSONCache
+
+    path = client.cache_path / 'bounded.json'
+    cache = JSONCache(path, max_size=2)
+    cache.update({'first': 1, 'second': 2})
+    cache['first'] = 1
+    cache['third'] = 3
+    cache.flush()
+
+    assert ['first', 'third'] == list(JSONCache(path).data)
+
+
+def test_step_cache_filters(client, run):
+    """Test that cached blobs are keyed and stored as they are committed."""
+    from renku.cli._cache import StepCache
+    from renku.cli._graph import Graph
+
+    repo = client.repo
+    repo.git.config('filter.upper.clean', 'tr a-z A-Z')
+    repo.git.config('filter.upper.smudge', 'tr A-Z a-z')
+    with (client.path / '.gitattributes').open('a') as fp:
+        fp.write('\nsource filter=upper\nfirst filter=upper\n')
+    source = client.path / 'source'
+    source.write_text('source')
+    repo.git.add('.gitattributes', 'source')
+    repo.index.commit('Add source')
+
+    assert 0 == run(args=('run', 'cp', 'source', 'first'))
+
+    graph = Graph(client)
+    steps = {}
+    graph.ascwl(
+        input_paths={'source'},
+        output_paths={'first'},
+        outputs=graph.build(paths=['first']),
+        steps=steps,
+    )
+
+    step_cache = StepCache(client)
+    assert set() == step_cache.restore(steps)
+    step_cache.store(steps)
+    (process_run, ) = steps
+    outputs = client.step_cache[step_cache.key(process_run)]
+    assert 'SOURCE' == repo.git.cat_file('-p', outputs['first'])
+
+    # Rewriting an input with the same content keeps the key.
+    source.write_text('source')
+    (client.path / 'first').unlink()
+
+    step_cache = StepCache(client)
+    assert {'first'} == step_cache.restore(steps)
+    assert 'source' == (client.path / 'first').read_text()
+
+
+def test_step_checkpoint(client, run, tmpdir):
+    """Test resuming from steps completed by a failed execution."""
+    from renku.cli._cache import StepCache
+    from renku.cli._graph import Graph
+
+    repo = client.repo
+    source = client.path / 'source'
+    source.write_text('source')
+    repo.index.add(['source'])
+    repo.index.commit('Add source')
+
+    assert 0 == run(args=('run', 'cp', 'source', 'first'))
+    assert 0 == run(args=('run', 'cp', 'first', 'second'))
+
+    graph = Graph(client)
+    outputs = graph.build(paths=['second'])
+    steps = {}
+    graph.ascwl(
+        input_paths={'source'},
+        output_paths={'second'},
+        outputs=outputs,
+        steps=steps,
+    )
+
+    source.write_text('modified')
+    first = tmpdir.join('first')
+    first.write('modified')
+
+    # Only the first step completed.
+    step_cache = StepCache(client, caches=[])
+    assert 1 == step_cache.checkpoint(steps, {'first': str(first)})
+    assert 'source' == (client.path / 'first').read_text()
+
+    step_cache = StepCache(client)
+    assert set() == step_cache.restore(steps)
+
+    step_cache = StepCache(client, caches=[client.checkpoint_cache])
+    assert {'first'} == step_cache.restore(steps)
+    assert 'modified' == (client.path / 'first').read_text()
+
+    step_cache.revert()
+    assert 'source' == (client.path / 'first').read_text()
+
+
+def test_storage_prefetch(client):
+    """Test pulling of step inputs in the order of their use."""
+    from renku.api.storage import LFS_POINTER_PREFIX, StoragePrefetch
+
+    local = client.path / 'local'
+    local.write_text('content')
+    pointers = []
+    for name in ('first', 'second'):
+        pointer = client.path / name
+        pointer.write_bytes(LFS_POINTER_PREFIX + b'v1\n')
+        pointers.append(str(pointer))
+
+    prefetch = StoragePrefetch(
+        client, [[str(local), pointers[0]], [pointers[1], pointers[0]]]
+    )
+    assert [{pointers[0]},
+            {pointers[1]}] == [paths for paths, _ in prefetch._pending]
+
+    with prefetch:
+        prefetch.wait([str(local)])
+        prefetch.wait([pointers[1]])
+        assert pointers[1] in prefetch._done